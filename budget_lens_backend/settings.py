@@ -64,6 +64,9 @@ INSTALLED_APPS = [
     'receipt_split.apps.ReceiptSplitConfig',
     'filemanagement',
     'rules.apps.RulesConfig',
+    'jobs.apps.JobsConfig',
+    'ledger.apps.LedgerConfig',
+    'outbox.apps.OutboxConfig',
 
 
     # Installed apps
@@ -198,6 +201,84 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 PHONENUMBER_DEFAULT_REGION = 'CA'
 
+# Background jobs (see `python manage.py runjobs`)
+# Seconds after which a job left running by a dead worker can be claimed again
+JOBS_LOCK_TIMEOUT = 600
+# Base delay in seconds before retrying a failed job, doubled on every attempt
+JOBS_RETRY_BACKOFF = 30
+
+# Outbound emails, queued by the requests and delivered by the jobs of `python manage.py runjobs` (see outbox/).
+# Tests keep the delivered emails in memory. outbox.backends.FileBackend writes them to OUTBOX_FILE_DIR instead, and
+# outbox.backends.DjangoMailBackend sends them with EMAIL_BACKEND (e.g. to a local SMTP sink).
+if PRODUCTION_MODE == 'test':
+    OUTBOX_BACKEND = os.getenv('OUTBOX_BACKEND', 'outbox.backends.LocMemBackend')
+else:
+    OUTBOX_BACKEND = os.getenv('OUTBOX_BACKEND', 'outbox.backends.SendGridBackend')
+OUTBOX_FILE_DIR = os.getenv('OUTBOX_FILE_DIR', os.path.join(BASE_DIR, 'outbox_emails'))
+OUTBOX_FROM_EMAIL = 'info@budgetlens.tech'
+SEND_GRID_TOKEN = os.getenv('SEND_GRID_TOKEN')
+# Number of emails locked and delivered at once by a delivery job
+OUTBOX_BATCH_SIZE = 50
+# Attempts to deliver an email, retried after JOBS_RETRY_BACKOFF seconds doubled on every attempt
+OUTBOX_MAX_ATTEMPTS = 5
+# Timeout in seconds of the requests to the email service
+OUTBOX_TIMEOUT = 10
+
+# Receipt analysis (OCR) backend, see utility/ocr.py. Veryfi gives the items and their categories in one pass.
+# Tests use the local fixture backend so they never call the external APIs. OCR_RECORD_DIR can be set to save
+# every analysis so it can be replayed by the fixture backend.
+if PRODUCTION_MODE == 'test':
+    OCR_BACKEND = os.getenv('OCR_BACKEND', 'utility.ocr.FixtureOcrBackend')
+else:
+    OCR_BACKEND = os.getenv('OCR_BACKEND', 'utility.ocr.VeryfiOcrBackend')
+OCR_FIXTURE_DIR = os.getenv('OCR_FIXTURE_DIR', os.path.join(BASE_DIR, 'utility', 'ocr_fixtures'))
+OCR_RECORD_DIR = os.getenv('OCR_RECORD_DIR')
+
+# Number of merchants kept in the per-process cache of merchant.resolver, only used when the cache is shared by
+# the processes (i.e. CACHE_URL is set). Tests run without the cache, since their database is rolled back between
+# test cases.
+MERCHANT_CACHE_SIZE = 0 if PRODUCTION_MODE == 'test' else 1024
+
+# Number of users whose compiled categorization rules are kept in the per-process cache of rules.engine
+RULE_ENGINE_CACHE_SIZE = 1024
+
+# Cache shared by the processes, e.g. for the authenticated tokens and the cached responses. It is local to each
+# process by default, set CACHE_URL to a Redis URL (e.g. redis://localhost:6379/0) to share it between the servers.
+# Deployments with several processes (e.g. the web workers and `runjobs`) need CACHE_URL for anything to be cached.
+CACHE_URL = os.getenv('CACHE_URL')
+if CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'budgetlens',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+
+# Responses of the read endpoints are cached in RESPONSE_CACHE for RESPONSE_CACHE_TTL seconds, only when it is
+# shared by the processes (i.e. CACHE_URL is set), see utility.cache
+RESPONSE_CACHE = 'default'
+RESPONSE_CACHE_TTL = 300
+
+# Authenticated bearer tokens are cached in the BEARER_TOKEN_CACHE cache, only when it is shared by the processes
+# (i.e. CACHE_URL is set), see users.authentication.TokenCache
+BEARER_TOKEN_CACHE = 'default'
+BEARER_TOKEN_CACHE_TTL = 300
+# Seconds a bearer token is valid for after login (None for tokens that never expire)
+BEARER_TOKEN_LIFETIME = 60 * 60 * 24 * 30
+# The last use of the tokens is written at most every BEARER_TOKEN_LAST_USED_INTERVAL seconds per process
+BEARER_TOKEN_LAST_USED_INTERVAL = None if PRODUCTION_MODE == 'test' else 60
+
 # Media Files
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 MEDIA_URL = '/media/'
+
+# Tests write their uploaded receipt images in a temporary MEDIA_ROOT
+TEST_RUNNER = 'budget_lens_backend.test_runner.TemporaryMediaTestRunner'
@@ -0,0 +1,29 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TemporaryMediaTestRunner(DiscoverRunner):
+    """
+    Runs the tests with MEDIA_ROOT in a temporary directory, so the receipt images uploaded by the tests are not
+    written into the repository. The images at the top of MEDIA_ROOT, used by the tests, are copied into it.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.media_root = tempfile.mkdtemp(prefix='budgetlens-media-')
+        for name in os.listdir(settings.MEDIA_ROOT):
+            path = os.path.join(settings.MEDIA_ROOT, name)
+            if os.path.isfile(path):
+                shutil.copy(path, self.media_root)
+        self.media_settings = override_settings(MEDIA_ROOT=self.media_root)
+        self.media_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.media_settings.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
@@ -33,6 +33,9 @@ urlpatterns = [
     path('', include('important_dates.urls')),
     path('', include('item_split.urls')),
     path('', include('receipt_split.urls')),
+    path('', include('jobs.urls')),
+    path('', include('ledger.urls')),
+    path('', include('outbox.urls')),
     path('file/', include('filemanagement.urls'), name='file'),
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
     # Optional UI:
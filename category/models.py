@@ -1,5 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 
 
 class Category(models.Model):
@@ -17,3 +19,11 @@ class Category(models.Model):
 
     def get_category_name(self):
         return self.category_name
+
+    # The categories of a user are cached (see utility.cache). Categories changed with `QuerySet.update` bump the
+    # version of their user themselves.
+    @receiver(post_save, sender='category.Category')
+    @receiver(post_delete, sender='category.Category')
+    def invalidate_cached_categories(sender, instance, *args, **kwargs):
+        from utility.cache import bump_user_cache_version
+        bump_user_cache_version(instance.user_id)
@@ -1,6 +1,10 @@
 import os
+import tempfile
 
 from django.contrib.auth.models import User
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.status import HTTP_200_OK, HTTP_400_BAD_REQUEST
@@ -312,3 +316,57 @@ class CategoryAPITestCase(APITestCase):
         # Assert there is no category with the old name
         self.assertEquals(len(old_category), 0)
         self.assertFalse(old_category)
+
+    def test_list_categories_is_cached(self):
+        """
+        Test Case for the cached list of categories, which is invalidated when the categories of the user change
+        """
+        # Responses and authenticated tokens are only cached in a cache shared by the processes
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        shared_cache = override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directory.name}})
+        shared_cache.enable()
+        self.addCleanup(shared_cache.disable)
+
+        url_list_categories = reverse('add_and_list_category')
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token.key)
+        response = self.client.get(url_list_categories, format='json')
+        self.assertEqual(response.status_code, HTTP_200_OK)
+
+        # Assert that the categories are read from the cache
+        with CaptureQueriesContext(connection) as queries:
+            cached_response = self.client.get(url_list_categories, format='json')
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(cached_response.data, response.data)
+
+        # Assert that the query parameters are part of the key
+        names = [category['category_name'] for category in response.data]
+        response = self.client.get(url_list_categories, {'ordering': '-id'}, format='json')
+        self.assertEqual([category['category_name'] for category in response.data], names[::-1])
+
+        # Assert that categories changed with QuerySet.update are not read from the cache
+        self.client.put(reverse('delete_and_toggle_category', kwargs={'categoryName': 'Food'}), format='json')
+        response = self.client.get(url_list_categories, format='json')
+        self.assertEqual([category['category_name'] for category in response.data if category['category_toggle_star']],
+                         ['Food'])
+
+        # Assert that categories created with signals are not read from the cache
+        Category.objects.create(category_name='Rent', user=self.user)
+        response = self.client.get(url_list_categories, format='json')
+        self.assertEqual([category['category_name'] for category in response.data], names + ['Rent'])
+
+    def test_list_categories_is_not_cached_by_each_process(self):
+        """
+        Test Case for the list of categories with the cache local to each process, where the versions bumped by
+        another process (e.g. `runjobs`) would not be seen, so responses are not cached
+        """
+        url_list_categories = reverse('add_and_list_category')
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token.key)
+        self.client.get(url_list_categories, format='json')
+
+        # Changed without bumping the version of the user, like the changes made by another process
+        Category.objects.filter(user=self.user, category_name='Taxi').update(category_name='Cab')
+
+        response = self.client.get(url_list_categories, format='json')
+        self.assertIn('Cab', [category['category_name'] for category in response.data])
@@ -6,6 +6,7 @@ from item.models import Item
 
 from .models import Category
 from .serializers import BasicCategorySerializer
+from utility.cache import bump_user_cache_version, cache_response
 
 import django_filters
 from django_filters.rest_framework import DjangoFilterBackend
@@ -97,6 +98,7 @@ class ListCategoriesAndSubCategoriesView(generics.ListAPIView):
     ordering_fields = '__all__'
     search_fields = ['category_toggle_star']
 
+    @cache_response('categories')
     def get(self, request, *args, **kwargs):
         # Get the list of Categories
         original_request = super().get(request, *args, **kwargs)
@@ -154,6 +156,7 @@ class ToggleStarCategoryView(generics.UpdateAPIView):
         # Update the star value to be the opposite of the current star value (not star_value)
         self.get_queryset().filter(category_name=kwargs['categoryName']).update(
             category_toggle_star=not star_value)
+        bump_user_cache_version(request.user.id)
         return Response({
             "Description": "Updated Successfully"
         }, status=HTTP_200_OK)
@@ -188,6 +191,7 @@ class EditCategoryAPIView(generics.UpdateAPIView):
 
             if category.exists():
                 category.update(category_name=request.data.get('category_name'))
+                bump_user_cache_version(request.user.id)
 
                 return Response({"response": "Category name has been updated."}, status=status.HTTP_200_OK)
 
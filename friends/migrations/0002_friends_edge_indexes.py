@@ -0,0 +1,21 @@
+# Generated by Django 4.1.1 on 2026-10-18 09:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('friends', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='friends',
+            index=models.Index(fields=['main_user', 'confirmed'], name='friends_main_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='friends',
+            index=models.Index(fields=['friend_user', 'confirmed'], name='friends_friend_user_idx'),
+        ),
+    ]
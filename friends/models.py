@@ -10,3 +10,19 @@ class Friends(models.Model):
     friend_user = models.ForeignKey(User, related_name='friend_user', on_delete=models.CASCADE, null=True)
     confirmed = models.BooleanField(default=False)
     temp_email = models.EmailField(max_length=254, null=True)
+
+    class Meta:
+        indexes = [
+            # The friendships and requests of a user in either direction (see Friends.edges_of)
+            models.Index(fields=['main_user', 'confirmed'], name='friends_main_user_idx'),
+            models.Index(fields=['friend_user', 'confirmed'], name='friends_friend_user_idx'),
+        ]
+
+    @classmethod
+    def edges_of(cls, user_id):
+        """The friendships, requests and invites sent or received by a user, with both users joined in"""
+        return (
+            cls.objects.filter(models.Q(main_user=user_id) | models.Q(friend_user=user_id))
+            .select_related('main_user', 'friend_user')
+            .order_by('id')
+        )
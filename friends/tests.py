@@ -1,4 +1,6 @@
 from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
@@ -702,3 +704,34 @@ class FriendsAPITest(APITestCase):
         friend_requests3 = Friends.objects.filter(main_user=self.user.id, confirmed=True)
         self.assertEquals(len(friend_requests3), 0)
         self.assertFalse(friend_requests3)
+
+    def test_friend_pages_query_count(self):
+        """
+        The friends and friend requests pages read all the friends of the user with the same queries however many
+        friends the user has
+        """
+        self.helper_create_user_instance()
+        token = BearerToken.objects.create(user_id=self.user.pk)
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + token.key)
+
+        def get_pages():
+            with CaptureQueriesContext(connection) as queries:
+                friends = self.client.get(reverse('friends'), format='json')
+                friend_requests = self.client.get(reverse('friend_requests'), format='json')
+            return friends.data, friend_requests.data, len(queries)
+
+        # Warm up, so that the measurements do not depend on whether the token was cached
+        get_pages()
+        Friends.objects.create(main_user=self.user, friend_user=self.user2, confirmed=True)
+        friends, friend_requests, num_queries = get_pages()
+        self.assertEqual([friend['id'] for friend in friends['response']], [self.user2.id])
+
+        Friends.objects.create(main_user=self.user3, friend_user=self.user, confirmed=True)
+        Friends.objects.create(main_user=self.user, confirmed=False, temp_email='newfriend@gmail.com')
+        friends, friend_requests, more_num_queries = get_pages()
+
+        self.assertEqual(more_num_queries, num_queries)
+        self.assertEqual([friend['id'] for friend in friends['response']], [self.user2.id, self.user3.id])
+        self.assertEqual([friend['id'] for friend in friend_requests['friends']], [self.user2.id, self.user3.id])
+        self.assertEqual(friend_requests['invites_sent'], [{'email': 'newfriend@gmail.com'}])
+        self.assertEqual(friend_requests['requests_received'], [])
@@ -1,5 +1,6 @@
 from django.core.exceptions import ValidationError
 from django.core.validators import validate_email
+from django.db.models import Q
 from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
@@ -24,30 +25,25 @@ class FriendsAPI(generics.GenericAPIView):
             else:
                 return Response({"response": "User not found."}, status=status.HTTP_404_NOT_FOUND)
 
-        # Return all user's friends
+        # Return all user's friends, the ones the user added first
         else:
-            query1 = Friends.objects.filter(main_user=self.request.user.id, confirmed=True)
-            query2 = Friends.objects.filter(friend_user=self.request.user.id, confirmed=True)
-            friends_list_users = []
-            for friend in query1:
-                friends_list_users.append(UserSerializer(User.objects.get(id=friend.friend_user.id)).data)
-            for friend in query2:
-                friends_list_users.append(UserSerializer(User.objects.get(id=friend.main_user.id)).data)
+            friends = Friends.edges_of(request.user.id).filter(confirmed=True)
+            friends_list_users = [UserSerializer(friend.friend_user).data for friend in friends
+                                  if friend.main_user_id == request.user.id]
+            friends_list_users += [UserSerializer(friend.main_user).data for friend in friends
+                                   if friend.main_user_id != request.user.id]
 
             return Response({"response": friends_list_users}, status=status.HTTP_200_OK)
 
     # used to remove/delete a friend, friend_id needs to be specified in the url
     def delete(self, request, *args, **kwargs):
         if kwargs.get('friend_id'):
-            friend1 = Friends.objects.filter(main_user=request.user.id, friend_user=kwargs.get('friend_id'),
-                                             confirmed=True)
-            friend2 = Friends.objects.filter(friend_user=request.user.id, main_user=kwargs.get('friend_id'),
-                                             confirmed=True)
-            if friend1.exists():
-                friend1.delete()
-                return Response({"response": "Friend removed successfully."}, status=status.HTTP_200_OK)
-            elif friend2.exists():
-                friend2.delete()
+            deleted, _ = Friends.objects.filter(
+                Q(main_user=request.user.id, friend_user=kwargs.get('friend_id'))
+                | Q(friend_user=request.user.id, main_user=kwargs.get('friend_id')),
+                confirmed=True
+            ).delete()
+            if deleted:
                 return Response({"response": "Friend removed successfully."}, status=status.HTTP_200_OK)
             else:
                 return Response({"response": "Friend not found."}, status=status.HTTP_400_BAD_REQUEST)
@@ -118,17 +114,18 @@ class FriendRequestAPI(generics.GenericAPIView):
 
         if request_user.get('id') == friend_user.get('id'):
             return {"response": "You cannot add yourself as a friend."}
-        elif Friends.objects.filter(main_user=request_user.get('id'), friend_user=friend_user.get('id'),
-                                    confirmed=True).exists():
-            return {"response": "You are already friends with this user."}
-        elif Friends.objects.filter(main_user=friend_user.get('id'), friend_user=request_user.get('id'),
-                                    confirmed=True).exists():
+
+        # The friendship or requests between the two users, in either direction, with a single query
+        edges = set(Friends.objects.filter(
+            Q(main_user=request_user.get('id'), friend_user=friend_user.get('id'))
+            | Q(main_user=friend_user.get('id'), friend_user=request_user.get('id'))
+        ).values_list('main_user_id', 'confirmed'))
+
+        if any(confirmed for main_user_id, confirmed in edges):
             return {"response": "You are already friends with this user."}
-        elif Friends.objects.filter(main_user=request_user.get('id'), friend_user=friend_user.get('id'),
-                                    confirmed=False).exists():
+        elif (request_user.get('id'), False) in edges:
             return {"response": "You have already sent a friend request to this user."}
-        elif Friends.objects.filter(main_user=friend_user.get('id'), friend_user=request_user.get('id'),
-                                    confirmed=False).exists():
+        elif (friend_user.get('id'), False) in edges:
             return {"response": "You have already have a pending friend request from this user."}
         else:
             return None
@@ -156,34 +153,30 @@ class FriendRequestAPI(generics.GenericAPIView):
 
     # friends page with requests sent and received
     def get(self, request, *args, **kwargs):
-
-        friend_requests_sent = Friends.objects.filter(main_user=request.user.id, confirmed=False, temp_email=None)
-        friend_invites_sent = Friends.objects.filter(main_user=request.user.id, friend_user=None, confirmed=False)
-        friend_requests_received = Friends.objects.filter(friend_user=request.user.id, confirmed=False, temp_email=None)
-        friends1 = Friends.objects.filter(main_user=request.user.id, confirmed=True, temp_email=None)
-        friends2 = Friends.objects.filter(friend_user=request.user.id, confirmed=True, temp_email=None)
-
         friend_requests_sent_list = []
         friend_invites_sent_list = []
         friend_requests_received_list = []
-        friend_list = []
-
-        for friend_request in friend_requests_sent:
-            friend_requests_sent_list.append(UserSerializer(User.objects.get(id=friend_request.friend_user.id)).data)
-
-        for friend_request in friend_invites_sent:
-            friend_invites_sent_list.append({"email": f"{friend_request.temp_email}"})
-
-        for friend_request in friend_requests_received:
-            friend_requests_received_list.append(UserSerializer(User.objects.get(id=friend_request.main_user.id)).data)
-
-        for friend in friends1:
-            friend_list.append(UserSerializer(User.objects.get(id=friend.friend_user.id)).data)
-
-        for friend in friends2:
-            friend_list.append(UserSerializer(User.objects.get(id=friend.main_user.id)).data)
+        friends_added_list = []
+        friends_accepted_list = []
+
+        # All the friendships, requests and invites of the user are read with a single query
+        for edge in Friends.edges_of(request.user.id):
+            sent = edge.main_user_id == request.user.id
+            if edge.confirmed:
+                if edge.temp_email is None:
+                    if sent:
+                        friends_added_list.append(UserSerializer(edge.friend_user).data)
+                    else:
+                        friends_accepted_list.append(UserSerializer(edge.main_user).data)
+            elif sent and edge.friend_user_id is None:
+                friend_invites_sent_list.append({"email": f"{edge.temp_email}"})
+            elif edge.temp_email is None:
+                if sent:
+                    friend_requests_sent_list.append(UserSerializer(edge.friend_user).data)
+                else:
+                    friend_requests_received_list.append(UserSerializer(edge.main_user).data)
 
         return Response({"requests_sent": friend_requests_sent_list,
                          "invites_sent": friend_invites_sent_list,
                          "requests_received": friend_requests_received_list,
-                         "friends": friend_list}, status=status.HTTP_200_OK)
+                         "friends": friends_added_list + friends_accepted_list}, status=status.HTTP_200_OK)
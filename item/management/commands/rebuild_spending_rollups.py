@@ -0,0 +1,25 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from item.models import SpendingRollup
+from item.rollups import rebuild_spending_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute the daily and monthly spending rollups from the items'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, help='Only rebuild the rollups of the user with this id')
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user'] is not None:
+            try:
+                user = User.objects.get(id=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f'User {options["user"]} does not exist')
+
+        rebuild_spending_rollups(user)
+
+        rollups = SpendingRollup.objects.filter(user=user) if user is not None else SpendingRollup.objects.all()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rollups.count()} spending rollup(s)'))
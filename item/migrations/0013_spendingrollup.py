@@ -0,0 +1,64 @@
+# Generated by Django 4.1.1 on 2026-10-18 08:40
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, DateField, Min, Sum
+from django.db.models.functions import TruncDate, TruncMonth
+import django.db.models.deletion
+
+
+def rebuild_spending_rollups(apps, schema_editor):
+    """Backfill the day and month rollups from the items, with one GROUP BY query per period"""
+    Item = apps.get_model('item', 'Item')
+    SpendingRollup = apps.get_model('item', 'SpendingRollup')
+
+    items = Item.objects.filter(receipt__scan_date__isnull=False)
+    truncs = {
+        'day': TruncDate('receipt__scan_date'),
+        'month': TruncMonth('receipt__scan_date', output_field=DateField()),
+    }
+    for period, trunc in truncs.items():
+        rows = (
+            items.annotate(bucket=trunc)
+            .values('user_id', 'category_id', 'bucket')
+            .annotate(total=Sum('price'), count=Count('id'), first_item=Min('id'))
+            .order_by('first_item')
+        )
+        SpendingRollup.objects.bulk_create([
+            SpendingRollup(user_id=row['user_id'], category_id=row['category_id'], period=period,
+                           bucket=row['bucket'], total=row['total'], count=row['count'])
+            for row in rows
+        ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('category', '0002_category_icon'),
+        ('item', '0012_remove_item_important_dates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SpendingRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('day', 'Day'), ('month', 'Month')], max_length=5)),
+                ('bucket', models.DateField()),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('count', models.IntegerField(default=0)),
+                ('category', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='spending_rollups', to='category.category')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='spending_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='spendingrollup',
+            constraint=models.UniqueConstraint(condition=models.Q(('category__isnull', False)), fields=('user', 'category', 'period', 'bucket'), name='unique_category_spending_rollup'),
+        ),
+        migrations.AddConstraint(
+            model_name='spendingrollup',
+            constraint=models.UniqueConstraint(condition=models.Q(('category__isnull', True)), fields=('user', 'period', 'bucket'), name='unique_uncategorized_spending_rollup'),
+        ),
+        migrations.RunPython(rebuild_spending_rollups, migrations.RunPython.noop),
+    ]
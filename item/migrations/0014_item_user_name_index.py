@@ -0,0 +1,17 @@
+# Generated by Django 4.1.1 on 2026-10-18 08:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('item', '0013_spendingrollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['user', 'name'], name='item_user_name_idx'),
+        ),
+    ]
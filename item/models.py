@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
 from category.models import Category
 from django.contrib.auth.models import User
 
@@ -13,3 +15,60 @@ class Item(models.Model):
     category_id = models.ForeignKey(Category, related_name='category', null=True, on_delete=models.DO_NOTHING)
     name = models.CharField(max_length=36)
     price = models.DecimalField(max_digits=18, decimal_places=2)
+
+    class Meta:
+        indexes = [
+            # Purchase frequency of an item (see item.reports.item_purchase_frequency)
+            models.Index(fields=['user', 'name'], name='item_user_name_idx'),
+        ]
+
+    # Keep the spending rollups current. Items inserted with `bulk_create` or changed with `QuerySet.update` do not
+    # send these signals, so those paths record their changes with `item.rollups` themselves.
+    @receiver(pre_save, sender='item.Item')
+    def pre_save_item(sender, instance, *args, **kwargs):
+        from item.rollups import spending_of_items
+        instance._previous_spending = spending_of_items(Item.objects.filter(id=instance.id)) if instance.id else []
+
+    @receiver(post_save, sender='item.Item')
+    def post_save_item(sender, instance, *args, **kwargs):
+        from item.rollups import record_spending, spending_of_items
+        record_spending(getattr(instance, '_previous_spending', []), sign=-1)
+        record_spending(spending_of_items(Item.objects.filter(id=instance.id)))
+
+    @receiver(post_delete, sender='item.Item')
+    def post_delete_item(sender, instance, *args, **kwargs):
+        from item.rollups import record_spending, spending_of_unsaved_items
+        record_spending(spending_of_unsaved_items([instance]), sign=-1)
+
+    @receiver(post_save, sender='item.Item')
+    @receiver(post_delete, sender='item.Item')
+    def invalidate_cached_items(sender, instance, *args, **kwargs):
+        from utility.cache import bump_user_cache_version
+        bump_user_cache_version(instance.user_id)
+
+
+class SpendingPeriod(models.TextChoices):
+    DAY = 'day'
+    MONTH = 'month'
+
+
+class SpendingRollup(models.Model):
+    """
+    Total price and number of the items of a user per category and day (or month) of the receipt scan date,
+    maintained incrementally by `item.rollups` so reports do not have to read every item.
+    """
+    user = models.ForeignKey(User, related_name='spending_rollups', on_delete=models.CASCADE)
+    category = models.ForeignKey(Category, related_name='spending_rollups', null=True, on_delete=models.CASCADE)
+    period = models.CharField(max_length=5, choices=SpendingPeriod.choices)
+    # The day, or the first day of the month, of the receipt scan date
+    bucket = models.DateField()
+    total = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'category', 'period', 'bucket'],
+                                    condition=models.Q(category__isnull=False), name='unique_category_spending_rollup'),
+            models.UniqueConstraint(fields=['user', 'period', 'bucket'],
+                                    condition=models.Q(category__isnull=True), name='unique_uncategorized_spending_rollup'),
+        ]
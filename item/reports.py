@@ -0,0 +1,93 @@
+import calendar
+import datetime
+
+from django.db.models import F, Min, Sum, Value
+
+from item.models import Item, SpendingPeriod, SpendingRollup
+
+
+def category_costs(user):
+    """
+    Total cost of the items of `user` per category, as a list of {'category_name', 'category_cost'} in the order
+    in which each category first appears. Read from the monthly spending rollups, so the cost is proportional to
+    the number of months rather than the number of items, plus the items of the receipts without a scan date, which
+    are not rolled up, in the same query.
+    """
+    rolled_up = (
+        SpendingRollup.objects.filter(user=user, period=SpendingPeriod.MONTH, category__isnull=False)
+        .values('category_id')
+        .annotate(category_name=F('category__category_name'), category_cost=Sum('total'),
+                  source=Value(0), first_row=Min('id'))
+    )
+    undated = (
+        Item.objects.filter(user=user, receipt__scan_date__isnull=True, category_id__isnull=False)
+        .values('category_id')
+        .annotate(category_name=F('category_id__category_name'), category_cost=Sum('price'),
+                  source=Value(1), first_row=Min('id'))
+    )
+
+    costs = {}
+    for row in rolled_up.union(undated, all=True).order_by('source', 'first_row'):
+        if row['category_id'] in costs:
+            costs[row['category_id']]['category_cost'] += row['category_cost']
+        else:
+            costs[row['category_id']] = {'category_name': row['category_name'], 'category_cost': row['category_cost']}
+    return list(costs.values())
+
+
+def starred_category_costs_frequency(user, since):
+    """
+    Total cost and number of the items of `user` per starred category, for the receipts scanned on or after the
+    date `since`. Returns a dict of {category_name: {'price', 'category_frequency'}} read from the daily spending
+    rollups, so the cost is proportional to the number of days rather than the number of items.
+    """
+    rows = (
+        SpendingRollup.objects.filter(user=user, period=SpendingPeriod.DAY, bucket__gte=since,
+                                      category__category_toggle_star=True)
+        .values('category_id', 'category__category_name')
+        .annotate(price=Sum('total'), category_frequency=Sum('count'), first_rollup=Min('id'))
+        .order_by('first_rollup')
+    )
+    return {
+        row['category__category_name']: {'price': row['price'], 'category_frequency': row['category_frequency']}
+        for row in rows
+    }
+
+
+def months_before(date, months):
+    """The same day `months` months before `date`, or the last day of that month if it is shorter"""
+    year, month = divmod(date.year * 12 + date.month - 1 - months, 12)
+    return date.replace(year=year, month=month + 1, day=min(date.day, calendar.monthrange(year, month + 1)[1]))
+
+
+def frequency_window(params):
+    """
+    The (start, end) dates, both included, of the window given by the `days`, `months` or `month` (YYYY-MM) query
+    parameters, the last month by default. Raises ValueError if the window is invalid.
+    """
+    today = datetime.date.today()
+    try:
+        if 'month' in params:
+            month = datetime.datetime.strptime(params['month'], '%Y-%m').date()
+            return month, month.replace(day=calendar.monthrange(month.year, month.month)[1])
+        if 'days' in params:
+            days = int(params['days'])
+            if days < 0:
+                raise ValueError
+            return today - datetime.timedelta(days=days), today
+        months = int(params.get('months', 1))
+        if months < 0:
+            raise ValueError
+        return months_before(today, months), today
+    except (ValueError, OverflowError):
+        raise ValueError("Invalid date window, use days=<N>, months=<N> or month=<YYYY-MM>")
+
+
+def item_purchase_frequency(user, name, start_date, end_date):
+    """
+    Number of items named `name` bought by `user` on receipts scanned between `start_date` and `end_date`
+    (included), counted with a single query using the (user, name) index of the items.
+    """
+    return Item.objects.filter(
+        user=user, name=name, receipt__scan_date__date__gte=start_date, receipt__scan_date__date__lte=end_date
+    ).count()
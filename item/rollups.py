@@ -0,0 +1,104 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DateField, F, Min, Sum
+from django.db.models.functions import TruncDate, TruncMonth
+from django.utils import timezone
+
+from item.models import Item, SpendingPeriod, SpendingRollup
+from receipts.models import Receipts
+
+
+def spending_of_items(items):
+    """The (user id, category id, scan date, total, count) spending entries of the items of a queryset"""
+    rows = items.values_list('user_id', 'category_id', 'receipt__scan_date', 'price')
+    return [(user_id, category_id, scan_date, price, 1) for user_id, category_id, scan_date, price in rows]
+
+
+def spending_of_unsaved_items(items):
+    """
+    The spending entries of item instances, e.g. items that were just deleted or inserted with `bulk_create`.
+    The scan dates are read from the database, since the receipts held by the items may not be up to date.
+    """
+    scan_dates = dict(
+        Receipts.objects.filter(id__in={item.receipt_id for item in items}).values_list('id', 'scan_date')
+    )
+    return [
+        (item.user_id, item.category_id_id, scan_dates.get(item.receipt_id), Decimal(str(item.price)), 1)
+        for item in items
+    ]
+
+
+def _buckets(scan_date):
+    day = timezone.localtime(scan_date).date()
+    return [(SpendingPeriod.DAY, day), (SpendingPeriod.MONTH, day.replace(day=1))]
+
+
+def record_spending(entries, sign=1):
+    """
+    Add (or with `sign=-1`, remove) spending entries to the day and month rollups. Entries of receipts without
+    a scan date are not rolled up. Removing never creates rows, and rows left without any item are deleted.
+    """
+    deltas = defaultdict(lambda: [Decimal(0), 0])
+    for user_id, category_id, scan_date, total, count in entries:
+        if scan_date is None:
+            continue
+        for period, bucket in _buckets(scan_date):
+            deltas[(user_id, category_id, period, bucket)][0] += sign * total
+            deltas[(user_id, category_id, period, bucket)][1] += sign * count
+
+    for (user_id, category_id, period, bucket), (total, count) in deltas.items():
+        rollup = SpendingRollup.objects.filter(user_id=user_id, category_id=category_id, period=period, bucket=bucket)
+        if rollup.update(total=F('total') + total, count=F('count') + count) or sign < 0:
+            continue
+        try:
+            with transaction.atomic():
+                SpendingRollup.objects.create(user_id=user_id, category_id=category_id, period=period, bucket=bucket,
+                                              total=total, count=count)
+        except IntegrityError:
+            # Another request created the row in the meantime
+            rollup.update(total=F('total') + total, count=F('count') + count)
+
+    if sign < 0:
+        for user_id, category_id, period, bucket in deltas:
+            SpendingRollup.objects.filter(user_id=user_id, category_id=category_id, period=period, bucket=bucket,
+                                          count__lte=0).delete()
+
+
+def record_items(items):
+    """Add items inserted without signals (e.g. with `bulk_create`) to the rollups"""
+    record_spending(spending_of_unsaved_items(items))
+
+
+def rebuild_spending_rollups(user=None, item_model=Item, rollup_model=SpendingRollup):
+    """
+    Recompute the rollups of `user` (or of every user) from their items, with one GROUP BY query per period.
+    Used for backfills, and after items are changed in bulk with `QuerySet.update`. The models can be passed so
+    that it can run from a migration.
+    """
+    items = item_model.objects.filter(receipt__scan_date__isnull=False)
+    rollups = rollup_model.objects.all()
+    if user is not None:
+        items = items.filter(user=user)
+        rollups = rollups.filter(user=user)
+
+    truncs = {
+        SpendingPeriod.DAY: TruncDate('receipt__scan_date'),
+        SpendingPeriod.MONTH: TruncMonth('receipt__scan_date', output_field=DateField()),
+    }
+    with transaction.atomic():
+        rollups.delete()
+        for period, trunc in truncs.items():
+            rows = (
+                items.annotate(bucket=trunc)
+                .values('user_id', 'category_id', 'bucket')
+                .annotate(total=Sum('price'), count=Count('id'), first_item=Min('id'))
+                # Create the rollups in the order in which their categories first appear, like the increments do
+                .order_by('first_item')
+            )
+            rollup_model.objects.bulk_create([
+                rollup_model(user_id=row['user_id'], category_id=row['category_id'], period=period,
+                             bucket=row['bucket'], total=row['total'], count=row['count'])
+                for row in rows
+            ], batch_size=1000)
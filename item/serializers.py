@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from category.models import Category
 from item.models import Item
 from receipts.models import Receipts
 
@@ -9,10 +10,12 @@ class ItemSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
     def create(self, validated_data):
+        # The category can also be given by its id, e.g. the category of the rule matching the item (see AddItemAPI)
+        category = validated_data.get('category_id')
         item = Item.objects.create(
             user=validated_data['user'],
             receipt=validated_data['receipt'],
-            category_id=validated_data['category_id'],
+            category_id_id=validated_data.get('category_id_id', category.id if category is not None else None),
             name=validated_data['name'],
             price=validated_data['price']
         )
@@ -28,3 +31,36 @@ class PutPatchItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = Item
         fields = ('user', 'receipt', 'category_id', 'name', 'price')
+
+
+class BatchItemEntrySerializer(serializers.Serializer):
+    """An item of a batch, the category is checked against the categories of the user by BatchItemSerializer"""
+    name = serializers.CharField(max_length=Item._meta.get_field('name').max_length)
+    price = serializers.DecimalField(max_digits=18, decimal_places=2)
+    category_id = serializers.IntegerField(required=False, allow_null=True)
+
+
+class BatchItemSerializer(serializers.Serializer):
+    """Serializer for AddItemsBatchAPI, a list of items added to one receipt of the user"""
+    receipt = serializers.IntegerField()
+    items = BatchItemEntrySerializer(many=True, allow_empty=False, max_length=500)
+
+    def validate_receipt(self, value):
+        if not Receipts.objects.filter(id=value, user=self.context['request'].user).exists():
+            raise serializers.ValidationError("Receipt does not exist")
+        return value
+
+    def validate_items(self, value):
+        # Check the categories of all the items with a single query
+        category_ids = {item['category_id'] for item in value if item.get('category_id') is not None}
+        existing_category_ids = set(Category.objects.filter(
+            id__in=category_ids, user=self.context['request'].user
+        ).values_list('id', flat=True))
+        errors = [
+            {'category_id': ["Category does not exist"]}
+            if item.get('category_id') is not None and item['category_id'] not in existing_category_ids else {}
+            for item in value
+        ]
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return value
@@ -1,11 +1,20 @@
 import datetime
 import os
+from io import StringIO
+from decimal import Decimal
 from random import randint
 from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.timezone import make_aware
 from rest_framework import status
 from rest_framework.status import HTTP_200_OK, HTTP_400_BAD_REQUEST
 
-from item.models import Item
+from item.models import Item, SpendingPeriod, SpendingRollup
+from item.reports import months_before
+from item.rollups import rebuild_spending_rollups
 
 from merchant.models import Merchant
 from receipts.models import Receipts
@@ -127,6 +136,104 @@ class ItemsAPITest(APITransactionTestCase):
 
         self.assertEqual(Item.objects.count(), original_item_count + 1)
 
+    def test_add_items_batch(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token.key)
+        original_item_count = Item.objects.count()
+
+        response = self.client.post(reverse('add_items_batch'), data={
+            "receipt": self.receipt1.id,
+            "items": [
+                {"name": "potato", "price": 1.5, "category_id": self.category2.id},
+                {"name": "fun", "price": 2},
+                {"name": "bagel", "price": 3.25},
+            ]
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Item.objects.count(), original_item_count + 3)
+        self.assertEqual([item['name'] for item in response.data['items']], ['potato', 'fun', 'bagel'])
+        # The rules are applied as for a single item
+        self.assertEqual(Item.objects.get(name='fun').category_id, self.category1)
+        self.assertEqual(Item.objects.get(name='potato').category_id, self.category2)
+        self.assertIsNone(Item.objects.get(name='bagel').category_id)
+
+    def test_add_items_batch_query_count(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token.key)
+        url = reverse('add_items_batch')
+
+        query_counts = []
+        for size in [1, 2, 20]:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(url, data={
+                    "receipt": self.receipt1.id,
+                    "items": [{"name": f"item {i}", "price": 1, "category_id": self.category2.id} for i in range(size)]
+                }, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            query_counts.append(len(queries))
+
+        # Once the spending rollups of the receipt exist, the number of queries does not depend on the number of items
+        self.assertEqual(query_counts[1], query_counts[2])
+
+    def test_add_items_batch_is_validated_together(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token.key)
+        original_item_count = Item.objects.count()
+        other_user = User.objects.create_user(username='therock123@gmail.com', password='wrestlingrules123')
+        other_category = Category.objects.create(user=other_user, category_name="clothes")
+
+        response = self.client.post(reverse('add_items_batch'), data={
+            "receipt": self.receipt1.id,
+            "items": [{"name": "potato", "price": 1.5}, {"name": "shirt", "price": 2, "category_id": other_category.id}]
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['items'][1]['category_id'][0], "Category does not exist")
+        self.assertEqual(Item.objects.count(), original_item_count)
+
+        other_receipt = Receipts.objects.create(user=other_user)
+        response = self.client.post(reverse('add_items_batch'), data={
+            "receipt": other_receipt.id,
+            "items": [{"name": "potato", "price": 1.5}]
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['receipt'][0], "Receipt does not exist")
+
+    def test_get_items(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token.key)
+        Item.objects.create(user=self.user, receipt=self.receipt1, name='tea', category_id=None, price=2.5)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('items'), format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # Authentication, the total and the items, whatever the number of items
+        self.assertLessEqual(len(queries), 3)
+        self.assertEqual(response.data['totalPrice'], Decimal('85.63'))
+        self.assertEqual(len(response.data['items']), 4)
+
+        item = Item.objects.get(name='coffee')
+        self.assertEqual(response.data['items'][item.id], {
+            'item': [self.user.id, 'coffee', Decimal('10.15')],
+            'receipt_details': [self.receipt1.id, 'starbucks', self.receipt1.scan_date],
+            'category_details': ['clothes', None]
+        })
+        self.assertEqual(response.data['items'][Item.objects.get(name='tea').id]['category_details'], "Empty")
+
+    def test_get_items_paged(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token.key)
+
+        response = self.client.get(reverse('items'), {'pageNumber': 2, 'pageSize': 2}, format='json')
+
+        self.assertEqual(list(response.data['items']), [Item.objects.get(name='mateo').id])
+        self.assertEqual(response.data['totalPrice'], Decimal('83.13'))
+        self.assertEqual(response.data['current_page_number'], 2)
+        self.assertEqual(response.data['number_of_pages'], 2)
+
+        response = self.client.get(reverse('items'), {'pageNumber': 3, 'pageSize': 2}, format='json')
+
+        self.assertEqual(response.data['items'], {})
+        self.assertEqual(response.data['description'], 'Invalid Page Number')
+
     def test_item_details(self):
         # This test checks if the specific item is returned, it does this by checking if
         # receipt_id, price, and name match the database
@@ -173,17 +280,21 @@ class ItemsAPITest(APITransactionTestCase):
 
         original_item_count = Item.objects.count()
 
-        response = self.client.post(
-            reverse('add_item'),
-            data={
-                "user": self.user.id,
-                "receipt": self.receipt1.id,
-                "category_id": self.category1.id,
-                "name": "fun",
-                "price": 1.0
-            }, format='multipart')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                reverse('add_item'),
+                data={
+                    "user": self.user.id,
+                    "receipt": self.receipt1.id,
+                    "category_id": self.category1.id,
+                    "name": "fun",
+                    "price": 1.0
+                }, format='multipart')
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['category_id'], Rule.objects.get(regex="fun").category_id)
+        # The category of the rule is assigned by its id, only the given category is fetched to validate it
+        self.assertEqual(len([query for query in queries if 'FROM "category_category"' in query['sql']]), 1)
 
         self.assertTrue(Item.objects.filter(name="fun").exists())
 
@@ -314,6 +425,48 @@ class PaginationReceiptsAPITest(APITestCase):
         self.assertTrue(len(response.data['page_list']) == 0)
         self.assertEqual(response.data['description'], 'Invalid Page Number')
 
+    def test_cursor_pagination(self):
+        Item.objects.filter(user=self.user).delete()
+        receipts = [
+            Receipts.objects.create(user=self.user, merchant=Merchant.objects.create(name=name),
+                                    scan_date=make_aware(datetime.datetime(2022, 1, day)))
+            for name, day in [('costco', 1), ('walmart', 3), ('metro', 2)]
+        ]
+        for receipt in receipts:
+            for price in [1, 2]:
+                Item.objects.create(user=self.user, receipt=receipt, category_id=self.category1,
+                                    name=receipt.merchant.name, price=price)
+        Item.objects.create(user=self.user, receipt=receipts[2], category_id=None, name='metro', price=3)
+
+        url_paged_items = reverse('list_paged_items', kwargs={'pageNumber': 1, 'pageSize': 3})
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token.key)
+
+        page_list = []
+        response = self.client.get(url_paged_items, {'cursor': ''}, format='json')
+        self.assertIsNone(response.data['previous'])
+        page_list += response.data['page_list']
+        while response.data['next']:
+            response = self.client.get(url_paged_items, {'cursor': response.data['next']}, format='json')
+            self.assertEqual(response.data['total_price'], 12)
+            page_list += response.data['page_list']
+
+        # Items of the most recent receipts come first, with the details of their own receipt
+        self.assertEqual([item['name'] for item in page_list],
+                         ['walmart', 'walmart', 'metro', 'metro', 'metro', 'costco', 'costco'])
+        for item in page_list:
+            self.assertEqual(item['merchant_name'], item['name'])
+            self.assertEqual(item['category_name'], 'clothes' if item['category_id'] is not None else '')
+
+    def test_cursor_pagination_invalid_cursor(self):
+        url_paged_items = reverse('list_paged_items', kwargs={'pageNumber': 1, 'pageSize': 10})
+
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token.key)
+
+        response = self.client.get(url_paged_items, {'cursor': 'test'}, format='json')
+
+        self.assertTrue(len(response.data['page_list']) == 0)
+        self.assertEqual(response.data['description'], 'Invalid Cursor')
+
 
 class TestItemsFilteringOrderingSearching(APITestCase):
     def setUp(self):
@@ -548,6 +701,35 @@ class CategoryCostsAPITest(APITransactionTestCase):
         self.assertEqual(float(response.data['Costs'][1]['category_cost']),
                          self.coffee.price + self.tea.price)
 
+    def test_get_category_costs_in_one_query(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token.key)
+        for i in range(20):
+            Item.objects.create(user=self.user, receipt=self.receipt1, name='juice', category_id=self.category2, price=1)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('get_category_costs'), format='json')
+
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        # Authentication, the check for items and the report, whatever the number of items
+        self.assertLessEqual(len(queries), 3)
+        self.assertEqual([cost['category_name'] for cost in response.data['Costs']], ['clothes', 'drinks'])
+        self.assertEqual(float(response.data['Costs'][1]['category_cost']), 40.3)
+
+    def test_get_category_costs_with_receipt_without_scan_date(self):
+        # The items of receipts without a scan date are not rolled up, but they are still part of the costs
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token.key)
+        receipt = Receipts.objects.create(user=self.user, scan_date=None)
+        Item.objects.create(user=self.user, receipt=receipt, name='juice', category_id=self.category2, price=2)
+        category3 = Category.objects.create(user=self.user, category_name='snacks', parent_category_id=None)
+        Item.objects.create(user=self.user, receipt=receipt, name='chips', category_id=category3, price=3.5)
+
+        response = self.client.get(reverse('get_category_costs'), format='json')
+
+        self.assertEqual(
+            [(cost['category_name'], float(cost['category_cost'])) for cost in response.data['Costs']],
+            [('clothes', 10.15), ('drinks', 22.3), ('snacks', 3.5)]
+        )
+
 
 class ItemFrequencyAPITest(APITransactionTestCase):
     reset_sequences = True
@@ -688,6 +870,39 @@ class ItemFrequencyAPITest(APITransactionTestCase):
 
         self.assertEqual(response.data['Error'], "Item with this id does not exist")
 
+    def test_get_item_frequency_window(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token.key)
+        now = timezone.now()
+        recent_receipt = Receipts.objects.create(user=self.user, scan_date=now - datetime.timedelta(days=10))
+        old_receipt = Receipts.objects.create(user=self.user, scan_date=now - datetime.timedelta(days=100))
+        juice = Item.objects.create(user=self.user, receipt=recent_receipt, name='juice', price=2)
+        Item.objects.create(user=self.user, receipt=recent_receipt, name='juice', price=2)
+        Item.objects.create(user=self.user, receipt=old_receipt, name='juice', price=2)
+        url = reverse('get_item_frequency_month', kwargs={'item_id': juice.id})
+
+        response = self.client.get(url, format='json')
+        self.assertEqual(response.data['juice']['item_frequency'], 2)
+
+        response = self.client.get(url, {'days': 5}, format='json')
+        self.assertEqual(list(response.data)[0], "This item was not bought in this period")
+
+        response = self.client.get(url, {'days': 20}, format='json')
+        self.assertEqual(response.data['juice']['item_frequency'], 2)
+
+        response = self.client.get(url, {'months': 4}, format='json')
+        self.assertEqual(response.data['juice']['item_frequency'], 3)
+
+        response = self.client.get(url, {'month': old_receipt.scan_date.strftime('%Y-%m')}, format='json')
+        self.assertEqual(response.data['juice']['item_frequency'], 1)
+
+        response = self.client.get(url, {'month': '2022-13'}, format='json')
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+
+    def test_months_before(self):
+        self.assertEqual(months_before(datetime.date(2022, 3, 31), 1), datetime.date(2022, 2, 28))
+        self.assertEqual(months_before(datetime.date(2022, 1, 15), 1), datetime.date(2021, 12, 15))
+        self.assertEqual(months_before(datetime.date(2024, 5, 31), 3), datetime.date(2024, 2, 29))
+
 
 class CategoryCostsFrequencyAPITest(APITransactionTestCase):
     reset_sequences = True
@@ -800,3 +1015,79 @@ class CategoryCostsFrequencyAPITest(APITransactionTestCase):
         # since drinks is a starred category, we should only have the drinks price and frequency
         #  and not the clothes price and frequency. So we assert that the clothes category in None in the response data
         self.assertIsNone(response.data.get('clothes'))
+
+    def test_get_category_costs_frequency_outside_date_range(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token.key)
+        self.receipt_starbucks.save()
+
+        response = self.client.get(reverse('get_category_costs_frequency_date', kwargs={'days': 1}), format='json')
+
+        # The tea was bought two days ago, so only the coffee is counted
+        self.assertEqual(float(response.data['drinks']['price']), self.coffee.price)
+        self.assertEqual(response.data['drinks']['category_frequency'], 1)
+
+
+class SpendingRollupTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='therock123@gmail.com',
+            email='therock123@gmail.com',
+            first_name='The',
+            last_name='Rock',
+            password='wrestlingrules123'
+        )
+        self.receipt = Receipts.objects.create(user=self.user, scan_date=make_aware(datetime.datetime(2022, 3, 15)))
+        self.category = Category.objects.create(user=self.user, category_name='drinks')
+
+    def rollups(self, period=SpendingPeriod.DAY):
+        return list(SpendingRollup.objects.filter(user=self.user, period=period)
+                    .order_by('bucket', 'category_id').values_list('category_id', 'bucket', 'total', 'count'))
+
+    def test_rollups_follow_items(self):
+        coffee = Item.objects.create(user=self.user, receipt=self.receipt, category_id=self.category, name='coffee', price=2.5)
+        Item.objects.create(user=self.user, receipt=self.receipt, category_id=None, name='gum', price=1)
+
+        self.assertEqual(self.rollups(), [
+            (None, datetime.date(2022, 3, 15), Decimal('1'), 1),
+            (self.category.id, datetime.date(2022, 3, 15), Decimal('2.5'), 1),
+        ])
+        self.assertEqual(self.rollups(SpendingPeriod.MONTH)[1], (self.category.id, datetime.date(2022, 3, 1), Decimal('2.5'), 1))
+
+        coffee.price = 4
+        coffee.category_id = None
+        coffee.save()
+        self.assertEqual(self.rollups(), [(None, datetime.date(2022, 3, 15), Decimal('5'), 2)])
+
+        # Moving the receipt to another day moves its items
+        self.receipt.scan_date = make_aware(datetime.datetime(2022, 4, 2))
+        self.receipt.save()
+        self.assertEqual(self.rollups(), [(None, datetime.date(2022, 4, 2), Decimal('5'), 2)])
+        self.assertEqual(self.rollups(SpendingPeriod.MONTH), [(None, datetime.date(2022, 4, 1), Decimal('5'), 2)])
+
+        coffee.delete()
+        self.assertEqual(self.rollups(), [(None, datetime.date(2022, 4, 2), Decimal('1'), 1)])
+
+        self.receipt.delete()
+        self.assertEqual(self.rollups(), [])
+
+    def test_rebuild_spending_rollups(self):
+        Item.objects.create(user=self.user, receipt=self.receipt, category_id=self.category, name='coffee', price=2.5)
+        Item.objects.create(user=self.user, receipt=self.receipt, category_id=self.category, name='tea', price=1.5)
+        other_receipt = Receipts.objects.create(user=self.user, scan_date=make_aware(datetime.datetime(2022, 3, 20)))
+        Item.objects.create(user=self.user, receipt=other_receipt, category_id=None, name='gum', price=1)
+        day_rollups, month_rollups = self.rollups(), self.rollups(SpendingPeriod.MONTH)
+
+        # Changes made without signals are picked up by a rebuild
+        Item.objects.filter(name='gum').update(category_id=self.category)
+        call_command('rebuild_spending_rollups', user=self.user.id, stdout=StringIO())
+
+        self.assertEqual(self.rollups(), [
+            (self.category.id, datetime.date(2022, 3, 15), Decimal('4'), 2),
+            (self.category.id, datetime.date(2022, 3, 20), Decimal('1'), 1),
+        ])
+        self.assertEqual(self.rollups(SpendingPeriod.MONTH), [(self.category.id, datetime.date(2022, 3, 1), Decimal('5'), 3)])
+
+        # A rebuild gives the same rollups as the signals
+        Item.objects.filter(name='gum').update(category_id=None)
+        rebuild_spending_rollups(self.user)
+        self.assertEqual((self.rollups(), self.rollups(SpendingPeriod.MONTH)), (day_rollups, month_rollups))
@@ -4,6 +4,7 @@ from . import views
 urlpatterns = [
     path('items/', views.GetItemsAPI.as_view(), name='items'),  # Get items list and total cost
     path('items/add/', views.AddItemAPI.as_view(), name='add_item'),  # Add an item
+    path('items/add/batch/', views.AddItemsBatchAPI.as_view(), name='add_items_batch'),  # Add items to a receipt
     path('items/receipt/<int:receipt_id>/', views.ReceiptItemsAPI.as_view(), name='receipt_item_details'),  # Observe
     # details of items of a receipt
     path('items/<int:item_id>/', views.ItemDetailAPIView.as_view(), name='item_details'),  # Observe details of an item
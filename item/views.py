@@ -8,10 +8,16 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.status import HTTP_200_OK, HTTP_400_BAD_REQUEST
 from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import Sum
 
-from item.serializers import ItemSerializer, PutPatchItemSerializer
+from item.reports import category_costs, frequency_window, item_purchase_frequency, starred_category_costs_frequency
+from item.rollups import record_items
+from item.serializers import BatchItemSerializer, ItemSerializer, PutPatchItemSerializer
 from receipts.models import Receipts
-from rules.models import Rule
+from rules.engine import get_rule_engine
+from utility.cache import bump_user_cache_version
+from utility.pagination import InvalidCursor, keyset_paginate
 
 from .models import Item
 
@@ -28,19 +34,16 @@ class AddItemAPI(generics.CreateAPIView):
         if Receipts.objects.filter(id=request.data["receipt"]).exists():
 
             # if there's a rule that matches the item name, assign the rule category to the category of the item
-            rules = Rule.objects.filter(user=self.request.user)
-            if rules.exists():
-                for rule in rules:
-                    if rule.regex == serializer.validated_data['name']:
-                        serializer.validated_data['category_id'] = rule.category
-                        break
-
-            item = serializer.save()
+            category = serializer.validated_data.get('category_id')
+            category_id = get_rule_engine(self.request.user).categorize(
+                serializer.validated_data['name'], default=category.id if category is not None else None)
+
+            item = serializer.save(category_id_id=category_id)
             return Response({
                 "user": item.user.id,
                 "receipt": item.receipt.id,
                 "name": item.name,
-                "category_id": item.category_id.id if item.category_id is not None else item.category_id,
+                "category_id": item.category_id_id,
                 "price": item.price
             }, status=HTTP_200_OK)
         return Response({
@@ -48,6 +51,50 @@ class AddItemAPI(generics.CreateAPIView):
         }, HTTP_400_BAD_REQUEST)
 
 
+class AddItemsBatchAPI(generics.CreateAPIView):
+    """
+    Adds a list of items to a receipt of the user in a single request, e.g.
+    {"receipt": 1, "items": [{"name": "coffee", "price": 2.5, "category_id": 3}, {"name": "bagel", "price": 1.75}]}
+
+    The items are validated together and the categorization rules are applied to them, as for a single item. The
+    items are then inserted with one `bulk_create` in a single transaction, so either all of them are added or none.
+    """
+    serializer_class = BatchItemSerializer
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        rule_engine = get_rule_engine(request.user)
+        items = [
+            Item(
+                user=request.user,
+                receipt_id=serializer.validated_data['receipt'],
+                category_id_id=rule_engine.categorize(item['name'], default=item.get('category_id')),
+                name=item['name'],
+                price=item['price']
+            )
+            for item in serializer.validated_data['items']
+        ]
+
+        with transaction.atomic():
+            Item.objects.bulk_create(items)
+            record_items(items)
+            bump_user_cache_version(request.user.id)
+
+        return Response({
+            "receipt": serializer.validated_data['receipt'],
+            "items": [{
+                "id": item.id,
+                "user": item.user_id,
+                "name": item.name,
+                "category_id": item.category_id_id,
+                "price": item.price
+            } for item in items]
+        }, status=HTTP_200_OK)
+
+
 class ItemDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
     """ details for an item """
 
@@ -106,32 +153,56 @@ class DeleteItemAPI(generics.DestroyAPIView):
 class GetItemsAPI(generics.ListAPIView):
     """
     Gets list of items and the total cost of all items
+
+    The items can be paged with the optional `pageNumber` and `pageSize` query parameters, for example
+    url = 'api/items/?pageNumber=2&pageSize=100'. The total cost is always the cost of all the items.
     """
     serializer_class = ItemSerializer
     permission_classes = [IsAuthenticated]
 
     def get(self, request, *args, **kwargs):
         items = Item.objects.filter(user=self.request.user)
-        item_costs_dict = {}
-        item_total_cost = 0
+        item_total_cost = items.aggregate(total_cost=Sum('price'))['total_cost'] or 0
 
-        if items.exists():
-            for item in items:
-                item_costs_dict[item.id] = {'item': [item.user.id, item.name, item.price],
-                                            'receipt_details': [item.receipt.id, item.receipt.merchant.name,
-                                                                item.receipt.scan_date],
-                                            'category_details': [item.category_id.category_name,
-                                                                 item.category_id.parent_category_id] if item.category_id is not None else "Empty"}
-                item_total_cost += item.price
-            return Response({
-                "totalPrice": item_total_cost,
-                "items": item_costs_dict,
-            }, HTTP_200_OK)
+        # Only read the columns of the response, joined in a single query
+        rows = items.order_by('id').values_list(
+            'id', 'user_id', 'name', 'price', 'receipt_id', 'receipt__merchant__name', 'receipt__scan_date',
+            'category_id', 'category_id__category_name', 'category_id__parent_category_id'
+        )
+
+        page_details = {}
+        if 'pageNumber' in request.query_params:
+            try:
+                page_size = int(request.query_params.get('pageSize', 10))
+            except ValueError:
+                page_size = 10
+            paginator = Paginator(rows, page_size if page_size > 0 else 10)
+            try:
+                page = paginator.page(int(request.query_params['pageNumber']))
+            except Exception:
+                return Response({
+                    "totalPrice": item_total_cost,
+                    "items": {},
+                    "description": "Invalid Page Number"
+                }, HTTP_200_OK)
+            rows = page.object_list
+            page_details = {'current_page_number': page.number, 'number_of_pages': paginator.num_pages}
         else:
-            return Response({
-                "totalPrice": 0,
-                "items": item_costs_dict,
-            }, HTTP_200_OK)
+            # Stream the rows from the database instead of loading all of them at once
+            rows = rows.iterator(chunk_size=2000)
+
+        item_costs_dict = {}
+        for (item_id, user_id, name, price, receipt_id, merchant_name, scan_date,
+             category_id, category_name, parent_category_id) in rows:
+            item_costs_dict[item_id] = {'item': [user_id, name, price],
+                                        'receipt_details': [receipt_id, merchant_name, scan_date],
+                                        'category_details': [category_name,
+                                                             parent_category_id] if category_id is not None else "Empty"}
+        return Response({
+            "totalPrice": item_total_cost,
+            "items": item_costs_dict,
+            **page_details
+        }, HTTP_200_OK)
 
 
 class ReceiptItemsAPI(generics.ListAPIView):
@@ -180,83 +251,105 @@ class PaginateFilterItemsView(generics.ListAPIView):
     ordering_fields = '__all__'
     search_fields = ['name', 'price', 'user__first_name', 'user__last_name', 'category_id_id__category_name']
 
-    # noqa: C901
     def get(self, request, *args, **kwargs):
         """
-        Get the response from the super class which returns the entire list
-        and then paginate the results
+        Filter, order and count the items in the database and only fetch and serialize the requested page.
+        When a `cursor` query parameter is given (empty for the first page), keyset pagination is used instead.
         """
-        queryset = self.get_queryset()
-        item_list_response = super().get(request, *args, **kwargs)
-        item_total_price = 0
-
-        # Try to turn page number to an int value, otherwise make sure the response returns an empty list
-        try:
-            kwargs['pageNumber'] = int(kwargs['pageNumber'])
-        except Exception:
-            return Response({
-                'page_list': [],
-                'total': 0,
-                'total_price': item_total_price,
-                'description': "Invalid Page Number"
-            }, status=HTTP_200_OK)
-
         # Try to turn page size to an int value, otherwise set to default value of 10
         try:
             kwargs['pageSize'] = int(kwargs['pageSize'])
         except Exception:
             kwargs['pageSize'] = 10
 
-        # If Page size is less than zero, -> had to remove due to complexity issue.
         # If Page size is less than zero
         if kwargs['pageSize'] <= 0:
             # Make default page size = 10
             kwargs['pageSize'] = 10
 
-        paginator = Paginator(item_list_response.data, kwargs['pageSize'])
+        if 'cursor' in request.query_params:
+            return self.get_cursor_page(request, kwargs['pageSize'])
 
-        # If page number is greater than page limit, return an empty list
-        if kwargs['pageNumber'] > paginator.num_pages:
-            return Response({
-                'page_list': [],
-                'total': 0,
-                'total_price': item_total_price,
-                'description': "Invalid Page Number"
-            }, status=HTTP_200_OK)
+        # Try to turn page number to an int value, otherwise make sure the response returns an empty list
+        try:
+            kwargs['pageNumber'] = int(kwargs['pageNumber'])
+        except Exception:
+            return self.invalid_page_response("Invalid Page Number")
 
-        # If page number is less than 1, return an empty list
-        if kwargs['pageNumber'] <= 0:
-            return Response({
-                'page_list': [],
-                'total': 0,
-                'total_price': item_total_price,
-                'description': "Invalid Page Number"
-            }, status=HTTP_200_OK)
+        queryset = self.filter_queryset(self.get_queryset())
+        # Break ties of the requested ordering by id so rows do not move between pages
+        queryset = queryset.order_by(*queryset.query.order_by, 'id')
+        paginator = Paginator(queryset, kwargs['pageSize'])
 
-        page = paginator.page(kwargs['pageNumber'])
+        # If page number is greater than page limit or less than 1, return an empty list
+        if kwargs['pageNumber'] > paginator.num_pages or kwargs['pageNumber'] <= 0:
+            return self.invalid_page_response("Invalid Page Number")
 
-        # Append the scan date from the receipt into the page item in question
-        for i, item in zip(queryset, page.object_list):
-            item['scan_date'] = i.receipt.scan_date
-            item['merchant_name'] = i.receipt.merchant.name
-            item_total_price += float(item['price'])
-            if i.category_id is not None:
-                item['category_name'] = i.category_id.category_name
-            else:
-                item['category_name'] = ""
+        page = paginator.page(kwargs['pageNumber'])
+        page_list = self.serialize_items(page.object_list)
 
-        item_total_price = round(item_total_price, 2)
+        # The total price of a numbered page is the total of the items on that page
+        item_total_price = round(sum(float(item['price']) for item in page_list), 2)
         return Response({
-            'page_list': page.object_list,
-            'total': len(page.object_list),
+            'page_list': page_list,
+            'total': len(page_list),
             'total_price': item_total_price,
             'description': str(page),
             'current_page_number': page.number,
             'number_of_pages': page.paginator.num_pages
         }, status=HTTP_200_OK)
 
+    def get_cursor_page(self, request, page_size):
+        """
+        Keyset pagination from the item of the most recent receipt (by receipt scan_date, then id). The `next` and
+        `previous` tokens of the response are passed back as the `cursor` query parameter. The `ordering` query
+        parameter is ignored, and `total_price` is the total of all the items matching the filters.
+        """
+        queryset = self.get_queryset()
+        for backend in self.filter_backends:
+            if backend is not filters.OrderingFilter:
+                queryset = backend().filter_queryset(request, queryset, self)
+
+        try:
+            items, next_cursor, previous_cursor = keyset_paginate(
+                queryset, 'receipt__scan_date', request.query_params['cursor'], page_size
+            )
+        except InvalidCursor:
+            return self.invalid_page_response("Invalid Cursor")
+
+        page_list = self.serialize_items(items)
+        item_total_price = queryset.aggregate(total_price=Sum('price'))['total_price'] or 0
+        return Response({
+            'page_list': page_list,
+            'total': len(page_list),
+            'total_price': round(float(item_total_price), 2),
+            'next': next_cursor,
+            'previous': previous_cursor
+        }, status=HTTP_200_OK)
+
+    def serialize_items(self, items):
+        """Serialize a page of items along with the scan date, merchant name and category name of each item"""
+        page_list = self.get_serializer(items, many=True).data
+        for item, item_data in zip(items, page_list):
+            item_data['scan_date'] = item.receipt.scan_date
+            item_data['merchant_name'] = item.receipt.merchant.name if item.receipt.merchant is not None else ""
+            if item.category_id is not None:
+                item_data['category_name'] = item.category_id.category_name
+            else:
+                item_data['category_name'] = ""
+        return page_list
+
+    @staticmethod
+    def invalid_page_response(description):
+        return Response({
+            'page_list': [],
+            'total': 0,
+            'total_price': 0,
+            'description': description
+        }, status=HTTP_200_OK)
+
     def get_queryset(self):
-        return Item.objects.filter(user=self.request.user)
+        return Item.objects.filter(user=self.request.user).select_related('receipt__merchant', 'category_id').order_by('id')
 
 
 class GetCategoryCostsView(generics.ListAPIView):
@@ -264,27 +357,13 @@ class GetCategoryCostsView(generics.ListAPIView):
     permission_classes = (IsAuthenticated,)
 
     def get(self, request, *args, **kwargs):
-        # Get the list of Items
         items = self.get_queryset()
-        category_costs_dict = {}
-        category_costs_list = []
 
-        if items.exists():
-            for item in items:
-                if item.category_id.get_category_name() in category_costs_dict:
-                    category_costs_dict[item.category_id.get_category_name()] += item.price
-                else:
-                    category_costs_dict[item.category_id.get_category_name()] = item.price
-        else:
+        if not items.exists():
             return Response({"Response": "The user either has no items created or something went wrong"},
                             HTTP_400_BAD_REQUEST)
 
-        for key, value in category_costs_dict.items():
-            category_costs_list.append({
-                "category_name": key,
-                "category_cost": value
-            })
-        return Response({"Costs": category_costs_list}, status=HTTP_200_OK)
+        return Response({"Costs": category_costs(self.request.user)}, status=HTTP_200_OK)
 
     def get_queryset(self):
         return Item.objects.filter(user=self.request.user)
@@ -297,50 +376,30 @@ class GetItemFrequencyByMonthView(ItemDetailAPIView):
     receipts of that given user.
 
     The route used by this view is `items/<int:item_id>/date/` where `item_id` is the id of the item in question.
+    Another window can be given with one of these query parameters:
+    *   `?days=<N>` for the last N days
+    *   `?months=<N>` for the last N months
+    *   `?month=<YYYY-MM>` for a calendar month
     """
 
     def get(self, request, *args, **kwargs):
-        if kwargs.get('item_id'):
-            try:
-                item = self.get_queryset().get(id=kwargs.get('item_id'))
+        try:
+            item = self.get_queryset().get(id=kwargs.get('item_id'))
+        except Item.DoesNotExist:
+            return Response({"Error": "Item with this id does not exist"},
+                            status=HTTP_400_BAD_REQUEST)
 
-                # Additional query to get all the items that have the same name as the item in question
-                items = Item.objects.filter(name=item.name, user=self.request.user)
-                item_frequency_dict = {}
-
-                if items.exists():
-                    for item in items:
-                        # Find the receipt in which this item belongs to. This receipt contains
-                        # the date details of all the items and hence the receipt itself
-                        if (datetime.date.today().month == 3 and datetime.date.today().day == 29)\
-                                or (datetime.date.today().month == 3 and datetime.date.today().day == 30)\
-                                or (datetime.date.today().month == 3 and datetime.date.today().day == 31):
-                            date_range = datetime.date.today().replace(month=datetime.date.today().month - 1, day=28)
-                        else:
-                            date_range = datetime.date.today().replace(month=datetime.date.today().month - 1)
-
-                        # If the date of the receipt is within the date range,
-                        # then add the item/change its existing frequency found in
-                        # all receipts of the given user
-                        if date_range <= item.receipt.scan_date.date() <= datetime.date.today():
-                            if item.name in item_frequency_dict:
-                                item_frequency_dict[item.name] = {
-                                    'item_frequency': item_frequency_dict[item.name]['item_frequency'] + 1
-                                }
-                            else:
-                                item_frequency_dict[item.name] = {
-                                    'item_frequency': 1
-                                }
-
-                    if not item_frequency_dict:
-                        return Response({"This item was not bought in the last month"},
-                                        status=HTTP_200_OK)
-                    else:
-                        return Response(item_frequency_dict, status=HTTP_200_OK)
+        try:
+            start_date, end_date = frequency_window(request.query_params)
+        except ValueError as e:
+            return Response({"Error": str(e)}, status=HTTP_400_BAD_REQUEST)
 
-            except Item.DoesNotExist:
-                return Response({"Error": "Item with this id does not exist"},
-                                status=HTTP_400_BAD_REQUEST)
+        item_frequency = item_purchase_frequency(self.request.user, item.name, start_date, end_date)
+        if not item_frequency:
+            if any(window in request.query_params for window in ('days', 'months', 'month')):
+                return Response({"This item was not bought in this period"}, status=HTTP_200_OK)
+            return Response({"This item was not bought in the last month"}, status=HTTP_200_OK)
+        return Response({item.name: {'item_frequency': item_frequency}}, status=HTTP_200_OK)
 
     def get_queryset(self):
         return Item.objects.filter(user=self.request.user)
@@ -357,34 +416,11 @@ class GetCategoryCostAndFrequencyByDateAndStarredCategoryView(GetCategoryCostsVi
 
     def get(self, request, *args, **kwargs):
         items = self.get_queryset()
-        category_costs_frequency_dict = {}
 
-        if items.exists():
-            for item in items:
-                # Find the receipt in which this item belongs to
-                #  The receipt contains the date details of all the items and hence the receipt itself
-                #  item.receipt.scan_date
-                date_range = datetime.date.today() - datetime.timedelta(days=kwargs['days'])
-
-                # If the date of the receipt is within the date range and the category is stared,
-                #  then add the category/change the price of the category.
-                if item.receipt.scan_date.date() >= date_range and item.category_id.category_toggle_star:
-
-                    if item.category_id.get_category_name() in category_costs_frequency_dict:
-                        category_costs_frequency_dict[item.category_id.get_category_name()] = {
-                            'price': category_costs_frequency_dict[item.category_id.get_category_name()][
-                                         'price'] + item.price,
-                            'category_frequency': category_costs_frequency_dict[item.category_id.get_category_name()][
-                                                      'category_frequency'] + 1
-                        }
-
-                    else:
-                        category_costs_frequency_dict[item.category_id.get_category_name()] = {
-                            'price': item.price,
-                            'category_frequency': 1
-                        }
-        else:
+        if not items.exists():
             return Response({"Response": "The user either has no items created or something went wrong"},
                             HTTP_400_BAD_REQUEST)
 
-        return Response(category_costs_frequency_dict, status=HTTP_200_OK)
+        # Only the items of starred categories on receipts scanned within the last `days` days are counted
+        date_range = datetime.date.today() - datetime.timedelta(days=kwargs['days'])
+        return Response(starred_category_costs_frequency(self.request.user, date_range), status=HTTP_200_OK)
@@ -0,0 +1,72 @@
+# Generated by Django 4.1.1 on 2026-10-18 08:57
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def copy_participants(apps, schema_editor):
+    """Create a participant for each user id of the comma-separated strings, skipping ids of missing users"""
+    ItemSplit = apps.get_model('item_split', 'ItemSplit')
+    ItemSplitParticipant = apps.get_model('item_split', 'ItemSplitParticipant')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    user_ids = set(User.objects.values_list('id', flat=True))
+
+    participants = []
+    for split in ItemSplit.objects.all().iterator():
+        seen = set()
+        for user_id in split.shared_user_ids.split(','):
+            try:
+                user_id = int(user_id)
+            except ValueError:
+                continue
+            if user_id in user_ids and user_id not in seen:
+                seen.add(user_id)
+                participants.append(ItemSplitParticipant(split_id=split.id, user_id=user_id, amount=split.shared_amount))
+    ItemSplitParticipant.objects.bulk_create(participants, batch_size=1000)
+
+
+def copy_participants_back(apps, schema_editor):
+    ItemSplit = apps.get_model('item_split', 'ItemSplit')
+    for split in ItemSplit.objects.prefetch_related('participants').iterator(chunk_size=1000):
+        participants = sorted(split.participants.all(), key=lambda participant: participant.id)
+        split.shared_user_ids = ', '.join(str(participant.user_id) for participant in participants)
+        split.save(update_fields=['shared_user_ids'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('item_split', '0001_squashed_0006_alter_itemsplit_item'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ItemSplitParticipant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=18)),
+                ('split', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='participants', to='item_split.itemsplit')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shared_item_splits', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='itemsplitparticipant',
+            constraint=models.UniqueConstraint(fields=('split', 'user'), name='item_split_participant_unique'),
+        ),
+        migrations.RunPython(copy_participants, copy_participants_back),
+        # Give the removed column a default, so that it can be added back to existing rows when unapplying
+        migrations.AlterField(
+            model_name='itemsplit',
+            name='shared_user_ids',
+            field=models.CharField(default='', max_length=100),
+        ),
+        migrations.RemoveField(
+            model_name='itemsplit',
+            name='shared_user_ids',
+        ),
+    ]
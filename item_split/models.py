@@ -1,3 +1,4 @@
+from django.contrib.auth.models import User
 from django.db import models
 from item.models import Item
 
@@ -8,6 +9,26 @@ class ItemSplit(models.Model):
     """
 
     item = models.OneToOneField(Item, related_name='item_user', on_delete=models.DO_NOTHING)
-    shared_user_ids = models.CharField(max_length=100)
     is_shared_with_item_user = models.BooleanField(default=False)
     shared_amount = models.DecimalField(max_digits=18, decimal_places=2, default=0.00)
+
+    @property
+    def shared_user_ids(self):
+        """Comma-separated ids of the users the item is shared with, in the order they were given"""
+        return ','.join(str(participant.user_id) for participant in self.participants.all())
+
+
+class ItemSplitParticipant(models.Model):
+    """
+    A user an item is shared with, and the amount of the item they pay.
+    """
+
+    split = models.ForeignKey(ItemSplit, related_name='participants', on_delete=models.CASCADE)
+    user = models.ForeignKey(User, related_name='shared_item_splits', on_delete=models.CASCADE)
+    amount = models.DecimalField(max_digits=18, decimal_places=2)
+
+    class Meta:
+        ordering = ['id']
+        constraints = [
+            models.UniqueConstraint(fields=['split', 'user'], name='item_split_participant_unique'),
+        ]
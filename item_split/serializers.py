@@ -1,7 +1,41 @@
+from django.db import transaction
 from rest_framework import serializers
 
 from item.models import Item
-from .models import ItemSplit
+from ledger.balances import record_participants
+from .models import ItemSplit, ItemSplitParticipant
+
+
+def create_item_splits(splits):
+    """
+    Create an ItemSplit for each (item, shared user ids, is shared with item user), dividing the price of the item
+    between its users. The splits and their participants are inserted with one `bulk_create` each, in a single
+    transaction, so either all the items are split or none.
+    """
+    item_splits = []
+    for item, shared_user_ids, is_shared_with_item_user in splits:
+        num_to_divide_by = len(shared_user_ids)
+
+        if is_shared_with_item_user:
+            num_to_divide_by += 1
+
+        item_splits.append(ItemSplit(
+            shared_amount=round(item.price / num_to_divide_by, 2),
+            is_shared_with_item_user=is_shared_with_item_user,
+            item=item
+        ))
+
+    with transaction.atomic():
+        ItemSplit.objects.bulk_create(item_splits)
+        participants = ItemSplitParticipant.objects.bulk_create([
+            ItemSplitParticipant(split=item_split, user_id=user_id, amount=item_split.shared_amount)
+            for item_split, (item, shared_user_ids, is_shared_with_item_user) in zip(item_splits, splits)
+            for user_id in shared_user_ids
+        ])
+        # Each shared user owes their share to the user of the item
+        record_participants(participants)
+
+    return item_splits
 
 
 class ItemSplitSerializer(serializers.ModelSerializer):
@@ -10,6 +44,7 @@ class ItemSplitSerializer(serializers.ModelSerializer):
     of the list of user ids splitting the item
     """
     item_id = serializers.IntegerField(source='item.id')
+    shared_user_ids = serializers.CharField()
 
     class Meta:
         model = ItemSplit
@@ -24,19 +59,8 @@ class ItemSplitSerializer(serializers.ModelSerializer):
         return super().to_internal_value(data)
 
     def create(self, validated_data):
-        item_id = validated_data.pop('item')['id']
-        num_to_divide_by = len(validated_data['shared_user_ids'].split(','))
-
-        if validated_data['is_shared_with_item_user']:
-            num_to_divide_by += 1
-
-        shared_amount = Item.objects.get(id=item_id).price / num_to_divide_by
-
-        item_split = ItemSplit.objects.create(
-            shared_user_ids=validated_data['shared_user_ids'],
-            shared_amount=shared_amount,
-            is_shared_with_item_user=validated_data['is_shared_with_item_user'],
-            item_id=item_id
-        )
-
-        return item_split
+        item = Item.objects.get(id=validated_data['item']['id'])
+        shared_user_ids = list(map(int, validated_data['shared_user_ids'].split(',')))
+        return create_item_splits([
+            (item, shared_user_ids, validated_data.get('is_shared_with_item_user', False))
+        ])[0]
@@ -1,9 +1,12 @@
 import os
 
 from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework.status import HTTP_201_CREATED, HTTP_400_BAD_REQUEST, HTTP_200_OK, HTTP_404_NOT_FOUND
 from item.models import Item
-from item_split.models import ItemSplit
+from item_split.models import ItemSplit, ItemSplitParticipant
+from ledger.models import Balance
 from users.models import UserProfile
 from merchant.models import Merchant
 from receipts.models import Receipts
@@ -102,6 +105,69 @@ class ItemSplitAPITestCase(APITestCase):
         self.assertEqual(response.status_code, HTTP_201_CREATED)
         self.assertEqual(response.data[0]['item_id'], self.item2.pk)
         self.assertEqual(response.data[0]['shared_user_ids'], f'{self.user2.pk}, {self.user3.pk}')
+        # Each shared user is a participant of the split
+        item_split = ItemSplit.objects.get(item=self.item2)
+        self.assertEqual(list(item_split.participants.values_list('user_id', flat=True)), [self.user2.pk, self.user3.pk])
+        self.assertEqual(item_split.shared_user_ids, f'{self.user2.pk},{self.user3.pk}')
+        self.assertTrue(all(participant.amount == item_split.shared_amount for participant in item_split.participants.all()))
+
+    def test_add_item_split_batch(self):
+        items = [Item.objects.create(user=self.user1, receipt=self.receipt, name=f'cookie {i}', price=3) for i in range(6)]
+
+        def add_item_splits(items):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(
+                    self.url_add_item_split,
+                    data={'item_list': [{
+                        'item_id': item.pk,
+                        'shared_user_ids': f'{self.user2.pk}, {self.user3.pk}',
+                        'is_shared_with_item_user': True} for item in items]
+                    },
+                    format='json'
+                )
+            self.assertEqual(response.status_code, HTTP_201_CREATED)
+            return response, queries
+
+        response, queries = add_item_splits(items[:1])
+        self.assertEqual(ItemSplit.objects.get(item=items[0]).shared_amount, 1)
+
+        # The users, the items and the splits are read and written with the same queries however many items are split
+        response, queries = add_item_splits(items[1:3])
+        self.assertEqual([item_split['item']['item_id'] for item_split in response.data], [items[1].pk, items[2].pk])
+        response, more_queries = add_item_splits(items[3:])
+        self.assertEqual(len(response.data), 3)
+        self.assertEqual(len(more_queries), len(queries))
+
+    def test_add_item_split_batch_is_atomic(self):
+        ItemSplit.objects.create(item=self.item2)
+
+        response = self.client.post(
+            self.url_add_item_split,
+            data={'item_list': [
+                {'item_id': self.item.pk, 'shared_user_ids': f'{self.user2.pk}', 'is_shared_with_item_user': True},
+                {'item_id': self.item2.pk, 'shared_user_ids': f'{self.user2.pk}', 'is_shared_with_item_user': True},
+            ]},
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['message'], "Item is already split.")
+        # The first item was not split either
+        self.assertFalse(ItemSplit.objects.filter(item=self.item).exists())
+
+    def test_add_item_split_of_another_user(self):
+        # Only the owner of an item can split it, otherwise any user could create debts between other users
+        item = Item.objects.create(user=self.user2, receipt=self.receipt, name='muffin', price=5)
+
+        response = self.client.post(
+            self.url_add_item_split,
+            data={'item_list': [{'item_id': item.pk, 'shared_user_ids': f'{self.user3.pk}'}]},
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+        self.assertFalse(ItemSplit.objects.exists())
+        self.assertFalse(Balance.objects.exists())
 
     def test_add_item_split_invalid_users(self):
         response = self.client.post(
@@ -158,11 +224,14 @@ class ItemSplitAPITestCase(APITestCase):
 
     def test_get_shared_user_list_invalid_id(self):
         # Create a new ItemSplit object
-        ItemSplit.objects.create(
+        item_split = ItemSplit.objects.create(
             item=self.item,
-            shared_user_ids=f'{self.user2.pk}, {self.user3.pk}',
             is_shared_with_item_user=False
         )
+        ItemSplitParticipant.objects.bulk_create([
+            ItemSplitParticipant(split=item_split, user=self.user2, amount=0),
+            ItemSplitParticipant(split=item_split, user=self.user3, amount=0),
+        ])
 
         # The url using kwargs item_id with invalid id number e.g. 100
         self.url_shared_users_list = reverse('get_user_list', kwargs={'item_id': 100})
@@ -236,11 +305,14 @@ class ItemSplitAPITestCase(APITestCase):
         self.assertEqual(response.status_code, HTTP_404_NOT_FOUND)
 
     def test_get_shared_amount_list_pass(self):
-        ItemSplit.objects.create(
+        item_split = ItemSplit.objects.create(
             item=self.item,
-            shared_user_ids=f'{self.user2.pk}, {self.user3.pk}',
             is_shared_with_item_user=False
         )
+        ItemSplitParticipant.objects.bulk_create([
+            ItemSplitParticipant(split=item_split, user=self.user2, amount=0),
+            ItemSplitParticipant(split=item_split, user=self.user3, amount=0),
+        ])
         # Make a Get request
         _url = reverse('get_shared_amount_list', args=[self.receipt.id])
         response = self.client.get(_url, format='json')
@@ -248,3 +320,36 @@ class ItemSplitAPITestCase(APITestCase):
         self.assertEqual(response.status_code, HTTP_200_OK)
         # Assert data\
         self.assertTrue(len(response.data['data']) >= 1)
+
+    def test_get_shared_amount_list_shared_with_item_user(self):
+        def split(item):
+            item_split = ItemSplit.objects.create(item=item, is_shared_with_item_user=True, shared_amount=1)
+            ItemSplitParticipant.objects.bulk_create([
+                ItemSplitParticipant(split=item_split, user=self.user3, amount=1),
+                ItemSplitParticipant(split=item_split, user=self.user2, amount=1),
+                ItemSplitParticipant(split=item_split, user=self.user1, amount=1),
+            ])
+            return item_split
+
+        item_split = split(self.item)
+        _url = reverse('get_shared_amount_list', args=[self.receipt.id])
+        # Warm up, so that the measurements do not depend on whether the token was cached
+        self.client.get(_url, format='json')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(_url, format='json')
+
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(response.data['data'][0]['splititem'], [
+            {'split_id': item_split.id, 'original_user': 'John', 'shared_user': 'Billy'},
+            {'split_id': item_split.id, 'original_user': 'John', 'shared_user': 'Bat'},
+        ])
+        # Items that are not split have no shared users
+        self.assertEqual(response.data['data'][1]['splititem'], [])
+
+        # The number of queries does not depend on the number of items
+        for _ in range(5):
+            split(Item.objects.create(user=self.user1, receipt=self.receipt, name='cookie', price=2))
+        with CaptureQueriesContext(connection) as more_queries:
+            response = self.client.get(_url, format='json')
+        self.assertEqual(len(response.data['data']), 7)
+        self.assertEqual(len(more_queries), len(queries))
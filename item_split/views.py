@@ -6,15 +6,41 @@ from rest_framework.status import HTTP_200_OK, HTTP_201_CREATED, HTTP_400_BAD_RE
 from item.models import Item
 
 
-from .serializers import ItemSplitSerializer
+from .serializers import ItemSplitSerializer, create_item_splits
 
-from .models import ItemSplit
+from .models import ItemSplit, ItemSplitParticipant
 
 from users.models import User
 
 from rest_framework.decorators import api_view, permission_classes
 
-from django.contrib.auth.models import User as DjangoBaseUser
+from django.db import IntegrityError
+from django.db.models import Prefetch
+
+
+def validate_shared_user_ids(item_splits_data):
+    """
+    Parse the `shared_user_ids` of each item of an AddItemSplitAPI request and check that the users exist, with a
+    single query for all the items. Returns the lists of user ids, and the error response to send back or None.
+    """
+    user_ids_lists = []
+    for item_data in item_splits_data:
+        try:
+            user_ids_list = list(map(int, item_data['shared_user_ids'].split(',')))
+        except Exception:
+            return None, Response({"message": "Invalid list of user IDs. Please enter numbers separated by commas."},
+                                  status=HTTP_400_BAD_REQUEST)
+
+        if len(set(user_ids_list)) != len(user_ids_list):
+            return None, Response({"message": "List of user IDs contains duplicates."},
+                                  status=HTTP_400_BAD_REQUEST)
+        user_ids_lists.append(user_ids_list)
+
+    user_ids = set().union(*user_ids_lists)
+    if User.objects.filter(id__in=user_ids).count() != len(user_ids):
+        return None, Response({"message": "List of users do not exist."}, status=HTTP_400_BAD_REQUEST)
+
+    return user_ids_lists, None
 
 
 class AddItemSplitAPI(generics.ListCreateAPIView):
@@ -22,6 +48,8 @@ class AddItemSplitAPI(generics.ListCreateAPIView):
     Adds item to a receipt for a user
     The list of shared user IDs are a string that represents the list of user IDs (List of integers).
     Therefore, the list must be separated by commas.
+    The items of `item_list` are validated together, with one query for all the users and one for all the items,
+    then split in a single transaction, so either all of them are split or none.
     """
     serializer_class = ItemSplitSerializer
     permission_classes = [IsAuthenticated]
@@ -29,34 +57,44 @@ class AddItemSplitAPI(generics.ListCreateAPIView):
 
     def post(self, request, *args, **kwargs):
         item_splits_data = request.data.get('item_list')
-        responses = []
-
-        for item_data in item_splits_data:
-            try:
-                user_ids_list = list(map(int, item_data['shared_user_ids'].split(',')))
-            except Exception:
-                return Response({"message": "Invalid list of user IDs. Please enter numbers separated by commas."},
-                                status=HTTP_400_BAD_REQUEST)
-
-            user_ids_list_as_set = set(user_ids_list)
-            if len(user_ids_list_as_set) != len(user_ids_list):
-                return Response({"message": "List of user IDs contains duplicates."},
-                                status=HTTP_400_BAD_REQUEST)
-
-            for user_id in user_ids_list:
-                if User.objects.filter(id=user_id).exists() is not True:
-                    return Response({"message": "List of users do not exist."}, status=HTTP_400_BAD_REQUEST)
-            serializer = self.serializer_class(data=item_data)
-            serializer.is_valid(raise_exception=True)
-            serializer.save()
-            response_data = serializer.data
-            item_response = Item.objects.get(id=response_data['item_id'])
-            response_data['item'] = {
-                "item_id": item_response.pk,
-                "item_name": item_response.name,
-                "item_price": item_response.price
+        if not isinstance(item_splits_data, list):
+            return Response({"message": "item_list is not a list."}, status=HTTP_400_BAD_REQUEST)
+
+        user_ids_lists, error_response = validate_shared_user_ids(item_splits_data)
+        if error_response is not None:
+            return error_response
+
+        serializer = self.get_serializer(data=item_splits_data, many=True)
+        serializer.is_valid(raise_exception=True)
+
+        item_ids = [item_data['item']['id'] for item_data in serializer.validated_data]
+        if len(set(item_ids)) != len(item_ids):
+            return Response({"message": "List of items contains duplicates."}, status=HTTP_400_BAD_REQUEST)
+        # Only the owner of an item can split it, since the split creates debts in the ledger (see ledger.balances)
+        items = Item.objects.filter(user=request.user).in_bulk(item_ids)
+        if len(items) != len(item_ids):
+            return Response({"message": "Item does not exist."}, status=HTTP_400_BAD_REQUEST)
+
+        try:
+            item_splits = create_item_splits([
+                (items[item_id], user_ids_list, item_data.get('is_shared_with_item_user', False))
+                for item_id, user_ids_list, item_data in zip(item_ids, user_ids_lists, serializer.validated_data)
+            ])
+        except IntegrityError:
+            return Response({"message": "Item is already split."}, status=HTTP_400_BAD_REQUEST)
+
+        responses = [{
+            'item_id': item_split.item.pk,
+            # The user ids are sent back as they were given
+            'shared_user_ids': item_data['shared_user_ids'],
+            'is_shared_with_item_user': item_split.is_shared_with_item_user,
+            'id': item_split.id,
+            'item': {
+                "item_id": item_split.item.pk,
+                "item_name": item_split.item.name,
+                "item_price": item_split.item.price
             }
-            responses.append(response_data)
+        } for item_split, item_data in zip(item_splits, serializer.validated_data)]
 
         return Response(responses, status=HTTP_201_CREATED)
 
@@ -83,11 +121,8 @@ class GetSharedUsersList(generics.GenericAPIView):
                 'message': f"ItemSplit object with item id of '{kwargs['item_id']}' does not exist"
             }, status=HTTP_400_BAD_REQUEST)
 
-        # Create the list of user ids from the string list
-        user_id_list = list(map(int, item_split.shared_user_ids.split(',')))
-
         # Create a list of shared_users by first name of the user (frontend needs chips with first name)
-        user_first_name_list = [User.objects.get(id=user_id).first_name for user_id in user_id_list]
+        user_first_name_list = list(item_split.participants.values_list('user__first_name', flat=True))
         return Response({
             "original_user": item_split.item.user.first_name,  # From the item object, get the user
             "shared_users": user_first_name_list,
@@ -125,26 +160,32 @@ class GetSharedAmount(generics.GenericAPIView):
 @permission_classes([IsAuthenticated])
 def get_share_amount_list(request, receipt_id):
     """
-    item = get_object_or_404(Item, id=item_id)
+    The items of a receipt, each with the users it is shared with (other than the user of the item) when it is
+    also shared with the user of the item. The items, their splits and their users are read in one query, and the
+    shared users of all the splits in a second one.
     """
+    items = (
+        Item.objects.filter(receipt__id=receipt_id)
+        .select_related('user', 'item_user')
+        .prefetch_related(Prefetch('item_user__participants',
+                                   queryset=ItemSplitParticipant.objects.select_related('user').order_by('user_id')))
+        .order_by('id')
+    )
     data_list = []
-    for item in Item.objects.filter(receipt__id=receipt_id):
-        data = {'item_id': item.id, 'item_name': item.name, 'item_price': item.price, 'user_id': item.user.id,
-                'receipt_id': item.receipt.id, 'splititem': []}
+    for item in items:
+        data = {'item_id': item.id, 'item_name': item.name, 'item_price': item.price, 'user_id': item.user_id,
+                'receipt_id': item.receipt_id, 'splititem': []}
         try:
             split = item.item_user
-            shared_user_ids = split.shared_user_ids.split(',')
-            shared_user_ids = [int(i) for i in shared_user_ids]
-            shared_users = DjangoBaseUser.objects.filter(id__in=shared_user_ids)
-            for user in shared_users:
-                if split.is_shared_with_item_user:
-                    if user.id != item.user.id:
-                        data['splititem'].append({
-                            'split_id': split.id,
-                            'original_user': item.user.first_name,
-                            'shared_user': user.first_name})
-        except Exception:
-            pass
+        except ItemSplit.DoesNotExist:
+            split = None
+        if split is not None and split.is_shared_with_item_user:
+            for participant in split.participants.all():
+                if participant.user_id != item.user_id:
+                    data['splititem'].append({
+                        'split_id': split.id,
+                        'original_user': item.user.first_name,
+                        'shared_user': participant.user.first_name})
         data_list.append(data)
     if not data_list:
         _status = HTTP_404_NOT_FOUND
@@ -0,0 +1,9 @@
+from django.contrib import admin
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    '''To view background jobs in django admin page'''
+    list_display = ('id', 'task', 'user', 'status', 'attempts', 'run_at', 'finished_at')
+    list_filter = ('status', 'task')
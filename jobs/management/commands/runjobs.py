@@ -0,0 +1,37 @@
+import multiprocessing
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from jobs.queue import default_worker_id, work
+
+
+def _work_in_child(burst, poll_interval):
+    work(default_worker_id(), burst=burst, poll_interval=poll_interval)
+
+
+class Command(BaseCommand):
+    help = 'Run background jobs (receipt analysis, etc.) from the database queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=1, help='Number of worker processes to start')
+        parser.add_argument('--burst', action='store_true', help='Exit once the queue is empty')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds to wait between polls when the queue is empty')
+
+    def handle(self, *args, **options):
+        if options['workers'] <= 1:
+            processed = work(burst=options['burst'], poll_interval=options['poll_interval'])
+            self.stdout.write(f'Processed {processed} job(s)')
+            return
+
+        # Child processes must open their own database connections
+        connections.close_all()
+        processes = [
+            multiprocessing.Process(target=_work_in_child, args=(options['burst'], options['poll_interval']))
+            for _ in range(options['workers'])
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
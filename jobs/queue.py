@@ -0,0 +1,122 @@
+import datetime
+import os
+import socket
+import time
+import traceback
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+
+def enqueue(task, user=None, max_attempts=3, run_at=None, **kwargs):
+    """
+    Add a job to the queue, due at `run_at` (now by default). `task` is the dotted path of a function taking the
+    job as its first argument, followed by `kwargs` (which must be JSON serializable).
+
+    The job row is written in the caller's transaction, so it only becomes visible to workers once that
+    transaction commits.
+    """
+    return Job.objects.create(task=task, user=user, max_attempts=max_attempts, run_at=run_at or timezone.now(),
+                              kwargs=kwargs)
+
+
+def default_worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def claim(worker_id):
+    """
+    Lock and return the next due job, or None if there is nothing to do.
+
+    Rows locked by another worker are skipped, so any number of workers can poll the same table. Jobs left
+    running by a worker that died are picked up again once their lock is older than JOBS_LOCK_TIMEOUT.
+    """
+    now = timezone.now()
+    stale = now - datetime.timedelta(seconds=settings.JOBS_LOCK_TIMEOUT)
+
+    with transaction.atomic():
+        job = Job.objects.select_for_update(skip_locked=True).filter(
+            Q(status=Job.Status.QUEUED, run_at__lte=now) | Q(status=Job.Status.RUNNING, locked_at__lt=stale)
+        ).order_by('run_at', 'id').first()
+
+        if job is None:
+            return None
+
+        job.status = Job.Status.RUNNING
+        job.locked_by = worker_id
+        job.locked_at = now
+        job.attempts += 1
+        job.save(update_fields=['status', 'locked_by', 'locked_at', 'attempts'])
+    return job
+
+
+def heartbeat(job, result=None):
+    """
+    Refresh the lock of a running job, and save its progress in `result` if given. Jobs that can run longer than
+    JOBS_LOCK_TIMEOUT call it regularly, otherwise they are claimed again as stale and run twice at once.
+    """
+    job.locked_at = timezone.now()
+    update_fields = ['locked_at']
+    if result is not None:
+        job.result = result
+        update_fields.append('result')
+    job.save(update_fields=update_fields)
+
+
+def backoff(attempts):
+    """Seconds to wait before retrying a job that failed `attempts` times"""
+    return settings.JOBS_RETRY_BACKOFF * 2 ** (attempts - 1)
+
+
+def run(job):
+    """Run a claimed job and record its outcome. Returns True if the job succeeded."""
+    try:
+        result = import_string(job.task)(job, **job.kwargs)
+    except Exception:
+        job.last_error = traceback.format_exc()
+        job.locked_by = ''
+        job.locked_at = None
+
+        # Put the job back in the queue until it runs out of attempts
+        if job.attempts < job.max_attempts:
+            job.status = Job.Status.QUEUED
+            job.run_at = timezone.now() + datetime.timedelta(seconds=backoff(job.attempts))
+        else:
+            job.status = Job.Status.FAILED
+            job.finished_at = timezone.now()
+
+        job.save(update_fields=['status', 'run_at', 'last_error', 'locked_by', 'locked_at', 'finished_at'])
+        return False
+
+    job.status = Job.Status.SUCCEEDED
+    job.result = result
+    job.locked_by = ''
+    job.locked_at = None
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'result', 'locked_by', 'locked_at', 'finished_at'])
+    return True
+
+
+def work(worker_id=None, burst=False, poll_interval=1.0):
+    """
+    Claim and run jobs until interrupted. With `burst`, return as soon as the queue is empty instead of
+    polling for new jobs. Returns the number of jobs processed.
+    """
+    worker_id = worker_id or default_worker_id()
+    processed = 0
+
+    while True:
+        job = claim(worker_id)
+        if job is None:
+            if burst:
+                return processed
+            time.sleep(poll_interval)
+            continue
+
+        run(job)
+        processed += 1
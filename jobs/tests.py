@@ -0,0 +1,147 @@
+import datetime
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from jobs.models import Job
+from jobs.queue import claim, enqueue, heartbeat, run, work
+from users.authentication import BearerToken
+
+
+def add_numbers(job, a, b):
+    return {'sum': a + b}
+
+
+def raise_error(job):
+    raise ValueError('Something went wrong')
+
+
+class JobQueueTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='johncena123@gmail.com',
+            email='johncena123@gmail.com',
+            first_name='John',
+            last_name='Cena',
+            password='wrestlingrules123'
+        )
+
+    def test_enqueue(self):
+        job = enqueue('jobs.tests.add_numbers', user=self.user, a=1, b=2)
+
+        self.assertEqual(job.status, Job.Status.QUEUED)
+        self.assertEqual(job.kwargs, {'a': 1, 'b': 2})
+        self.assertEqual(job.user, self.user)
+
+    def test_claim_locks_job(self):
+        job = enqueue('jobs.tests.add_numbers', a=1, b=2)
+
+        claimed = claim('worker-1')
+        self.assertEqual(claimed.id, job.id)
+        self.assertEqual(claimed.status, Job.Status.RUNNING)
+        self.assertEqual(claimed.locked_by, 'worker-1')
+        self.assertEqual(claimed.attempts, 1)
+
+        # A running job is not handed to a second worker
+        self.assertIsNone(claim('worker-2'))
+
+    def test_claim_skips_jobs_not_due(self):
+        enqueue('jobs.tests.add_numbers', a=1, b=2)
+        Job.objects.update(run_at=timezone.now() + datetime.timedelta(minutes=5))
+
+        self.assertIsNone(claim('worker-1'))
+
+    @override_settings(JOBS_LOCK_TIMEOUT=60)
+    def test_claim_recovers_stale_job(self):
+        enqueue('jobs.tests.add_numbers', a=1, b=2)
+        claim('worker-1')
+        Job.objects.update(locked_at=timezone.now() - datetime.timedelta(minutes=5))
+
+        claimed = claim('worker-2')
+        self.assertEqual(claimed.locked_by, 'worker-2')
+        self.assertEqual(claimed.attempts, 2)
+
+    @override_settings(JOBS_LOCK_TIMEOUT=60)
+    def test_heartbeat_keeps_long_job_locked(self):
+        enqueue('jobs.tests.add_numbers', a=1, b=2)
+        job = claim('worker-1')
+        Job.objects.update(locked_at=timezone.now() - datetime.timedelta(minutes=5))
+
+        heartbeat(job, {'done': 1})
+
+        # The job is still running, so it is not claimed again
+        self.assertIsNone(claim('worker-2'))
+        job.refresh_from_db()
+        self.assertEqual(job.locked_by, 'worker-1')
+        self.assertEqual(job.result, {'done': 1})
+
+    def test_run_successful_job(self):
+        enqueue('jobs.tests.add_numbers', a=1, b=2)
+
+        self.assertTrue(run(claim('worker-1')))
+
+        job = Job.objects.get()
+        self.assertEqual(job.status, Job.Status.SUCCEEDED)
+        self.assertEqual(job.result, {'sum': 3})
+        self.assertIsNotNone(job.finished_at)
+
+    def test_failed_job_is_retried(self):
+        enqueue('jobs.tests.raise_error', max_attempts=2)
+
+        self.assertFalse(run(claim('worker-1')))
+
+        job = Job.objects.get()
+        self.assertEqual(job.status, Job.Status.QUEUED)
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn('Something went wrong', job.last_error)
+
+        # Once the job runs out of attempts it is marked as failed
+        Job.objects.update(run_at=timezone.now())
+        self.assertFalse(run(claim('worker-1')))
+
+        job = Job.objects.get()
+        self.assertEqual(job.status, Job.Status.FAILED)
+        self.assertEqual(job.attempts, 2)
+
+    def test_work_in_burst_mode(self):
+        enqueue('jobs.tests.add_numbers', a=1, b=2)
+        enqueue('jobs.tests.add_numbers', a=3, b=4)
+
+        self.assertEqual(work(burst=True), 2)
+        self.assertEqual(Job.objects.filter(status=Job.Status.SUCCEEDED).count(), 2)
+
+
+class JobStatusAPITest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='johncena123@gmail.com',
+            email='johncena123@gmail.com',
+            first_name='John',
+            last_name='Cena',
+            password='wrestlingrules123'
+        )
+        self.token = BearerToken.objects.create(user=self.user)
+
+    def test_get_job_status(self):
+        job = enqueue('jobs.tests.add_numbers', user=self.user, a=1, b=2)
+        work(burst=True)
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token.key)
+
+        response = self.client.get(reverse('job_status', kwargs={'job_id': job.id}))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], Job.Status.SUCCEEDED)
+        self.assertEqual(response.data['result'], {'sum': 3})
+
+    def test_get_job_status_of_another_user(self):
+        other_user = User.objects.create_user(username='therock123@gmail.com', password='wrestlingrules123')
+        job = enqueue('jobs.tests.add_numbers', user=other_user, a=1, b=2)
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token.key)
+
+        response = self.client.get(reverse('job_status', kwargs={'job_id': job.id}))
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,6 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('api/jobs/<int:job_id>/', views.JobStatusAPIView.as_view(), name='job_status'),  # Status of a background job
+]
@@ -0,0 +1,27 @@
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.status import HTTP_200_OK
+from rest_framework.views import APIView
+
+from .models import Job
+
+
+class JobStatusAPIView(APIView):
+    """
+    Returns the status of a background job of the user (queued, running, succeeded or failed) along with its
+    result, which long running jobs update as they make progress.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        job = Job.objects.filter(id=kwargs['job_id'], user=request.user).values('id', 'task', 'status', 'result').first()
+        if job is None:
+            return Response({"response": "Job not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        return Response({
+            'job_id': job['id'],
+            'task': job['task'],
+            'status': job['status'],
+            'result': job['result']
+        }, status=HTTP_200_OK)
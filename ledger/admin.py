@@ -0,0 +1,14 @@
+from django.contrib import admin
+from .models import Balance, Settlement
+
+
+@admin.register(Balance)
+class BalanceAdmin(admin.ModelAdmin):
+    '''To view the balances between users in django admin page'''
+    list_display = ('id', 'lower_user', 'higher_user', 'amount')
+
+
+@admin.register(Settlement)
+class SettlementAdmin(admin.ModelAdmin):
+    '''To view the settlements between users in django admin page'''
+    list_display = ('id', 'payer', 'payee', 'amount', 'created_at')
@@ -0,0 +1,112 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q, Sum
+
+from item_split.models import ItemSplitParticipant
+from ledger.models import Balance, Settlement
+from receipt_split.models import ReceiptSplitParticipant
+
+
+def debt_of_participant(participant):
+    """The (debtor id, creditor id, amount) debt of a user a receipt or an item is shared with, to its owner"""
+    if isinstance(participant, ReceiptSplitParticipant):
+        creditor_id = participant.split.receipt.user_id
+    else:
+        creditor_id = participant.split.item.user_id
+    return participant.user_id, creditor_id, Decimal(str(participant.amount))
+
+
+def debt_of_settlement(settlement):
+    """A settlement is recorded as a debt of the payee to the payer, which cancels what the payer owed"""
+    return settlement.payee_id, settlement.payer_id, Decimal(str(settlement.amount))
+
+
+def _pair_amounts(debts):
+    """Sum (debtor id, creditor id, amount) debts into {(lower user id, higher user id): amount} balance changes"""
+    amounts = defaultdict(Decimal)
+    for debtor_id, creditor_id, amount in debts:
+        if debtor_id == creditor_id:
+            # e.g. a receipt shared with its own owner
+            continue
+        if debtor_id > creditor_id:
+            amounts[(creditor_id, debtor_id)] += amount
+        else:
+            amounts[(debtor_id, creditor_id)] -= amount
+    return amounts
+
+
+def record_debts(debts, sign=1):
+    """Add (or with `sign=-1`, remove) (debtor id, creditor id, amount) debts to the balances of the pairs of users"""
+    # Update the pairs in a fixed order, so that concurrent requests lock the rows in the same order
+    for (lower_user_id, higher_user_id), amount in sorted(_pair_amounts(debts).items()):
+        balance = Balance.objects.filter(lower_user_id=lower_user_id, higher_user_id=higher_user_id)
+        if balance.update(amount=F('amount') + sign * amount):
+            continue
+        try:
+            with transaction.atomic():
+                Balance.objects.create(lower_user_id=lower_user_id, higher_user_id=higher_user_id, amount=sign * amount)
+        except IntegrityError:
+            # Another request created the row in the meantime
+            balance.update(amount=F('amount') + sign * amount)
+
+
+def record_participants(participants):
+    """Add participants inserted without signals (e.g. with `bulk_create`) to the balances"""
+    record_debts([debt_of_participant(participant) for participant in participants])
+
+
+def rebuild_balances(balance_model=Balance, settlement_model=Settlement,
+                     receipt_participant_model=ReceiptSplitParticipant, item_participant_model=ItemSplitParticipant):
+    """
+    Recompute every balance from the splits and the settlements, with one GROUP BY query per table. The models can
+    be passed so that it can run from a migration.
+    """
+    debts = []
+    for queryset, debtor, creditor in (
+        (receipt_participant_model.objects.all(), 'user_id', 'split__receipt__user_id'),
+        (item_participant_model.objects.all(), 'user_id', 'split__item__user_id'),
+        (settlement_model.objects.filter(confirmed=True), 'payee_id', 'payer_id'),
+    ):
+        debts.extend(queryset.values_list(debtor, creditor).annotate(total=Sum('amount')).order_by())
+
+    with transaction.atomic():
+        balance_model.objects.all().delete()
+        balance_model.objects.bulk_create([
+            balance_model(lower_user_id=lower_user_id, higher_user_id=higher_user_id, amount=amount)
+            for (lower_user_id, higher_user_id), amount in sorted(_pair_amounts(debts).items())
+        ], batch_size=1000)
+
+
+def amount_owed(debtor_id, creditor_id):
+    """What `debtor_id` owes `creditor_id` according to their balance (negative when it is the other way around)"""
+    lower_user_id, higher_user_id = sorted((debtor_id, creditor_id))
+    amount = Balance.objects.filter(lower_user_id=lower_user_id, higher_user_id=higher_user_id).values_list(
+        'amount', flat=True).first() or Decimal(0)
+    # The balance is what the higher user owes the lower user
+    return amount if debtor_id == higher_user_id else -amount
+
+
+def balances_of(user, other_user_id=None):
+    """
+    The balances of `user` with each user they share splits with, as a list of {'user_id', 'first_name',
+    'last_name', 'balance'} where a positive balance is owed to `user`. Reads one row per pair of users.
+    """
+    balances = Balance.objects.filter(Q(lower_user=user) | Q(higher_user=user)).select_related('lower_user', 'higher_user')
+    if other_user_id is not None:
+        balances = balances.filter(Q(lower_user_id=other_user_id) | Q(higher_user_id=other_user_id))
+
+    rows = []
+    for balance in balances.order_by('id'):
+        if balance.lower_user_id == user.id:
+            other_user, amount = balance.higher_user, balance.amount
+        else:
+            other_user, amount = balance.lower_user, -balance.amount
+        rows.append({
+            'user_id': other_user.id,
+            'first_name': other_user.first_name,
+            'last_name': other_user.last_name,
+            'balance': amount,
+        })
+    return rows
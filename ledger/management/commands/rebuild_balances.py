@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from ledger.balances import rebuild_balances
+from ledger.models import Balance
+
+
+class Command(BaseCommand):
+    help = 'Recompute the balances between users from the receipt and item splits and the settlements'
+
+    def handle(self, *args, **options):
+        rebuild_balances()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {Balance.objects.count()} balance(s)'))
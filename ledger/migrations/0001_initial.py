@@ -0,0 +1,81 @@
+# Generated by Django 4.1.1 on 2026-10-18 09:02
+
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+import django.db.models.deletion
+
+
+def rebuild_balances(apps, schema_editor):
+    """
+    Backfill the balances from the existing splits, as `ledger.balances.rebuild_balances` did when this migration
+    was written (there are no settlements yet). Kept here so that later changes to it do not change this migration.
+    """
+    Balance = apps.get_model('ledger', 'Balance')
+    amounts = defaultdict(int)
+    for model, creditor in (
+        (apps.get_model('receipt_split', 'ReceiptSplitParticipant'), 'split__receipt__user_id'),
+        (apps.get_model('item_split', 'ItemSplitParticipant'), 'split__item__user_id'),
+    ):
+        for debtor_id, creditor_id, total in model.objects.values_list('user_id', creditor).annotate(total=Sum('amount')).order_by():
+            if debtor_id > creditor_id:
+                amounts[(creditor_id, debtor_id)] += total
+            elif debtor_id < creditor_id:
+                amounts[(debtor_id, creditor_id)] -= total
+
+    Balance.objects.bulk_create([
+        Balance(lower_user_id=lower_user_id, higher_user_id=higher_user_id, amount=amount)
+        for (lower_user_id, higher_user_id), amount in sorted(amounts.items())
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('item_split', '0007_itemsplitparticipant'),
+        ('receipt_split', '0004_receiptsplitparticipant'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Settlement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=18)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('payee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='settlements_received', to=settings.AUTH_USER_MODEL)),
+                ('payer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='settlements_paid', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Balance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('higher_user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='higher_balances', to=settings.AUTH_USER_MODEL)),
+                ('lower_user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lower_balances', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='settlement',
+            index=models.Index(fields=['payer', 'created_at'], name='settlement_payer_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='settlement',
+            index=models.Index(fields=['payee', 'created_at'], name='settlement_payee_created_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='balance',
+            constraint=models.UniqueConstraint(fields=('lower_user', 'higher_user'), name='unique_balance_pair'),
+        ),
+        migrations.AddConstraint(
+            model_name='balance',
+            constraint=models.CheckConstraint(check=models.Q(('lower_user__lt', models.F('higher_user'))), name='balance_pair_ordered'),
+        ),
+        migrations.RunPython(rebuild_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.1.1 on 2026-10-18 09:45
+
+from django.db import migrations, models
+
+
+def confirm_existing_settlements(apps, schema_editor):
+    # The settlements recorded so far are already counted in the balances
+    apps.get_model('ledger', 'Settlement').objects.update(confirmed=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ledger', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='settlement',
+            name='confirmed',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(confirm_existing_settlements, migrations.RunPython.noop),
+    ]
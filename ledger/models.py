@@ -0,0 +1,85 @@
+from django.contrib.auth.models import User
+from django.db import models
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+
+class Balance(models.Model):
+    """
+    Running balance between two users, stored once per pair with the lower user id first. `amount` is what
+    `higher_user` owes `lower_user` (negative when `lower_user` owes `higher_user`).
+
+    Maintained incrementally by `ledger.balances` as splits are shared with users and as settlements are recorded,
+    so the balances of a user are read without going through the splits.
+    """
+    lower_user = models.ForeignKey(User, related_name='lower_balances', on_delete=models.CASCADE)
+    higher_user = models.ForeignKey(User, related_name='higher_balances', on_delete=models.CASCADE)
+    amount = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['lower_user', 'higher_user'], name='unique_balance_pair'),
+            models.CheckConstraint(check=models.Q(lower_user__lt=models.F('higher_user')), name='balance_pair_ordered'),
+        ]
+
+    # Each user a receipt or an item is shared with owes their amount to the owner of the receipt or item
+    @receiver(pre_save, sender='receipt_split.ReceiptSplitParticipant')
+    @receiver(pre_save, sender='item_split.ItemSplitParticipant')
+    def pre_save_participant(sender, instance, *args, **kwargs):
+        from ledger.balances import debt_of_participant
+        instance._previous_debt = None
+        if instance.id:
+            previous = sender.objects.filter(id=instance.id).select_related('split').first()
+            if previous is not None:
+                instance._previous_debt = debt_of_participant(previous)
+
+    @receiver(post_save, sender='receipt_split.ReceiptSplitParticipant')
+    @receiver(post_save, sender='item_split.ItemSplitParticipant')
+    def post_save_participant(sender, instance, *args, **kwargs):
+        from ledger.balances import debt_of_participant, record_debts
+        if getattr(instance, '_previous_debt', None) is not None:
+            record_debts([instance._previous_debt], sign=-1)
+        record_debts([debt_of_participant(instance)])
+
+    # Sent before the split is deleted when the participants are deleted with it
+    @receiver(pre_delete, sender='receipt_split.ReceiptSplitParticipant')
+    @receiver(pre_delete, sender='item_split.ItemSplitParticipant')
+    def pre_delete_participant(sender, instance, *args, **kwargs):
+        from ledger.balances import debt_of_participant, record_debts
+        record_debts([debt_of_participant(instance)], sign=-1)
+
+    # A settlement only counts once the payee confirmed that they were paid
+    @receiver(pre_save, sender='ledger.Settlement')
+    def pre_save_settlement(sender, instance, *args, **kwargs):
+        instance._was_confirmed = bool(instance.id) and sender.objects.filter(id=instance.id, confirmed=True).exists()
+
+    @receiver(post_save, sender='ledger.Settlement')
+    def post_save_settlement(sender, instance, *args, **kwargs):
+        from ledger.balances import debt_of_settlement, record_debts
+        was_confirmed = getattr(instance, '_was_confirmed', False)
+        if instance.confirmed != was_confirmed:
+            record_debts([debt_of_settlement(instance)], sign=1 if instance.confirmed else -1)
+
+    @receiver(post_delete, sender='ledger.Settlement')
+    def post_delete_settlement(sender, instance, *args, **kwargs):
+        from ledger.balances import debt_of_settlement, record_debts
+        if instance.confirmed:
+            record_debts([debt_of_settlement(instance)], sign=-1)
+
+
+class Settlement(models.Model):
+    """
+    A payment of `amount` from `payer` to `payee`, settling what the payer owes. It is recorded by the payer, and
+    only changes the balance of the two users once the payee (the creditor) confirmed it.
+    """
+    payer = models.ForeignKey(User, related_name='settlements_paid', on_delete=models.CASCADE)
+    payee = models.ForeignKey(User, related_name='settlements_received', on_delete=models.CASCADE)
+    amount = models.DecimalField(max_digits=18, decimal_places=2)
+    confirmed = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['payer', 'created_at'], name='settlement_payer_created_idx'),
+            models.Index(fields=['payee', 'created_at'], name='settlement_payee_created_idx'),
+        ]
@@ -0,0 +1,36 @@
+from decimal import Decimal
+
+from django.db.models import Sum
+from rest_framework import serializers
+
+from .balances import amount_owed
+from .models import Settlement
+
+
+class SettlementSerializer(serializers.ModelSerializer):
+    """
+    Validates a payment of the authenticated user (the payer) to a user they owe. The amount cannot be more than
+    what the payer owes the payee, less the settlements the payee has not confirmed yet.
+    """
+    amount = serializers.DecimalField(max_digits=18, decimal_places=2, min_value=Decimal('0.01'))
+
+    class Meta:
+        model = Settlement
+        fields = ('id', 'payer', 'payee', 'amount', 'confirmed', 'created_at')
+        read_only_fields = ('payer', 'confirmed', 'created_at')
+
+    def validate_payee(self, payee):
+        if payee == self.context['request'].user:
+            raise serializers.ValidationError("A user cannot settle with themselves.")
+        return payee
+
+    def validate(self, data):
+        payer = self.context['request'].user
+        pending = Settlement.objects.filter(payer=payer, payee=data['payee'], confirmed=False).aggregate(
+            total=Sum('amount'))['total'] or Decimal(0)
+        owed = amount_owed(payer.id, data['payee'].id) - pending
+        if owed <= 0:
+            raise serializers.ValidationError("You do not owe anything to this user.")
+        if data['amount'] > owed:
+            raise serializers.ValidationError("The amount is greater than what you owe to this user.")
+        return data
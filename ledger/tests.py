@@ -0,0 +1,238 @@
+import datetime
+import os
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.urls import reverse
+from rest_framework.status import HTTP_200_OK, HTTP_201_CREATED, HTTP_400_BAD_REQUEST, HTTP_404_NOT_FOUND
+from rest_framework.test import APITestCase
+
+from item.models import Item
+from item_split.models import ItemSplit
+from ledger.balances import rebuild_balances
+from ledger.models import Balance, Settlement
+from merchant.models import Merchant
+from receipt_split.models import ReceiptSplit
+from receipts.models import Receipts
+from users.authentication import BearerToken
+
+
+class LedgerAPITestCase(APITestCase):
+    def setUp(self):
+        # Create the users
+        self.user1 = User.objects.create_user(
+            username='johncena123@gmail.com',
+            email='johncena123@gmail.com',
+            first_name='John',
+            last_name='Cena',
+            password='wrestlingrules123'
+        )
+        self.user2 = User.objects.create_user(
+            username='billybatson@gmail.com',
+            email='billybatson@gmail.com',
+            first_name='Billy',
+            last_name='Baston',
+            password='#Shazam123'
+        )
+        self.user3 = User.objects.create_user(
+            username='batcave@gmail.com',
+            email='batcave@gmail.com',
+            first_name='Bat',
+            last_name='Man',
+            password='robin1234'
+        )
+
+        # Generate the users token
+        self.token = BearerToken.objects.create(user=self.user1)
+
+        # Create the receipt
+        self.receipt = Receipts.objects.create(
+            user=self.user1,
+            scan_date=datetime.datetime(2019, 1, 1, 0, 0, tzinfo=datetime.timezone.utc),
+            receipt_image=os.path.join('receipt_image_for_tests.png'),
+            merchant=Merchant.objects.create(name='starbucks'),
+            location='123 Testing Street T1E 5T5',
+            total=100,
+            tax=1,
+            tip=1,
+            coupon=1,
+            currency="CAD"
+        )
+        self.item = Item.objects.create(
+            user=self.user1,
+            receipt=self.receipt,
+            name='coffee',
+            price=30
+        )
+
+        # Authenticate user before each test
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token.key)
+
+    def split_receipt(self):
+        response = self.client.post(
+            reverse('add_receipt_split'),
+            data={
+                'receipt': self.receipt.pk,
+                'shared_user_ids': [self.user2.pk, self.user3.pk],
+                'shared_amount': [10, 25.5],
+            },
+            format='json'
+        )
+        self.assertEqual(response.status_code, HTTP_201_CREATED)
+
+    def split_item(self):
+        response = self.client.post(
+            reverse('add_item_split'),
+            data={'item_list': [{
+                'item_id': self.item.pk,
+                'shared_user_ids': f'{self.user2.pk}, {self.user3.pk}',
+                'is_shared_with_item_user': True}]
+            },
+            format='json'
+        )
+        self.assertEqual(response.status_code, HTTP_201_CREATED)
+
+    def test_balances_of_receipt_and_item_splits(self):
+        self.split_receipt()
+        self.split_item()
+
+        response = self.client.get(reverse('ledger_balances'))
+
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(response.data['balances'], [
+            {'user_id': self.user2.pk, 'first_name': 'Billy', 'last_name': 'Baston', 'balance': Decimal('20')},
+            {'user_id': self.user3.pk, 'first_name': 'Bat', 'last_name': 'Man', 'balance': Decimal('35.5')},
+        ])
+        self.assertEqual(response.data['total'], Decimal('55.5'))
+        # One row per pair of users
+        self.assertEqual(Balance.objects.count(), 2)
+
+    def test_balances_of_shared_user(self):
+        self.split_receipt()
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + BearerToken.objects.create(user=self.user2).key)
+
+        response = self.client.get(reverse('ledger_balance', kwargs={'user_id': self.user1.pk}))
+
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(response.data['balance'], Decimal('-10'))
+
+        # Users who share nothing have no balance
+        response = self.client.get(reverse('ledger_balance', kwargs={'user_id': self.user3.pk}))
+        self.assertEqual(response.data['balance'], 0)
+
+    def test_settlement(self):
+        self.split_receipt()
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + BearerToken.objects.create(user=self.user2).key)
+
+        response = self.client.post(reverse('ledger_settlements'), data={'payee': self.user1.pk, 'amount': '10.00'},
+                                    format='json')
+
+        self.assertEqual(response.status_code, HTTP_201_CREATED)
+        self.assertEqual(response.data['payer'], self.user2.pk)
+        self.assertFalse(response.data['confirmed'])
+        settlement_id = response.data['id']
+
+        # The settlement only counts once the payee confirms it
+        response = self.client.get(reverse('ledger_balance', kwargs={'user_id': self.user1.pk}))
+        self.assertEqual(response.data['balance'], Decimal('-10'))
+        response = self.client.post(reverse('confirm_ledger_settlement', kwargs={'settlement_id': settlement_id}))
+        self.assertEqual(response.status_code, HTTP_404_NOT_FOUND)
+
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token.key)
+        response = self.client.post(reverse('confirm_ledger_settlement', kwargs={'settlement_id': settlement_id}))
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertTrue(response.data['confirmed'])
+        response = self.client.get(reverse('ledger_balance', kwargs={'user_id': self.user2.pk}))
+        self.assertEqual(response.data['balance'], 0)
+
+        response = self.client.get(reverse('ledger_settlements'), {'cursor': ''})
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(len(response.data['settlements']), 1)
+        self.assertEqual(response.data['settlements'][0]['amount'], '10.00')
+        self.assertIsNone(response.data['next'])
+
+        # A confirmed settlement cannot be deleted through the API, deleting it reverts it
+        response = self.client.delete(reverse('ledger_settlement', kwargs={'settlement_id': settlement_id}))
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+        Settlement.objects.get().delete()
+        response = self.client.get(reverse('ledger_balance', kwargs={'user_id': self.user2.pk}))
+        self.assertEqual(response.data['balance'], Decimal('10'))
+
+    def test_settlement_invalid(self):
+        response = self.client.post(reverse('ledger_settlements'), data={'payee': self.user1.pk, 'amount': '10.00'},
+                                    format='json')
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+
+        response = self.client.post(reverse('ledger_settlements'), data={'payee': self.user2.pk, 'amount': '-1'},
+                                    format='json')
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+        self.assertFalse(Settlement.objects.exists())
+
+        response = self.client.get(reverse('ledger_settlements'), {'cursor': 'invalid'})
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+
+    def test_settlement_with_stranger(self):
+        # user1 and user3 share nothing, so user3 cannot make user1 owe them through a settlement
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + BearerToken.objects.create(user=self.user3).key)
+        response = self.client.post(reverse('ledger_settlements'), data={'payee': self.user1.pk, 'amount': '10.00'},
+                                    format='json')
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+        self.assertFalse(Settlement.objects.exists())
+        self.assertFalse(Balance.objects.exists())
+
+    def test_settlement_above_debt(self):
+        self.split_receipt()
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + BearerToken.objects.create(user=self.user2).key)
+
+        response = self.client.post(reverse('ledger_settlements'), data={'payee': self.user1.pk, 'amount': '10.01'},
+                                    format='json')
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+
+        # Settlements waiting for confirmation count towards what is owed
+        response = self.client.post(reverse('ledger_settlements'), data={'payee': self.user1.pk, 'amount': '6.00'},
+                                    format='json')
+        self.assertEqual(response.status_code, HTTP_201_CREATED)
+        response = self.client.post(reverse('ledger_settlements'), data={'payee': self.user1.pk, 'amount': '6.00'},
+                                    format='json')
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+
+        # Until they are cancelled
+        settlement = Settlement.objects.get()
+        response = self.client.delete(reverse('ledger_settlement', kwargs={'settlement_id': settlement.id}))
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        response = self.client.post(reverse('ledger_settlements'), data={'payee': self.user1.pk, 'amount': '10.00'},
+                                    format='json')
+        self.assertEqual(response.status_code, HTTP_201_CREATED)
+
+    def test_settlement_history_pages(self):
+        for amount in range(1, 6):
+            Settlement.objects.create(payer=self.user2, payee=self.user1, amount=amount)
+        Settlement.objects.create(payer=self.user1, payee=self.user3, amount=1)
+
+        response = self.client.get(reverse('ledger_settlements'), {'pageSize': 3, 'user_id': self.user2.pk})
+        self.assertEqual([settlement['amount'] for settlement in response.data['settlements']], ['5.00', '4.00', '3.00'])
+
+        response = self.client.get(reverse('ledger_settlements'), {'pageSize': 3, 'cursor': response.data['next'],
+                                                                   'user_id': self.user2.pk})
+        self.assertEqual([settlement['amount'] for settlement in response.data['settlements']], ['2.00', '1.00'])
+        self.assertIsNone(response.data['next'])
+
+    def test_deleting_split_reverts_balances(self):
+        self.split_receipt()
+        self.split_item()
+
+        ReceiptSplit.objects.get().delete()
+        ItemSplit.objects.get().delete()
+
+        self.assertFalse(Balance.objects.exclude(amount=0).exists())
+
+    def test_rebuild_balances(self):
+        self.split_receipt()
+        self.split_item()
+        Settlement.objects.create(payer=self.user3, payee=self.user1, amount=5, confirmed=True)
+        balances = set(Balance.objects.values_list('lower_user_id', 'higher_user_id', 'amount'))
+
+        Balance.objects.all().delete()
+        rebuild_balances()
+
+        self.assertEqual(set(Balance.objects.values_list('lower_user_id', 'higher_user_id', 'amount')), balances)
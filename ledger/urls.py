@@ -0,0 +1,16 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    # GET: balances of the user with everyone they share splits with
+    path('api/ledger/balances/', views.BalancesAPIView.as_view(), name='ledger_balances'),
+    # GET: balance of the user with another user
+    path('api/ledger/balances/<int:user_id>/', views.BalancesAPIView.as_view(), name='ledger_balance'),
+    # GET: settlement history, POST: record a payment to another user
+    path('api/ledger/settlements/', views.SettlementsAPIView.as_view(), name='ledger_settlements'),
+    # DELETE: cancel or reject a settlement that is not confirmed
+    path('api/ledger/settlements/<int:settlement_id>/', views.SettlementDetailAPIView.as_view(), name='ledger_settlement'),
+    # POST: the payee confirms a settlement
+    path('api/ledger/settlements/<int:settlement_id>/confirm/', views.ConfirmSettlementAPIView.as_view(),
+         name='confirm_ledger_settlement'),
+]
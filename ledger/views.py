@@ -0,0 +1,112 @@
+from django.db import transaction
+from django.db.models import Q
+from rest_framework import generics
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.status import HTTP_200_OK, HTTP_201_CREATED, HTTP_400_BAD_REQUEST, HTTP_404_NOT_FOUND
+from rest_framework.views import APIView
+
+from utility.pagination import InvalidCursor, keyset_paginate
+from .balances import balances_of
+from .models import Settlement
+from .serializers import SettlementSerializer
+
+
+class BalancesAPIView(APIView):
+    """
+    Returns how much each user the authenticated user shares receipts or items with owes them (positive balance) or
+    is owed by them (negative balance), after settlements, along with the sum of the balances.
+    If a user id is specified, returns the balance with that user only (0 if they share nothing).
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        if 'user_id' in kwargs:
+            if kwargs['user_id'] == request.user.id:
+                return Response({"response": "A user has no balance with themselves."}, status=HTTP_400_BAD_REQUEST)
+            balances = balances_of(request.user, kwargs['user_id'])
+            return Response({
+                'user_id': kwargs['user_id'],
+                'balance': balances[0]['balance'] if balances else 0
+            }, status=HTTP_200_OK)
+
+        balances = balances_of(request.user)
+        return Response({
+            'balances': balances,
+            'total': sum(balance['balance'] for balance in balances)
+        }, status=HTTP_200_OK)
+
+
+class SettlementsAPIView(generics.GenericAPIView):
+    """
+    GET: the settlements paid or received by the authenticated user, newest first, with keyset pagination.
+    The `cursor` query parameter is empty for the first page, then one of the `next` or `previous` cursors of the
+    response. `pageSize` defaults to 20, and `user_id` only keeps the settlements with that user.
+    POST: records that the authenticated user paid `amount` to the user `payee`, which the payee then confirms.
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = SettlementSerializer
+
+    def get(self, request, *args, **kwargs):
+        try:
+            page_size = int(request.query_params.get('pageSize', 20))
+        except ValueError:
+            page_size = 20
+        if page_size <= 0:
+            page_size = 20
+
+        settlements = Settlement.objects.filter(Q(payer=request.user) | Q(payee=request.user))
+        if 'user_id' in request.query_params:
+            user_id = request.query_params['user_id']
+            if not user_id.isdigit():
+                return Response({"response": "Invalid user id"}, status=HTTP_400_BAD_REQUEST)
+            settlements = settlements.filter(Q(payer_id=user_id) | Q(payee_id=user_id))
+
+        try:
+            settlements, next_cursor, previous_cursor = keyset_paginate(
+                settlements, 'created_at', request.query_params.get('cursor', ''), page_size
+            )
+        except InvalidCursor:
+            return Response({'description': "Invalid Cursor"}, status=HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'settlements': self.get_serializer(settlements, many=True).data,
+            'next': next_cursor,
+            'previous': previous_cursor
+        }, status=HTTP_200_OK)
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save(payer=request.user)
+        return Response(serializer.data, status=HTTP_201_CREATED)
+
+
+class SettlementDetailAPIView(APIView):
+    """DELETE: cancels (payer) or rejects (payee) a settlement that was not confirmed yet"""
+    permission_classes = [IsAuthenticated]
+
+    def delete(self, request, settlement_id, *args, **kwargs):
+        settlement = Settlement.objects.filter(Q(payer=request.user) | Q(payee=request.user), id=settlement_id).first()
+        if settlement is None:
+            return Response({"response": "Settlement not found"}, status=HTTP_404_NOT_FOUND)
+        if settlement.confirmed:
+            return Response({"response": "A confirmed settlement cannot be deleted."}, status=HTTP_400_BAD_REQUEST)
+        settlement.delete()
+        return Response({"response": "Settlement deleted"}, status=HTTP_200_OK)
+
+
+class ConfirmSettlementAPIView(APIView):
+    """POST: the payee confirms that they were paid, and the settlement is applied to the balance"""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, settlement_id, *args, **kwargs):
+        with transaction.atomic():
+            settlement = Settlement.objects.select_for_update().filter(id=settlement_id, payee=request.user).first()
+            if settlement is None:
+                return Response({"response": "Settlement not found"}, status=HTTP_404_NOT_FOUND)
+            if settlement.confirmed:
+                return Response({"response": "The settlement is already confirmed."}, status=HTTP_400_BAD_REQUEST)
+            settlement.confirmed = True
+            settlement.save()
+        return Response(SettlementSerializer(settlement).data, status=HTTP_200_OK)
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from merchant.resolver import forget_merchants, merge_duplicate_merchants
+
+
+class Command(BaseCommand):
+    help = 'Merge merchants whose names only differ by case, whitespace or punctuation'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many merchants would be merged')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            merged = merge_duplicate_merchants(dry_run=options['dry_run'])
+        forget_merchants()
+
+        if options['dry_run']:
+            self.stdout.write(f'{merged} duplicate merchant(s) would be merged')
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Merged {merged} duplicate merchant(s)'))
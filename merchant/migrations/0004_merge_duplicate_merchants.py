@@ -0,0 +1,48 @@
+# Generated by Django 4.1.1 on 2026-10-18 08:30
+
+import re
+import unicodedata
+from collections import defaultdict
+
+from django.db import migrations
+
+
+def normalize_merchant_name(name):
+    # Copy of merchant.resolver.normalize_merchant_name when this migration was written
+    name = unicodedata.normalize('NFKD', name or '')
+    name = ''.join(character for character in name if not unicodedata.combining(character))
+    name = re.sub(r'[^\w\s]', '', name.casefold())
+    return re.sub(r'[\s_]+', ' ', name).strip()[:100]
+
+
+def merge_duplicate_merchants(apps, schema_editor):
+    """Merge the merchants sharing a normalized name into the oldest of them, pointing their receipts to it"""
+    Merchant = apps.get_model('merchant', 'Merchant')
+    Receipts = apps.get_model('receipts', 'Receipts')
+
+    groups = defaultdict(list)
+    for merchant in Merchant.objects.order_by('id').only('id', 'name'):
+        groups[normalize_merchant_name(merchant.name)].append(merchant)
+
+    for key, merchants in groups.items():
+        if not key:
+            continue
+        keeper, duplicate_ids = merchants[0], [merchant.id for merchant in merchants[1:]]
+        if duplicate_ids:
+            Receipts.objects.filter(merchant_id__in=duplicate_ids).update(merchant_id=keeper.id)
+            Merchant.objects.filter(id__in=duplicate_ids).delete()
+        Merchant.objects.filter(id=keeper.id).update(normalized_name=key)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('merchant', '0003_normalized_name'),
+        ('receipts', '0019_receipts_status'),
+    ]
+
+    operations = [
+        # Existing duplicates have to be merged before the unique index can be created (in the next migration, since
+        # Postgres cannot alter a table with the pending foreign key checks of the merged receipts)
+        migrations.RunPython(merge_duplicate_merchants, migrations.RunPython.noop),
+    ]
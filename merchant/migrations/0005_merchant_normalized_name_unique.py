@@ -0,0 +1,18 @@
+# Generated by Django 4.1.1 on 2026-10-18 08:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('merchant', '0004_merge_duplicate_merchants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='merchant',
+            name='normalized_name',
+            field=models.CharField(blank=True, editable=False, max_length=100, null=True, unique=True),
+        ),
+    ]
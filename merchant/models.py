@@ -1,9 +1,32 @@
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 
 
 # Create your models here.
 class Merchant(models.Model):
     name = models.CharField(max_length=100, default='')
+    # Lookup key of the name with case, whitespace and punctuation folded (see merchant.resolver). Only merchants
+    # created through the resolver have one.
+    normalized_name = models.CharField(max_length=100, unique=True, null=True, blank=True, editable=False)
 
     def __str__(self):
         return self.name
+
+    @receiver(post_delete, sender='merchant.Merchant')
+    def post_delete_merchant(sender, instance, *args, **kwargs):
+        from merchant.resolver import forget_merchants
+        forget_merchants()
+
+    # The list of merchants is cached for every user, and the names of the merchants of their receipts are part of
+    # the cached receipt filters of the users (see utility.cache)
+    @receiver(post_save, sender='merchant.Merchant')
+    @receiver(post_delete, sender='merchant.Merchant')
+    def invalidate_cached_merchants(sender, instance, created=False, *args, **kwargs):
+        from receipts.models import Receipts
+        from utility.cache import MERCHANTS_SCOPE, bump_cache_version, bump_user_cache_version
+        bump_cache_version(MERCHANTS_SCOPE)
+        if not created:
+            bump_user_cache_version(
+                *Receipts.objects.filter(merchant_id=instance.id).values_list('user_id', flat=True).distinct()
+            )
@@ -0,0 +1,136 @@
+import re
+import threading
+import unicodedata
+from collections import OrderedDict, defaultdict
+
+from django.conf import settings
+
+from utility.cache import bump_cache_version, bump_user_cache_version, cache_version, get_cache, is_shared_cache
+from .models import Merchant
+
+# Version of the merchants cached by the resolvers of all the processes, bumped when merchants are deleted
+RESOLVER_SCOPE = 'merchant-resolver'
+
+
+def normalize_merchant_name(name):
+    """
+    Fold a merchant name into its lookup key, so that e.g. "Tim Hortons", "TIM HORTON'S" and " tim  hortons."
+    all resolve to the same merchant.
+    """
+    name = unicodedata.normalize('NFKD', name or '')
+    name = ''.join(character for character in name if not unicodedata.combining(character))
+    name = re.sub(r'[^\w\s]', '', name.casefold())
+    return re.sub(r'[\s_]+', ' ', name).strip()[:Merchant._meta.get_field('normalized_name').max_length]
+
+
+class MerchantResolver:
+    """
+    Finds or creates the merchant of a name by its normalized key. Resolved merchants are kept in a per-process
+    LRU cache of MERCHANT_CACHE_SIZE entries, so repeated names (the common case) do not hit the database.
+
+    A merchant deleted by another process must not be resolved from the cache, so the cache is cleared whenever
+    the version of RESOLVER_SCOPE in the shared cache changes (see `forget_merchants`). Without a cache shared by the
+    processes, merchants are not cached.
+    """
+
+    def __init__(self):
+        self._cache = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+
+    def resolve(self, name):
+        """Return the merchant for `name`, creating it if needed, or None if the name is blank"""
+        key = normalize_merchant_name(name)
+        if not key:
+            return None
+
+        merchant = self._get(key)
+        if merchant is None:
+            merchant, created = Merchant.objects.get_or_create(
+                normalized_name=key,
+                defaults={'name': name.strip()[:Merchant._meta.get_field('name').max_length]}
+            )
+            self._put(key, merchant)
+        return merchant
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def _enabled(self):
+        return settings.MERCHANT_CACHE_SIZE > 0 and is_shared_cache(get_cache())
+
+    def _get(self, key):
+        if not self._enabled():
+            return None
+        version = cache_version(RESOLVER_SCOPE)
+        with self._lock:
+            if version != self._version:
+                self._cache.clear()
+                self._version = version
+            merchant = self._cache.get(key)
+            if merchant is not None:
+                self._cache.move_to_end(key)
+            return merchant
+
+    def _put(self, key, merchant):
+        if not self._enabled():
+            return
+        with self._lock:
+            self._cache[key] = merchant
+            self._cache.move_to_end(key)
+            # Evict the least recently used merchants
+            while len(self._cache) > settings.MERCHANT_CACHE_SIZE:
+                self._cache.popitem(last=False)
+
+
+merchant_resolver = MerchantResolver()
+
+
+def resolve_merchant(name):
+    return merchant_resolver.resolve(name)
+
+
+def forget_merchants():
+    """Clear the merchants cached by the resolvers of every process, e.g. once merchants are deleted"""
+    merchant_resolver.clear()
+    bump_cache_version(RESOLVER_SCOPE)
+
+
+def merge_duplicate_merchants(merchant_model=Merchant, receipts_model=None, dry_run=False):
+    """
+    Recompute the normalized name of every merchant and merge the merchants sharing one into the oldest of them,
+    pointing their receipts to it. Takes the models as arguments so it can also run in a data migration.
+    Returns the number of merchants merged (or that would be merged with `dry_run`).
+    """
+    if receipts_model is None:
+        from receipts.models import Receipts
+        receipts_model = Receipts
+
+    groups = defaultdict(list)
+    for merchant in merchant_model.objects.order_by('id').only('id', 'name', 'normalized_name'):
+        groups[normalize_merchant_name(merchant.name)].append(merchant)
+
+    merged = sum(len(merchants) - 1 for key, merchants in groups.items() if key)
+    if dry_run:
+        return merged
+
+    # Release the keys that no longer match their merchant's name, so they can be given to another merchant
+    stale_ids = [merchant.id for key, merchants in groups.items() for merchant in merchants if merchant.normalized_name not in (None, key)]
+    merchant_model.objects.filter(id__in=stale_ids).update(normalized_name=None)
+
+    for key, merchants in groups.items():
+        if not key:
+            continue
+        # Keep the merchant that already owns the key, otherwise the oldest one
+        keeper = next((merchant for merchant in merchants if merchant.normalized_name == key), merchants[0])
+        duplicate_ids = [merchant.id for merchant in merchants if merchant.id != keeper.id]
+        if duplicate_ids:
+            receipts = receipts_model.objects.filter(merchant_id__in=duplicate_ids)
+            # The filters of the users whose receipts are moved are cached
+            bump_user_cache_version(*receipts.values_list('user_id', flat=True).distinct())
+            receipts.update(merchant_id=keeper.id)
+            merchant_model.objects.filter(id__in=duplicate_ids).delete()
+        if keeper.normalized_name != key:
+            merchant_model.objects.filter(id=keeper.id).update(normalized_name=key)
+    return merged
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import Merchant
+from .resolver import resolve_merchant
 
 
 class MerchantSerializer(serializers.ModelSerializer):
@@ -8,6 +9,5 @@ class MerchantSerializer(serializers.ModelSerializer):
         fields = ('id', 'name')
 
     def create(self, validated_data):
-        return Merchant.objects.create(
-            name=validated_data['name']
-        )
+        # Reuse the existing merchant if the name only differs by case, whitespace or punctuation
+        return resolve_merchant(validated_data['name'])
@@ -1,9 +1,18 @@
+import tempfile
+from io import StringIO
+
 from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework.status import HTTP_200_OK
 from rest_framework.test import APITestCase
 
 from merchant.models import Merchant
+from merchant.resolver import MerchantResolver, merchant_resolver, normalize_merchant_name, resolve_merchant
+from receipts.models import Receipts
 from users.authentication import BearerToken
 from users.models import UserProfile
 
@@ -43,6 +52,54 @@ class MerchantTestCase(APITestCase):
         self.assertEqual(response.status_code, HTTP_200_OK)
         self.assertEqual(response.data['merchants'][0]['name'], 'Walmart')
 
+    def test_list_merchants_is_cached(self):
+        """
+        Test that the list of merchants is cached for every user until a merchant is added
+        """
+        # Responses and authenticated tokens are only cached in a cache shared by the processes
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        shared_cache = override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directory.name}})
+        shared_cache.enable()
+        self.addCleanup(shared_cache.disable)
+
+        url_get_merchant = reverse('add_and_list_merchant')
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token.key)
+        self.client.get(url_get_merchant, format='json')
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url_get_merchant, format='json')
+        self.assertEqual(len(queries), 0)
+        self.assertEqual([merchant['name'] for merchant in response.data['merchants']], ['Walmart'])
+
+        Merchant.objects.create(name='Costco')
+        response = self.client.get(url_get_merchant, format='json')
+        self.assertEqual([merchant['name'] for merchant in response.data['merchants']], ['Walmart', 'Costco'])
+
+    def test_receipt_filters_are_invalidated_by_merchant_changes(self):
+        """
+        Test that the cached receipt filters, which include the names of the merchants, follow renamed merchants
+        """
+        # Responses and authenticated tokens are only cached in a cache shared by the processes
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        shared_cache = override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directory.name}})
+        shared_cache.enable()
+        self.addCleanup(shared_cache.disable)
+
+        Receipts.objects.create(user=self.user, merchant=self.merchant)
+        url_receipt_filters = reverse('receipts-filters')
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token.key)
+        response = self.client.get(url_receipt_filters, format='json')
+        self.assertEqual(response.data['merchants'], ['Walmart'])
+
+        self.merchant.name = 'Walmart Supercentre'
+        self.merchant.save()
+        response = self.client.get(url_receipt_filters, format='json')
+        self.assertEqual(response.data['merchants'], ['Walmart Supercentre'])
+
     def test_add_merchant(self):
         """
         Test to add a merchant
@@ -59,3 +116,102 @@ class MerchantTestCase(APITestCase):
         self.assertEqual(response.status_code, HTTP_200_OK)
         self.assertEqual(response.data['name'], 'Dollarama')
         self.assertTrue(Merchant.objects.filter(name='Dollarama').exists())
+
+    def test_add_existing_merchant(self):
+        """
+        Test that adding a merchant that differs only by case or punctuation returns the existing one
+        """
+        url_add_merchant = reverse('add_and_list_merchant')
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token.key)
+
+        self.client.post(url_add_merchant, data={'name': "Tim Horton's"}, format='json')
+        response = self.client.post(url_add_merchant, data={'name': 'TIM HORTONS'}, format='json')
+
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(response.data['name'], "Tim Horton's")
+        self.assertEqual(Merchant.objects.filter(normalized_name='tim hortons').count(), 1)
+
+
+class MerchantResolverTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='johncena123@gmail.com',
+            email='momoamineahmadi@gmail.com',
+            first_name='John',
+            last_name='Cena',
+            password='wrestlingrules123'
+        )
+        merchant_resolver.clear()
+
+    def tearDown(self):
+        merchant_resolver.clear()
+
+    def test_normalize_merchant_name(self):
+        self.assertEqual(normalize_merchant_name("  TIM HORTON'S. "), 'tim hortons')
+        self.assertEqual(normalize_merchant_name('Café   Dépôt'), 'cafe depot')
+        self.assertEqual(normalize_merchant_name('!!!'), '')
+
+    def test_resolve_merchant(self):
+        merchant = resolve_merchant('Walmart')
+
+        self.assertEqual(resolve_merchant(' WALMART! ').id, merchant.id)
+        self.assertIsNone(resolve_merchant('   '))
+        self.assertEqual(Merchant.objects.count(), 1)
+
+    def enable_resolver_cache(self, size):
+        # Merchants are only cached with a cache shared by the processes
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        resolver_cache = override_settings(MERCHANT_CACHE_SIZE=size, CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directory.name}})
+        resolver_cache.enable()
+        self.addCleanup(resolver_cache.disable)
+
+    def test_resolver_cache(self):
+        self.enable_resolver_cache(2)
+        walmart = resolve_merchant('Walmart')
+
+        # Cached merchants are resolved without any query
+        with self.assertNumQueries(0):
+            self.assertEqual(resolve_merchant('walmart').id, walmart.id)
+
+        # The least recently used merchant is evicted once the cache is full
+        resolve_merchant('Costco')
+        resolve_merchant('Dollarama')
+        with self.assertNumQueries(1):
+            self.assertEqual(resolve_merchant('Walmart').id, walmart.id)
+
+    def test_resolver_cache_forgets_merchants_deleted_by_other_processes(self):
+        self.enable_resolver_cache(2)
+        # The resolver of another process
+        other_resolver = MerchantResolver()
+        costco = other_resolver.resolve('Costco')
+
+        costco.delete()
+
+        new_costco = other_resolver.resolve('COSTCO')
+        self.assertNotEqual(new_costco.id, costco.id)
+        Receipts.objects.create(user=self.user, merchant=new_costco)
+        self.assertTrue(Merchant.objects.filter(id=new_costco.id).exists())
+
+    @override_settings(MERCHANT_CACHE_SIZE=2)
+    def test_resolver_cache_is_disabled_without_a_shared_cache(self):
+        walmart = resolve_merchant('Walmart')
+
+        with self.assertNumQueries(1):
+            self.assertEqual(resolve_merchant('walmart').id, walmart.id)
+
+    def test_dedupe_merchants_command(self):
+        merchant1 = Merchant.objects.create(name='Tim Hortons')
+        merchant2 = Merchant.objects.create(name="TIM HORTON'S")
+        merchant3 = Merchant.objects.create(name='Walmart')
+        receipt = Receipts.objects.create(user=self.user, merchant=merchant2)
+
+        call_command('dedupe_merchants', stdout=StringIO())
+
+        self.assertEqual(
+            list(Merchant.objects.order_by('id').values_list('id', 'normalized_name')),
+            [(merchant1.id, 'tim hortons'), (merchant3.id, 'walmart')]
+        )
+        receipt.refresh_from_db()
+        self.assertEqual(receipt.merchant_id, merchant1.id)
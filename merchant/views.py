@@ -3,6 +3,7 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.status import HTTP_200_OK
 
+from utility.cache import MERCHANTS_SCOPE, cache_response
 from .models import Merchant
 from .serializers import MerchantSerializer
 
@@ -20,6 +21,7 @@ class AddAndListMerchantView(generics.ListCreateAPIView):
             "name": merchant.name,
         }, status=HTTP_200_OK)
 
+    @cache_response('merchants', scope=MERCHANTS_SCOPE)
     def get(self, request, *args, **kwargs):
         merchants = self.get_queryset()
 
@@ -0,0 +1,9 @@
+from django.contrib import admin
+from .models import OutboundEmail
+
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    '''To view the queued and delivered emails in django admin page'''
+    list_display = ('id', 'to', 'subject', 'status', 'attempts', 'created_at', 'sent_at')
+    list_filter = ('status',)
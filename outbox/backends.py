@@ -0,0 +1,132 @@
+import json
+import os
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.utils.module_loading import import_string
+
+
+class EmailBackend:
+    """
+    Base class of the email delivery backends. Backends are instantiated once per process by `get_email_backend`,
+    so any connection they hold is reused across batches.
+    """
+
+    def send_messages(self, emails):
+        """
+        Deliver a batch of `OutboundEmail`. Returns, for each email, None if it was delivered or the error that
+        prevented it.
+        """
+        raise NotImplementedError
+
+
+class SendGridBackend(EmailBackend):
+    """
+    SendGrid v3 mail API, called over a single `requests.Session` so the requests reuse the same pooled keep-alive
+    connections. The emails of a batch sharing a subject and content (e.g. the same notification to several users)
+    are sent with one request, with a personalization per recipient.
+    """
+    url = 'https://api.sendgrid.com/v3/mail/send'
+    # Maximum number of personalizations of a request
+    max_recipients = 1000
+
+    def __init__(self):
+        self._session = None
+
+    @property
+    def session(self):
+        if self._session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=4))
+            session.headers['Authorization'] = f'Bearer {settings.SEND_GRID_TOKEN}'
+            self._session = session
+        return self._session
+
+    def send_messages(self, emails):
+        groups = defaultdict(list)
+        for index, email in enumerate(emails):
+            groups[(email.subject, email.content)].append(index)
+
+        errors = [None] * len(emails)
+        for (subject, content), indexes in groups.items():
+            for start in range(0, len(indexes), self.max_recipients):
+                chunk = indexes[start:start + self.max_recipients]
+                error = self.send(subject, content, [emails[index].to for index in chunk])
+                for index in chunk:
+                    errors[index] = error
+        return errors
+
+    def send(self, subject, content, recipients):
+        """Send an email to each of `recipients` with one request. Returns None, or the error of the request."""
+        import requests
+
+        try:
+            response = self.session.post(self.url, timeout=settings.OUTBOX_TIMEOUT, json={
+                'personalizations': [{'to': [{'email': recipient}]} for recipient in recipients],
+                'from': {'email': settings.OUTBOX_FROM_EMAIL},
+                'subject': subject,
+                'content': [{'type': 'text/html', 'value': content}],
+            })
+        except requests.RequestException as e:
+            return f'{type(e).__name__}: {e}'
+        return None if response.ok else f'HTTP {response.status_code}: {response.text[:1000]}'
+
+
+class DjangoMailBackend(EmailBackend):
+    """
+    Sends through Django's EMAIL_BACKEND, e.g. an SMTP sink such as MailHog during development, with one
+    connection per batch.
+    """
+
+    def send_messages(self, emails):
+        errors = []
+        with get_connection(fail_silently=False) as connection:
+            for email in emails:
+                message = EmailMessage(email.subject, email.content, settings.OUTBOX_FROM_EMAIL, [email.to],
+                                       connection=connection)
+                message.content_subtype = 'html'
+                try:
+                    message.send()
+                    errors.append(None)
+                except Exception as e:
+                    errors.append(f'{type(e).__name__}: {e}')
+        return errors
+
+
+class FileBackend(EmailBackend):
+    """Local stand-in that writes each email as `<id>.json` in OUTBOX_FILE_DIR, without any network call"""
+
+    def send_messages(self, emails):
+        os.makedirs(settings.OUTBOX_FILE_DIR, exist_ok=True)
+        for email in emails:
+            with open(os.path.join(settings.OUTBOX_FILE_DIR, f'{email.id}.json'), 'w') as f:
+                json.dump({'from': settings.OUTBOX_FROM_EMAIL, 'to': email.to, 'subject': email.subject,
+                           'content': email.content}, f, indent=2)
+        return [None] * len(emails)
+
+
+class LocMemBackend(EmailBackend):
+    """Keeps the delivered emails in memory, in `LocMemBackend.outbox`, for the tests"""
+    outbox = []
+    _lock = threading.Lock()
+
+    def send_messages(self, emails):
+        with self._lock:
+            self.outbox.extend({'to': email.to, 'subject': email.subject, 'content': email.content} for email in emails)
+        return [None] * len(emails)
+
+
+_backends = {}
+
+
+def get_email_backend(path=None):
+    """Return the per-process instance of the email backend at dotted `path` (OUTBOX_BACKEND by default)"""
+    path = path or settings.OUTBOX_BACKEND
+    if path not in _backends:
+        _backends[path] = import_string(path)()
+    return _backends[path]
@@ -0,0 +1,92 @@
+import datetime
+import traceback
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Min, Q
+from django.utils import timezone
+
+from jobs.models import Job
+from jobs.queue import backoff, enqueue
+
+from .backends import get_email_backend
+from .models import OutboundEmail
+
+DELIVERY_TASK = 'outbox.tasks.deliver_outbox'
+
+
+def queue_email(to, subject, content):
+    """
+    Add an email to the outbox, and make sure a delivery job is queued (see `outbox.tasks.deliver_outbox`). The
+    rows are written in the caller's transaction, so the email is only delivered if that transaction commits.
+    """
+    email = OutboundEmail.objects.create(to=to, subject=subject, content=content,
+                                         max_attempts=settings.OUTBOX_MAX_ATTEMPTS)
+    schedule_delivery()
+    return email
+
+
+def schedule_delivery(run_at=None):
+    """Queue a job delivering the outbox at `run_at` (now by default), unless one is already queued by then"""
+    run_at = run_at or timezone.now()
+    if not Job.objects.filter(task=DELIVERY_TASK, status=Job.Status.QUEUED, run_at__lte=run_at).exists():
+        enqueue(DELIVERY_TASK, run_at=run_at)
+
+
+def deliver_batch(batch_size=None, backend=None):
+    """
+    Lock up to `batch_size` (OUTBOX_BATCH_SIZE) emails that are due, oldest first, and deliver them with one call
+    to the backend. Returns the emails of the batch, or an empty list once no email is due.
+
+    Rows locked by another worker are skipped, so several workers can deliver the same outbox. The rows stay locked
+    until their outcome is recorded, so the emails of a worker that dies are simply delivered again by another one.
+    """
+    with transaction.atomic():
+        emails = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True).filter(
+                status=OutboundEmail.Status.PENDING, next_attempt_at__lte=timezone.now()
+            ).order_by('next_attempt_at', 'id')[:batch_size or settings.OUTBOX_BATCH_SIZE]
+        )
+        if emails:
+            deliver(emails, backend)
+    return emails
+
+
+def deliver(emails, backend=None):
+    """Deliver a batch of emails and record the outcome of each of them. Returns the number of emails sent."""
+    try:
+        errors = (backend or get_email_backend()).send_messages(emails)
+    except Exception:
+        errors = [traceback.format_exc()] * len(emails)
+
+    now = timezone.now()
+    sent_ids = [email.id for email, error in zip(emails, errors) if error is None]
+    OutboundEmail.objects.filter(id__in=sent_ids).update(status=OutboundEmail.Status.SENT, sent_at=now,
+                                                         attempts=F('attempts') + 1, last_error='')
+
+    for email, error in zip(emails, errors):
+        email.attempts += 1
+        if error is None:
+            email.status, email.sent_at, email.last_error = OutboundEmail.Status.SENT, now, ''
+            continue
+        email.last_error = error
+        # Keep the email in the outbox until it runs out of attempts
+        if email.attempts < email.max_attempts:
+            email.next_attempt_at = now + datetime.timedelta(seconds=backoff(email.attempts))
+        else:
+            email.status = OutboundEmail.Status.FAILED
+        email.save(update_fields=['status', 'attempts', 'next_attempt_at', 'last_error'])
+    return len(sent_ids)
+
+
+def outbox_metrics():
+    """Number of emails per status, the emails waiting to be retried and the age of the oldest pending email"""
+    pending = Q(status=OutboundEmail.Status.PENDING)
+    metrics = OutboundEmail.objects.aggregate(
+        **{status: Count('id', filter=Q(status=status)) for status in OutboundEmail.Status.values},
+        retrying=Count('id', filter=pending & Q(attempts__gt=0)),
+        oldest_pending=Min('created_at', filter=pending),
+    )
+    oldest_pending = metrics.pop('oldest_pending')
+    metrics['oldest_pending_seconds'] = (timezone.now() - oldest_pending).total_seconds() if oldest_pending else 0
+    return metrics
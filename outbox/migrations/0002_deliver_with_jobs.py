@@ -0,0 +1,35 @@
+# Generated by Django 4.1.1 on 2026-10-18 10:05
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def queue_delivery(apps, schema_editor):
+    """Queue a job delivering the emails that were waiting for the `deliver_outbox` command"""
+    OutboundEmail = apps.get_model('outbox', 'OutboundEmail')
+    Job = apps.get_model('jobs', 'Job')
+
+    OutboundEmail.objects.filter(status='sending').update(status='pending')
+    if OutboundEmail.objects.filter(status='pending').exists():
+        Job.objects.create(task='outbox.tasks.deliver_outbox', run_at=timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0001_initial'),
+        ('outbox', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='outboundemail',
+            name='locked_at',
+        ),
+        migrations.AlterField(
+            model_name='outboundemail',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('sent', 'Sent'), ('failed', 'Failed')], default='pending', max_length=10),
+        ),
+        migrations.RunPython(queue_delivery, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+from django.db.models import Min
+from django.utils import timezone
+
+from .delivery import deliver_batch, schedule_delivery
+from .models import OutboundEmail
+
+
+def deliver_outbox(job, batch_size=None):
+    """
+    Background job run by `runjobs`: deliver the emails of the outbox that are due, batch by batch (see
+    `outbox.delivery.deliver_batch`). The emails left to retry later get a job of their own, due with the first of
+    them. Emails that are due but locked are being delivered by another job, which schedules their retries.
+    """
+    progress = {'batches': 0, 'sent': 0, 'failed': 0}
+    while True:
+        emails = deliver_batch(batch_size)
+        if not emails:
+            break
+        progress['batches'] += 1
+        progress['sent'] += sum(email.status == OutboundEmail.Status.SENT for email in emails)
+        progress['failed'] += sum(email.status == OutboundEmail.Status.FAILED for email in emails)
+
+    next_attempt_at = OutboundEmail.objects.filter(
+        status=OutboundEmail.Status.PENDING, next_attempt_at__gt=timezone.now()
+    ).aggregate(next_attempt_at=Min('next_attempt_at'))['next_attempt_at']
+    if next_attempt_at is not None:
+        schedule_delivery(next_attempt_at)
+    return progress
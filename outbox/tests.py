@@ -0,0 +1,162 @@
+import datetime
+import json
+import os
+import tempfile
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from jobs.models import Job
+from jobs.queue import work
+from outbox.backends import EmailBackend, FileBackend, LocMemBackend, SendGridBackend
+from outbox.delivery import deliver_batch, outbox_metrics, queue_email
+from outbox.models import OutboundEmail
+from users.authentication import BearerToken
+
+
+class FailingBackend(EmailBackend):
+    def send_messages(self, emails):
+        return ['HTTP 503: Service Unavailable' for email in emails]
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.ok = status_code < 400
+        self.text = 'error' if status_code >= 400 else ''
+
+
+class FakeSession:
+    def __init__(self, status_codes):
+        self.status_codes = list(status_codes)
+        self.requests = []
+
+    def post(self, url, json, timeout):
+        self.requests.append(json)
+        return FakeResponse(self.status_codes.pop(0))
+
+
+class OutboxDeliveryTest(TestCase):
+    def setUp(self):
+        LocMemBackend.outbox.clear()
+
+    def test_queue_and_deliver(self):
+        queue_email('johncena123@gmail.com', 'Welcome', '<p>Hello</p>')
+        queue_email('bingbong@gmail.com', 'Welcome', '<p>Hello</p>')
+
+        # One job delivers the whole outbox
+        self.assertEqual(Job.objects.count(), 1)
+        self.assertEqual(work(burst=True), 1)
+
+        self.assertEqual([email['to'] for email in LocMemBackend.outbox], ['johncena123@gmail.com', 'bingbong@gmail.com'])
+        email = OutboundEmail.objects.get(to='johncena123@gmail.com')
+        self.assertEqual(email.status, OutboundEmail.Status.SENT)
+        self.assertEqual(email.attempts, 1)
+        self.assertIsNotNone(email.sent_at)
+        self.assertEqual(Job.objects.get().result, {'batches': 1, 'sent': 2, 'failed': 0})
+
+    @override_settings(OUTBOX_BATCH_SIZE=2)
+    def test_deliver_in_batches(self):
+        for i in range(3):
+            queue_email(f'user{i}@gmail.com', 'Welcome', '<p>Hello</p>')
+
+        work(burst=True)
+
+        self.assertEqual(Job.objects.get().result, {'batches': 2, 'sent': 3, 'failed': 0})
+        self.assertEqual(OutboundEmail.objects.filter(status=OutboundEmail.Status.SENT).count(), 3)
+
+    @override_settings(JOBS_RETRY_BACKOFF=60)
+    def test_failed_email_is_retried_with_backoff(self):
+        queue_email('johncena123@gmail.com', 'Welcome', '<p>Hello</p>')
+        OutboundEmail.objects.update(max_attempts=2)
+
+        self.assertEqual(len(deliver_batch(backend=FailingBackend())), 1)
+
+        email = OutboundEmail.objects.get()
+        self.assertEqual(email.status, OutboundEmail.Status.PENDING)
+        self.assertEqual(email.attempts, 1)
+        self.assertEqual(email.last_error, 'HTTP 503: Service Unavailable')
+        self.assertGreater(email.next_attempt_at, timezone.now() + datetime.timedelta(seconds=50))
+        # Not due before the backoff
+        self.assertEqual(deliver_batch(backend=FailingBackend()), [])
+
+        OutboundEmail.objects.update(next_attempt_at=timezone.now())
+        deliver_batch(backend=FailingBackend())
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboundEmail.Status.FAILED)
+        self.assertEqual(email.attempts, 2)
+
+    @override_settings(OUTBOX_BACKEND='outbox.tests.FailingBackend')
+    def test_delivery_job_schedules_the_retries(self):
+        queue_email('johncena123@gmail.com', 'Welcome', '<p>Hello</p>')
+
+        work(burst=True)
+
+        # The delivery job succeeded, and another one is due with the retry of the email
+        email = OutboundEmail.objects.get()
+        retry_job = Job.objects.get(status=Job.Status.QUEUED)
+        self.assertEqual(retry_job.run_at, email.next_attempt_at)
+        self.assertEqual(Job.objects.filter(status=Job.Status.SUCCEEDED).count(), 1)
+
+    def test_file_backend(self):
+        queue_email('johncena123@gmail.com', 'Welcome', '<p>Hello</p>')
+
+        with tempfile.TemporaryDirectory() as directory, override_settings(OUTBOX_FILE_DIR=directory):
+            deliver_batch(backend=FileBackend())
+
+            email = OutboundEmail.objects.get()
+            with open(os.path.join(directory, f'{email.id}.json')) as f:
+                self.assertEqual(json.load(f)['subject'], 'Welcome')
+        self.assertEqual(email.status, OutboundEmail.Status.SENT)
+
+    def test_sendgrid_backend_sends_a_batch_per_request(self):
+        queue_email('johncena123@gmail.com', 'Welcome', '<p>Hello</p>')
+        queue_email('bingbong@gmail.com', 'Welcome', '<p>Hello</p>')
+        queue_email('bingbong@gmail.com', 'Reset code', '<p>1234</p>')
+        backend = SendGridBackend()
+        backend._session = FakeSession([202, 400])
+
+        deliver_batch(backend=backend)
+
+        # The emails with the same subject and content are sent with one request
+        self.assertEqual(
+            [[personalization['to'][0]['email'] for personalization in request['personalizations']]
+             for request in backend._session.requests],
+            [['johncena123@gmail.com', 'bingbong@gmail.com'], ['bingbong@gmail.com']]
+        )
+        self.assertEqual(OutboundEmail.objects.filter(status=OutboundEmail.Status.SENT).count(), 2)
+        self.assertEqual(OutboundEmail.objects.get(subject='Reset code').last_error, 'HTTP 400: error')
+
+    def test_metrics(self):
+        queue_email('johncena123@gmail.com', 'Welcome', '<p>Hello</p>')
+        queue_email('bingbong@gmail.com', 'Welcome', '<p>Hello</p>')
+        deliver_batch(1)
+
+        metrics = outbox_metrics()
+
+        self.assertEqual(metrics['sent'], 1)
+        self.assertEqual(metrics['pending'], 1)
+        self.assertEqual(metrics['retrying'], 0)
+        self.assertGreaterEqual(metrics['oldest_pending_seconds'], 0)
+
+
+class OutboxMetricsAPITest(APITestCase):
+    def test_metrics_are_staff_only(self):
+        user = User.objects.create_user(username='johncena123@gmail.com', email='johncena123@gmail.com',
+                                        password='wrestlingrules123')
+        token = BearerToken.objects.create(user=user)
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + token.key)
+
+        response = self.client.get(reverse('outbox_metrics'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        user.is_staff = True
+        user.save()
+        queue_email('bingbong@gmail.com', 'Welcome', '<p>Hello</p>')
+        response = self.client.get(reverse('outbox_metrics'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['pending'], 1)
@@ -0,0 +1,6 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('api/outbox/metrics/', views.OutboxMetricsAPIView.as_view(), name='outbox_metrics'),  # Email delivery metrics
+]
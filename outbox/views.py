@@ -0,0 +1,17 @@
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.status import HTTP_200_OK
+from rest_framework.views import APIView
+
+from .delivery import outbox_metrics
+
+
+class OutboxMetricsAPIView(APIView):
+    """
+    Returns the delivery metrics of the outbox: the number of emails pending, sent and failed, the ones
+    waiting to be retried and the age in seconds of the oldest pending email. Staff only.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(outbox_metrics(), status=HTTP_200_OK)
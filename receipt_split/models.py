@@ -1,3 +1,4 @@
+from django.contrib.auth.models import User
 from django.db import models
 from receipts.models import Receipts
 
@@ -8,6 +9,28 @@ class ReceiptSplit(models.Model):
     """
 
     receipt = models.ForeignKey(Receipts, related_name='receipt_user', on_delete=models.DO_NOTHING)
-    shared_user_ids = models.CharField(max_length=100)
     is_shared_with_receipt_owner = models.BooleanField(default=False)
+    # Comma-separated amounts as they were given (or computed from the percentages), the participants hold the
+    # amounts that are owed
     shared_amount = models.CharField(max_length=100)
+
+    @property
+    def shared_user_ids(self):
+        """Comma-joined ids of the users the receipt is shared with, in the order they were given"""
+        return ','.join(str(participant.user_id) for participant in self.participants.all())
+
+
+class ReceiptSplitParticipant(models.Model):
+    """
+    A user a receipt is shared with, and the amount of the receipt they pay.
+    """
+
+    split = models.ForeignKey(ReceiptSplit, related_name='participants', on_delete=models.CASCADE)
+    user = models.ForeignKey(User, related_name='shared_receipt_splits', on_delete=models.CASCADE)
+    amount = models.DecimalField(max_digits=18, decimal_places=2)
+
+    class Meta:
+        ordering = ['id']
+        constraints = [
+            models.UniqueConstraint(fields=['split', 'user'], name='receipt_split_participant_unique'),
+        ]
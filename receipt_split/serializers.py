@@ -1,122 +1,117 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F
 from rest_framework import serializers
 
-from receipts.models import Receipts
-from .models import ReceiptSplit
-from users.models import User
+from ledger.balances import record_participants
+from receipts.models import Receipts, ReceiptStatus
+from utility.cache import bump_user_cache_version
+from .models import ReceiptSplit, ReceiptSplitParticipant
 
 
-class ReceiptSplitSerializer(serializers.ModelSerializer):
-    """
-    Basic serializer that takes in a receipt object and string representation
-    of the list of user ids splitting the receipt
+def split_receipt(owners_receipt, shared_user_ids, shared_amount):
     """
+    Create a copy of `owners_receipt` for each shared user with their shared amount as total, and subtract the
+    shared amounts from the total of the owner's receipt.
 
-    class Meta:
-        model = ReceiptSplit
-        fields = ('receipt', 'shared_user_ids', 'shared_amount')
-
-    def create(self, validated_data):
-        is_shared_with_receipt_owner = False
-
-        if validated_data['receipt'].user.pk in list(map(int, validated_data['shared_user_ids'].split(','))):
-            is_shared_with_receipt_owner = True
-
-        owners_receipt = Receipts.objects.get(id=validated_data['receipt'].pk)
-        shared_amount = list(map(float, validated_data['shared_amount'].split(',')))
-        shared_amount_total = sum(shared_amount)
+    The copies are inserted with one `bulk_create` (they are already complete, so they are not analyzed again) and
+    the owner's total is decreased with one conditional `UPDATE`, in a single transaction. Raises a ValidationError
+    if the shared amounts add up to more than the receipt total.
+    """
+    shared_amount_total = sum(shared_amount)
 
-        if owners_receipt.total - shared_amount_total < 0:
+    with transaction.atomic():
+        if not Receipts.objects.filter(id=owners_receipt.pk, total__gte=shared_amount_total).update(
+                total=F('total') - shared_amount_total):
             raise serializers.ValidationError(
                 "Error: The total amount of the shared amount is greater than the total amount of the receipt")
 
-        # Create a new receipt for each user id in the list of user ids, excluding the receipt owner
-        i = 0
-        for ids in list(map(int, validated_data['shared_user_ids'].split(','))):
-            Receipts.objects.create(
-                user=User.objects.get(pk=ids),
+        Receipts.objects.bulk_create([
+            Receipts(
+                user_id=user_id,
                 scan_date=owners_receipt.scan_date,
                 receipt_image=owners_receipt.receipt_image,
-                merchant=owners_receipt.merchant,
+                merchant_id=owners_receipt.merchant_id,
                 location=owners_receipt.location,
-                total=shared_amount[i],
+                total=amount,
                 tax=owners_receipt.tax,
                 tip=owners_receipt.tip,
                 coupon=owners_receipt.coupon,
-                currency=owners_receipt.currency
+                currency=owners_receipt.currency,
+                status=ReceiptStatus.COMPLETED
             )
+            for user_id, amount in zip(shared_user_ids, shared_amount)
+        ])
+        bump_user_cache_version(owners_receipt.user_id, *shared_user_ids)
+    owners_receipt.total -= shared_amount_total
 
-            # Subtract the total amount of the shared amount from the total amount of the receipt
-            owners_receipt.total = owners_receipt.total - shared_amount[i]
-            owners_receipt.save()
-
-            i += 1
 
-        return ReceiptSplit.objects.create(
-            shared_user_ids=validated_data['shared_user_ids'],
-            is_shared_with_receipt_owner=is_shared_with_receipt_owner,
-            shared_amount=validated_data['shared_amount'],
-            receipt=validated_data['receipt']
+def create_receipt_split(receipt, shared_user_ids, shared_amount, shared_amount_text):
+    """
+    Split `receipt` and record the split with one row per shared user, which owes its amount to the owner.
+    `shared_amount_text` is the comma-separated string of the amounts that the split endpoints return.
+    """
+    with transaction.atomic():
+        # Create a new receipt for each user id in the list of user ids
+        split_receipt(receipt, shared_user_ids, shared_amount)
+
+        receipt_split = ReceiptSplit.objects.create(
+            receipt=receipt,
+            is_shared_with_receipt_owner=receipt.user_id in shared_user_ids,
+            shared_amount=shared_amount_text
         )
+        participants = ReceiptSplitParticipant.objects.bulk_create([
+            ReceiptSplitParticipant(split=receipt_split, user_id=user_id,
+                                    amount=Decimal(str(amount)).quantize(Decimal('0.01')))
+            for user_id, amount in zip(shared_user_ids, shared_amount)
+        ])
+        record_participants(participants)
+    return receipt_split
 
 
-class ReceiptSplitPercentageSerializer(serializers.ModelSerializer):
+class ReceiptSplitSerializer(serializers.ModelSerializer):
     """
-    Basic Serializer that takes in item object and string representation
-    of the list of user ids splitting the item
-    Converts the percentage to the actual amount
+    Basic serializer that takes in a receipt object and string representation
+    of the list of user ids splitting the receipt
     """
 
+    shared_user_ids = serializers.CharField()
+    shared_amount = serializers.CharField()
+
     class Meta:
         model = ReceiptSplit
         fields = ('receipt', 'shared_user_ids', 'shared_amount')
 
     def create(self, validated_data):
-        is_shared_with_receipt_owner = False
-
-        if validated_data['receipt'].user.pk in list(map(int, validated_data['shared_user_ids'].split(','))):
-            is_shared_with_receipt_owner = True
-
-        # Convert the percentage to the actual amount
-        receipt_total = Receipts.objects.get(pk=validated_data['receipt'].pk).total
+        shared_user_ids = list(map(int, validated_data['shared_user_ids'].split(',')))
         shared_amount = list(map(float, validated_data['shared_amount'].split(',')))
 
-        for i in range(len(shared_amount)):
-            shared_amount[i] = float(shared_amount[i]) * float(receipt_total)
+        return create_receipt_split(validated_data['receipt'], shared_user_ids, shared_amount,
+                                    validated_data['shared_amount'])
 
-        owners_receipt = Receipts.objects.get(id=validated_data['receipt'].pk)
 
-        shared_amount_total = sum(shared_amount)
+class ReceiptSplitPercentageSerializer(serializers.ModelSerializer):
+    """
+    Basic Serializer that takes in item object and string representation
+    of the list of user ids splitting the item
+    Converts the percentage to the actual amount
+    """
 
-        if owners_receipt.total - shared_amount_total < 0:
-            raise serializers.ValidationError(
-                "Error: The total amount of the shared amount is greater than the total amount of the receipt")
+    shared_user_ids = serializers.CharField()
+    shared_amount = serializers.CharField()
 
-        # Create a new receipt for each user id in the list of user ids, excluding the receipt owner
-        i = 0
-        for ids in list(map(int, validated_data['shared_user_ids'].split(','))):
-            Receipts.objects.create(
-                user=User.objects.get(pk=ids),
-                scan_date=owners_receipt.scan_date,
-                receipt_image=owners_receipt.receipt_image,
-                merchant=owners_receipt.merchant,
-                location=owners_receipt.location,
-                total=shared_amount[i],
-                tax=owners_receipt.tax,
-                tip=owners_receipt.tip,
-                coupon=owners_receipt.coupon,
-                currency=owners_receipt.currency
-            )
-            # Subtract the shared amount from the receipt owner's receipt
-            owners_receipt.total = owners_receipt.total - shared_amount[i]
-            owners_receipt.save()
+    class Meta:
+        model = ReceiptSplit
+        fields = ('receipt', 'shared_user_ids', 'shared_amount')
 
-            i += 1
+    def create(self, validated_data):
+        shared_user_ids = list(map(int, validated_data['shared_user_ids'].split(',')))
 
-        shared_amount = ','.join(map(str, shared_amount))
+        # Convert the percentage to the actual amount
+        receipt_total = validated_data['receipt'].total
+        shared_amount = [float(percentage) * float(receipt_total)
+                         for percentage in validated_data['shared_amount'].split(',')]
 
-        return ReceiptSplit.objects.create(
-            shared_user_ids=validated_data['shared_user_ids'],
-            is_shared_with_receipt_owner=is_shared_with_receipt_owner,
-            shared_amount=shared_amount,
-            receipt=validated_data['receipt']
-        )
+        return create_receipt_split(validated_data['receipt'], shared_user_ids, shared_amount,
+                                    ','.join(map(str, shared_amount)))
@@ -2,13 +2,17 @@ import datetime
 import os
 
 from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework.status import HTTP_200_OK, HTTP_201_CREATED, HTTP_400_BAD_REQUEST
 
 from users.models import UserProfile
-from .models import ReceiptSplit
+from .models import ReceiptSplit, ReceiptSplitParticipant
 
 from merchant.models import Merchant
-from receipts.models import Receipts
+from jobs.models import Job
+from ledger.models import Balance
+from receipts.models import Receipts, ReceiptStatus
 from users.authentication import BearerToken
 from django.urls import reverse
 from rest_framework.test import APITestCase
@@ -148,13 +152,100 @@ class ReceiptSplitAPITestCase(APITestCase):
 
         self.assertEqual(response.status_code, HTTP_201_CREATED)
 
+        # The shared users are stored as participants, so the receipts shared with a user are a join
+        self.assertEqual(ReceiptSplit.objects.filter(participants__user=self.user3).count(), 1)
+        self.assertEqual(ReceiptSplitParticipant.objects.get(user=self.user2).amount, 10)
+
+    def test_add_receipt_split_of_another_user(self):
+        # Only the owner of a receipt can split it, otherwise any user could create debts between other users
+        receipt = Receipts.objects.create(user=self.user2, total=100)
+
+        response = self.client.post(
+            self.url_add_receipt_split,
+            data={
+                'receipt': receipt.pk,
+                'shared_user_ids': [self.user3.pk],
+                'shared_amount': [10],
+                'is_shared_with_receipt_owner': False
+            },
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+        self.assertFalse(ReceiptSplit.objects.exists())
+        self.assertFalse(Balance.objects.exists())
+
+    def test_add_receipt_split_creates_shared_receipts(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                self.url_add_receipt_split,
+                data={
+                    'receipt': self.receipt.pk,
+                    'shared_user_ids': [self.user2.pk, self.user3.pk],
+                    'shared_amount': [10, 25.5]
+                },
+                format='json'
+            )
+
+        self.assertEqual(response.status_code, HTTP_201_CREATED)
+        self.receipt.refresh_from_db()
+        self.assertEqual(self.receipt.total, 64.5)
+        shared_receipts = Receipts.objects.exclude(id=self.receipt.id).order_by('user_id')
+        self.assertEqual([(receipt.user_id, receipt.total) for receipt in shared_receipts],
+                         [(self.user2.pk, 10), (self.user3.pk, 25.5)])
+        for receipt in shared_receipts:
+            self.assertEqual(receipt.status, ReceiptStatus.COMPLETED)
+            self.assertEqual(receipt.merchant, self.receipt.merchant)
+            self.assertEqual(receipt.scan_date, self.receipt.scan_date)
+        # The shared receipts are not analyzed again
+        self.assertEqual(Job.objects.count(), 1)
+        # The users are checked and the receipts created with a fixed number of queries, plus the update of the
+        # balance between the owner and each shared user
+        self.assertLess(len(queries), 15 + 4 * 2)
+
+    def test_add_receipt_split_percentage(self):
+        response = self.client.post(
+            reverse('add_receipt_split_percentage'),
+            data={
+                'receipt': self.receipt.pk,
+                'shared_user_ids': [self.user2.pk, self.user3.pk],
+                'shared_amount': [0.25, 0.5]
+            },
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, HTTP_201_CREATED)
+        self.assertEqual(response.data['shared_amount'], "25.0,50.0")
+        self.assertEqual([participant.amount for participant in ReceiptSplitParticipant.objects.order_by('id')],
+                         [25, 50])
+        self.receipt.refresh_from_db()
+        self.assertEqual(self.receipt.total, 25)
+
+    def test_add_receipt_split_over_receipt_total(self):
+        response = self.client.post(
+            self.url_add_receipt_split,
+            data={
+                'receipt': self.receipt.pk,
+                'shared_user_ids': [self.user2.pk, self.user3.pk],
+                'shared_amount': [60, 50]
+            },
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+        self.receipt.refresh_from_db()
+        self.assertEqual(self.receipt.total, 100)
+        self.assertEqual(Receipts.objects.count(), 1)
+        self.assertFalse(ReceiptSplit.objects.exists())
+
     def test_get_shared_user_list_pass(self):
         # Create a new ReceiptSplit object
         receiptsplit = ReceiptSplit.objects.create(
             receipt=self.receipt,
-            shared_user_ids=f'{self.user2.pk}, {self.user3.pk}',
             is_shared_with_receipt_owner=False
         )
+        ReceiptSplitParticipant.objects.create(split=receiptsplit, user=self.user2, amount=10)
+        ReceiptSplitParticipant.objects.create(split=receiptsplit, user=self.user3, amount=10)
 
         # The url using kwargs receipt_id
         self.url_shared_users_list = reverse('get_user_list', kwargs={'receipt_id': self.receipt.pk})
@@ -177,11 +268,11 @@ class ReceiptSplitAPITestCase(APITestCase):
 
     def test_get_shared_user_list_invalid_id(self):
         # Create a new ReceiptSplit object
-        ReceiptSplit.objects.create(
+        receiptsplit = ReceiptSplit.objects.create(
             receipt=self.receipt,
-            shared_user_ids=f'{self.user2.pk}, {self.user3.pk}',
             is_shared_with_receipt_owner=False
         )
+        ReceiptSplitParticipant.objects.create(split=receiptsplit, user=self.user2, amount=10)
 
         # The url using kwargs receipt_id with invalid id number e.g. 100
         self.url_shared_users_list = reverse('get_user_list', kwargs={'receipt_id': 100})
@@ -12,72 +12,85 @@ from .models import ReceiptSplit
 from users.models import User
 
 
-class AddReceiptSplitAmountAPI(generics.ListCreateAPIView):
+def validate_receipt_split_request(request):  # noqa: C901
     """
-    Adds a ReceiptSplit object to the database.
-    The list of shared user IDs are a string that represents the list of user IDs (list of integers).
-    Therefore, the list must be separated by commas.
+    Check the receipt, shared_user_ids and shared_amount of a request adding a ReceiptSplit object. Returns the
+    error response to send back, or None if the request is valid. The receipt (which must belong to the user) and
+    all the users are each checked with a single query.
     """
-    serializer_class = ReceiptSplitSerializer
-    permission_classes = [IsAuthenticated]
-    queryset = ReceiptSplit.objects.all()
-
-    def post(self, request, *args, **kwargs):  # noqa: C901
-        # Check if receipt, shared_user_id and shared_amount are provided
-        if 'receipt' not in request.data:
-            return Response({"Response": "Item is not provided."}, status=HTTP_400_BAD_REQUEST)
-        if 'shared_user_ids' not in request.data:
-            return Response({"Response": "shared_user_ids is not provided."}, status=HTTP_400_BAD_REQUEST)
-        if 'shared_amount' not in request.data:
-            return Response({"Response": "shared_amount is not provided."}, status=HTTP_400_BAD_REQUEST)
-
-        if Receipts.objects.filter(id=request.data['receipt']).exists() is not True:
-            return Response({"Response": "Receipt with this ID does not exist."},
+    # Check if receipt, shared_user_id and shared_amount are provided
+    if 'receipt' not in request.data:
+        return Response({"Response": "Item is not provided."}, status=HTTP_400_BAD_REQUEST)
+    if 'shared_user_ids' not in request.data:
+        return Response({"Response": "shared_user_ids is not provided."}, status=HTTP_400_BAD_REQUEST)
+    if 'shared_amount' not in request.data:
+        return Response({"Response": "shared_amount is not provided."}, status=HTTP_400_BAD_REQUEST)
+
+    # Only the owner of a receipt can split it, since the split creates debts in the ledger (see ledger.balances)
+    receipt_total = Receipts.objects.filter(id=request.data['receipt'], user=request.user).values_list('total', flat=True)
+    if not receipt_total:
+        return Response({"Response": "Receipt with this ID does not exist."},
+                        status=HTTP_400_BAD_REQUEST)
+
+    if receipt_total[0] is None or receipt_total[0] <= 0.00:
+        return Response({"Response": "Receipt total is either non-existent or not valid for this receipt."},
+                        status=HTTP_400_BAD_REQUEST)
+
+    # Check if the list shared_user_id and shared_amount are lists
+    if type(request.data['shared_user_ids']) != list:
+        return Response(
+            {"Response": "shared_user_ids is not a list. Ensure that the data is a list of integers"},
+            status=HTTP_400_BAD_REQUEST)
+
+    if type(request.data['shared_amount']) != list:
+        return Response(
+            {"Response": "shared_amount is not a list. Ensure that the data is a list of floats or integers"},
+            status=HTTP_400_BAD_REQUEST)
+
+    # Check if the list shared_user_id and shared_amount is a list of integers
+    for user_id in request.data['shared_user_ids']:
+        if type(user_id) != int:
+            return Response({"Response": "shared_user_ids contains an element that is not an integer"},
                             status=HTTP_400_BAD_REQUEST)
 
-        if Receipts.objects.get(id=request.data['receipt']).total is None or Receipts.objects.get(
-                id=request.data['receipt']).total <= 0.00:
-            return Response({"Response": "Receipt total is either non-existent or not valid for this receipt."},
+    for amount in request.data['shared_amount']:
+        if type(amount) != float and type(amount) != int:
+            return Response({"Response": "shared_amount contains an element that is not an integer or float"},
                             status=HTTP_400_BAD_REQUEST)
 
-        # Check if the list shared_user_id and shared_amount are lists
-        if type(request.data['shared_user_ids']) != list:
-            return Response(
-                {"Response": "shared_user_ids is not a list. Ensure that the data is a list of integers"},
-                status=HTTP_400_BAD_REQUEST)
+    # Check if the number of user ids and amounts are the same
+    if len(request.data['shared_user_ids']) != len(request.data['shared_amount']):
+        return Response({"Response": "Number of user IDs and amounts do not match."},
+                        status=HTTP_400_BAD_REQUEST)
 
-        if type(request.data['shared_amount']) != list:
-            return Response(
-                {"Response": "shared_amount is not a list. Ensure that the data is a list of floats or integers"},
-                status=HTTP_400_BAD_REQUEST)
+    # Try to check for uniqueness of the list of user ids since a user can't have a same receipt shared more than
+    # once as it creates multiple instances of the same receipt
+    user_ids_list_as_set = set(request.data['shared_user_ids'])
+    if len(user_ids_list_as_set) != len(request.data['shared_user_ids']):
+        return Response({"Response": "List of user IDs contains duplicates."},
+                        status=HTTP_400_BAD_REQUEST)
 
-        # Check if the list shared_user_id and shared_amount is a list of integers
-        for user_id in request.data['shared_user_ids']:
-            if type(user_id) != int:
-                return Response({"Response": "shared_user_ids contains an element that is not an integer"},
-                                status=HTTP_400_BAD_REQUEST)
+    # Check if the user ids are valid (they exist)
+    if User.objects.filter(id__in=user_ids_list_as_set).count() != len(user_ids_list_as_set):
+        return Response({"Response": "List of users do not exist."}, status=HTTP_400_BAD_REQUEST)
 
-        for amount in request.data['shared_amount']:
-            if type(amount) != float and type(amount) != int:
-                return Response({"Response": "shared_amount contains an element that is not an integer or float"},
-                                status=HTTP_400_BAD_REQUEST)
+    return None
 
-        # Check if the number of user ids and amounts are the same
-        if len(request.data['shared_user_ids']) != len(request.data['shared_amount']):
-            return Response({"Response": "Number of user IDs and amounts do not match."},
-                            status=HTTP_400_BAD_REQUEST)
 
-        # Try to check for uniqueness of the list of user ids since a user can't have a same receipt shared more than
-        # once as it creates multiple instances of the same receipt
-        user_ids_list_as_set = set(request.data['shared_user_ids'])
-        if len(user_ids_list_as_set) != len(request.data['shared_user_ids']):
-            return Response({"Response": "List of user IDs contains duplicates."},
-                            status=HTTP_400_BAD_REQUEST)
+class AddReceiptSplitAmountAPI(generics.ListCreateAPIView):
+    """
+    Adds a ReceiptSplit object to the database.
+    The list of shared user IDs are a string that represents the list of user IDs (list of integers).
+    Therefore, the list must be separated by commas.
+    """
+    serializer_class = ReceiptSplitSerializer
+    permission_classes = [IsAuthenticated]
+    queryset = ReceiptSplit.objects.all()
 
-        # Check if the user ids are valid (they exist)
-        for user_id in request.data['shared_user_ids']:
-            if User.objects.filter(id=user_id).exists() is not True:
-                return Response({"Response": "List of users do not exist."}, status=HTTP_400_BAD_REQUEST)
+    def post(self, request, *args, **kwargs):
+        error_response = validate_receipt_split_request(request)
+        if error_response is not None:
+            return error_response
 
         # Convert the list of user ids and amounts to a string
         request.data['shared_user_ids'] = ','.join(map(str, request.data['shared_user_ids']))
@@ -96,88 +109,14 @@ class AddReceiptSplitAmountAPI(generics.ListCreateAPIView):
         return Response(response_data, status=HTTP_201_CREATED)
 
 
-class AddReceiptSplitPercentageAPI(generics.ListCreateAPIView):
+class AddReceiptSplitPercentageAPI(AddReceiptSplitAmountAPI):
     """
     Adds a ReceiptSplit object to the database.
     The list of shared user IDs are a string that represents the list of user IDs (list of integers).
     Therefore, the list must be separated by commas.
+    The shared amounts are percentages (as fractions) of the receipt total, converted to the actual amounts.
     """
     serializer_class = ReceiptSplitPercentageSerializer
-    permission_classes = [IsAuthenticated]
-    queryset = ReceiptSplit.objects.all()
-
-    def post(self, request, *args, **kwargs):  # noqa: C901
-        # Check if receipt, shared_user_id and shared_amount are provided
-        if 'receipt' not in request.data:
-            return Response({"Response": "Item is not provided."}, status=HTTP_400_BAD_REQUEST)
-        if 'shared_user_ids' not in request.data:
-            return Response({"Response": "shared_user_ids is not provided."}, status=HTTP_400_BAD_REQUEST)
-        if 'shared_amount' not in request.data:
-            return Response({"Response": "shared_amount is not provided."}, status=HTTP_400_BAD_REQUEST)
-
-        if Receipts.objects.filter(id=request.data['receipt']).exists() is not True:
-            return Response({"Response": "Receipt with this ID does not exist."},
-                            status=HTTP_400_BAD_REQUEST)
-
-        if Receipts.objects.get(id=request.data['receipt']).total is None or Receipts.objects.get(
-                id=request.data['receipt']).total <= 0.00:
-            return Response({"Response": "Receipt total is either non-existent or not valid for this receipt."},
-                            status=HTTP_400_BAD_REQUEST)
-
-        # Check if the list shared_user_id and shared_amount are lists
-        if type(request.data['shared_user_ids']) != list:
-            return Response(
-                {"Response": "shared_user_ids is not a list. Ensure that the data is a list of integers"},
-                status=HTTP_400_BAD_REQUEST)
-
-        if type(request.data['shared_amount']) != list:
-            return Response(
-                {"Response": "shared_amount is not a list. Ensure that the data is a list of floats or integers"},
-                status=HTTP_400_BAD_REQUEST)
-
-        # Check if the list shared_user_id and shared_amount is a list of integers
-        for user_id in request.data['shared_user_ids']:
-            if type(user_id) != int:
-                return Response({"Response": "shared_user_ids contains an element that is not an integer"},
-                                status=HTTP_400_BAD_REQUEST)
-
-        for amount in request.data['shared_amount']:
-            if type(amount) != float and type(amount) != int:
-                return Response({"Response": "shared_amount contains an element that is not an integer or float"},
-                                status=HTTP_400_BAD_REQUEST)
-
-        # Check if the number of user ids and amounts are the same
-        if len(request.data['shared_user_ids']) != len(request.data['shared_amount']):
-            return Response({"Response": "Number of user IDs and amounts do not match."},
-                            status=HTTP_400_BAD_REQUEST)
-
-        # Try to check for uniqueness of the list of user ids since a user can't have a same receipt shared more than
-        # once as it creates multiple instances of the same receipt
-        user_ids_list_as_set = set(request.data['shared_user_ids'])
-        if len(user_ids_list_as_set) != len(request.data['shared_user_ids']):
-            return Response({"Response": "List of user IDs contains duplicates."},
-                            status=HTTP_400_BAD_REQUEST)
-
-        # Check if the user ids are valid (they exist)
-        for user_id in request.data['shared_user_ids']:
-            if User.objects.filter(id=user_id).exists() is not True:
-                return Response({"Response": "List of users do not exist."}, status=HTTP_400_BAD_REQUEST)
-
-        # Convert the list of user ids and amounts to a string
-        request.data['shared_user_ids'] = ','.join(map(str, request.data['shared_user_ids']))
-        request.data['shared_amount'] = ','.join(map(str, request.data['shared_amount']))
-
-        serializer = self.get_serializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
-
-        receipt_split = serializer.save()
-        response_data = {
-            "receipt_id": receipt_split.receipt.id,
-            "shared_user_ids": receipt_split.shared_user_ids,
-            "is_shared_with_receipt_owner": receipt_split.is_shared_with_receipt_owner,
-            "shared_amount": receipt_split.shared_amount,
-        }
-        return Response(response_data, status=HTTP_201_CREATED)
 
 
 class GetSharedUsersList(generics.GenericAPIView):
@@ -202,11 +141,8 @@ class GetSharedUsersList(generics.GenericAPIView):
                 {'Response': f"ReceiptSplit object with a receipt id of '{kwargs['receipt_id']}' does not exist"},
                 status=HTTP_400_BAD_REQUEST)
 
-        # Create the list of user ids from the string list
-        user_id_list = list(map(int, receipt_split.shared_user_ids.split(',')))
-
         # Create a list of shared_users by first name of the user (frontend needs chips with first name)
-        user_first_name_list = [User.objects.get(id=user_id).first_name for user_id in user_id_list]
+        user_first_name_list = list(receipt_split.participants.values_list('user__first_name', flat=True))
         return Response({
             "original_user": receipt_split.receipt.user.first_name,
             # From the receipt object, get the user's first name
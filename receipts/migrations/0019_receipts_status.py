@@ -0,0 +1,24 @@
+# Generated by Django 4.1.1 on 2026-10-18 08:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('receipts', '0018_alter_receipts_receipt_image'),
+    ]
+
+    operations = [
+        # Receipts that already exist were analyzed when they were uploaded
+        migrations.AddField(
+            model_name='receipts',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('completed', 'Completed'), ('failed', 'Failed')], default='completed', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='receipts',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=10),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.1.1 on 2026-10-18 08:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('receipts', '0019_receipts_status'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='receipts',
+            index=models.Index(fields=['user', 'scan_date', 'id'], name='receipts_user_scan_date_idx'),
+        ),
+    ]
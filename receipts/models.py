@@ -6,7 +6,7 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
 from django.dispatch import receiver
-from django.db.models.signals import pre_save, post_save
+from django.db.models.signals import pre_save, post_save, post_delete
 
 from merchant.models import Merchant
 
@@ -25,6 +25,14 @@ def upload_to(instance, filename):
         return 'receipt_images/{instance}/{filename}'.format(instance=instance.user.id, filename=filename)
 
 
+class ReceiptStatus(models.TextChoices):
+    """Progress of the analysis (OCR) of a receipt image"""
+    PENDING = 'pending'
+    PROCESSING = 'processing'
+    COMPLETED = 'completed'
+    FAILED = 'failed'
+
+
 class Receipts(models.Model):
     """A Receipts model with a user model"""
     user = models.ForeignKey(User, related_name='receipts', on_delete=models.CASCADE)
@@ -38,11 +46,19 @@ class Receipts(models.Model):
     coupon = models.FloatField(null=True, blank=True)
     currency = models.CharField(max_length=10, null=True, blank=True)
     receipt_text = models.TextField(default=None, blank=True, null=True)
+    status = models.CharField(max_length=10, choices=ReceiptStatus.choices, default=ReceiptStatus.PENDING)
+
+    class Meta:
+        indexes = [
+            # Paginating a user's receipts by date (see utility.pagination.keyset_paginate)
+            models.Index(fields=['user', 'scan_date', 'id'], name='receipts_user_scan_date_idx'),
+        ]
 
     def save(self, *args, **kwargs):
+        # A receipt without an image has nothing to analyze
+        if self._state.adding and not self.receipt_image:
+            self.status = ReceiptStatus.COMPLETED
         super(Receipts, self).save(*args, **kwargs)
-        # if self.receipt_image and self.receipt_text is None:
-        #     analyze_receipts(self.receipt_image.path)
 
     # When a receipt image is deleted from the database, the receipt image file is also deleted from the file
     # system/server
@@ -58,12 +74,37 @@ class Receipts(models.Model):
         create_update_receipt(sender, instance)
         pass
 
+    # The receipt image is analyzed by a background worker (see `receipts.tasks.analyze_receipt`), so creating
+    # a receipt only has to queue the job. Clients poll the receipt status to know when the items are ready.
     @receiver(post_save, sender='receipts.Receipts')
     def post_save_receipt(sender, instance, created, *args, **kwargs):
-        if os.getenv('APP_ENV') != 'test':
-            from utility.analyze_receipt import analyze_receipts
-            from utility.categorize_line_items import categorize_line_items
-            if created:
-                instance.receipt_text = analyze_receipts(instance.receipt_image.path, instance)
-                categorize_line_items(instance)
-                instance.save()
+        from jobs.queue import enqueue
+        if created and instance.status == ReceiptStatus.PENDING:
+            enqueue('receipts.tasks.analyze_receipt', user=instance.user, receipt_id=instance.id)
+
+    # A change of the scan date of a receipt moves its items to other buckets of the spending rollups (see
+    # item.rollups)
+    @receiver(pre_save, sender='receipts.Receipts')
+    def pre_save_spending(sender, instance, *args, **kwargs):
+        from item.models import Item
+        from item.rollups import spending_of_items
+        instance._previous_spending = []
+        if instance.id:
+            previous_scan_date = sender.objects.filter(id=instance.id).values_list('scan_date', flat=True).first()
+            if previous_scan_date != instance.scan_date:
+                instance._previous_spending = spending_of_items(Item.objects.filter(receipt_id=instance.id))
+
+    @receiver(post_save, sender='receipts.Receipts')
+    def post_save_spending(sender, instance, *args, **kwargs):
+        from item.models import Item
+        from item.rollups import record_spending, spending_of_items
+        if getattr(instance, '_previous_spending', []):
+            record_spending(instance._previous_spending, sign=-1)
+            record_spending(spending_of_items(Item.objects.filter(receipt_id=instance.id)))
+
+    # The available filters of the user are cached (see utility.cache)
+    @receiver(post_save, sender='receipts.Receipts')
+    @receiver(post_delete, sender='receipts.Receipts')
+    def invalidate_cached_receipts(sender, instance, *args, **kwargs):
+        from utility.cache import bump_user_cache_version
+        bump_user_cache_version(instance.user_id)
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from merchant.models import Merchant
+from merchant.resolver import resolve_merchant
 
 from receipts.models import Receipts
 
@@ -10,7 +10,8 @@ class ReceiptsSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Receipts
-        fields = ('user', 'receipt_image')
+        fields = ('id', 'user', 'receipt_image', 'status')
+        read_only_fields = ('status',)
 
     def create(self, validated_data):
         receipt = Receipts.objects.create(
@@ -27,11 +28,10 @@ class ManualReceiptsSerializer(serializers.ModelSerializer):
     class Meta:
         model = Receipts
         fields = '__all__'
+        read_only_fields = ('status',)
 
     def create(self, validated_data):
-        merchant = Merchant.objects.create(
-            name=validated_data['merchant']
-        )
+        merchant = resolve_merchant(validated_data['merchant'])
         receipt = Receipts.objects.create(
             user=validated_data['user'],
             receipt_image=validated_data.get('receipt_image', None),
@@ -65,4 +65,6 @@ class PutPatchReceiptsSerializer(serializers.ModelSerializer):
             'merchant_name',
             'total',
             'currency',
+            'status',
         )
+        read_only_fields = ('status',)
@@ -0,0 +1,29 @@
+from .models import Receipts, ReceiptStatus
+
+
+def analyze_receipt(job, receipt_id):
+    """
+    Background job run by `runjobs`: analyze the image of a receipt and create its categorized items
+    """
+    from utility.analyze_receipt import analyze_receipts
+
+    try:
+        receipt = Receipts.objects.select_related('user').get(id=receipt_id)
+    except Receipts.DoesNotExist:
+        # The receipt was deleted before it could be analyzed
+        return {'receipt_id': receipt_id, 'status': None}
+
+    Receipts.objects.filter(id=receipt_id).update(status=ReceiptStatus.PROCESSING)
+
+    try:
+        # Creates the items and marks the receipt as completed
+        analyze_receipts(receipt.receipt_image.path, receipt)
+    except Exception:
+        # The job is retried until it runs out of attempts (see jobs.queue.run), so clients keep polling until then
+        last_attempt = job.attempts >= job.max_attempts
+        Receipts.objects.filter(id=receipt_id).update(
+            status=ReceiptStatus.FAILED if last_attempt else ReceiptStatus.PENDING
+        )
+        raise
+
+    return {'receipt_id': receipt_id, 'status': ReceiptStatus.COMPLETED}
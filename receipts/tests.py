@@ -1,18 +1,30 @@
 import datetime
 import os
+from decimal import Decimal
 from random import randint
 import time
 
 from django.contrib.auth.models import User
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from users.authentication import BearerToken
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.timezone import make_aware
 from rest_framework import status
 from rest_framework.test import APITransactionTestCase, APITestCase
 
-from receipts.models import Receipts
+from category.models import Category
+from item.models import Item, SpendingPeriod, SpendingRollup
+from jobs.models import Job
+from jobs.queue import work
+from receipts.models import Receipts, ReceiptStatus
+from rules.models import Rule
 from users.models import UserProfile
 from merchant.models import Merchant
+from utility.analyze_receipt import analyze_receipts
+from utility.ocr import FixtureOcrBackend, get_ocr_backend
 
 
 class AddReceiptsAPITest(APITransactionTestCase):
@@ -820,6 +832,55 @@ class PaginationReceiptsAPITest(APITestCase):
         self.assertTrue(len(response.data['page_list']) == 0)
         self.assertEqual(response.data['description'], 'Invalid Page Number')
 
+    def test_cursor_pagination(self):
+        Receipts.objects.filter(user=self.user).delete()
+        # Some receipts share a scan date, so the order falls back to the id
+        for day in [3, 1, 2, 2, 5, 4, 2]:
+            Receipts.objects.create(user=self.user, scan_date=make_aware(datetime.datetime(2022, 1, day)))
+        expected_ids = list(Receipts.objects.filter(user=self.user).order_by('-scan_date', '-id').values_list('id', flat=True))
+
+        url_paged_receipts = reverse('list_paged_receipts', kwargs={'pageNumber': 1, 'pageSize': 3})
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token.key)
+
+        pages = []
+        response = self.client.get(url_paged_receipts, {'cursor': ''}, format='json')
+        self.assertIsNone(response.data['previous'])
+        pages.append([receipt['id'] for receipt in response.data['page_list']])
+        while response.data['next']:
+            response = self.client.get(url_paged_receipts, {'cursor': response.data['next']}, format='json')
+            pages.append([receipt['id'] for receipt in response.data['page_list']])
+
+        self.assertEqual(pages, [expected_ids[0:3], expected_ids[3:6], expected_ids[6:7]])
+
+        # Go back from the last page
+        response = self.client.get(url_paged_receipts, {'cursor': response.data['previous']}, format='json')
+        self.assertEqual([receipt['id'] for receipt in response.data['page_list']], expected_ids[3:6])
+        response = self.client.get(url_paged_receipts, {'cursor': response.data['previous']}, format='json')
+        self.assertEqual([receipt['id'] for receipt in response.data['page_list']], expected_ids[0:3])
+        self.assertIsNone(response.data['previous'])
+
+    def test_cursor_pagination_invalid_cursor(self):
+        url_paged_receipts = reverse('list_paged_receipts', kwargs={'pageNumber': 1, 'pageSize': 10})
+
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token.key)
+
+        response = self.client.get(url_paged_receipts, {'cursor': 'test'}, format='json')
+
+        self.assertTrue(len(response.data['page_list']) == 0)
+        self.assertEqual(response.data['description'], 'Invalid Cursor')
+
+    def test_pagination_only_fetches_requested_page(self):
+        url_paged_receipts = reverse('list_paged_receipts', kwargs={'pageNumber': 1, 'pageSize': 10})
+
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token.key)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url_paged_receipts, format='json')
+
+        self.assertTrue(len(response.data['page_list']) <= 10)
+        # Authentication, the count and the page itself (merchants are joined), whatever the number of receipts
+        self.assertLessEqual(len(queries), 4)
+
 
 class TestReceiptsFilteringOrderingSearching(APITestCase):
     def setUp(self):
@@ -926,3 +987,191 @@ class TestReceiptsFilteringOrderingSearching(APITestCase):
 
         # only one receipt contained the currency USD
         self.assertEqual(len(response.data['page_list']), 1)
+
+
+class FailingOcrBackend(FixtureOcrBackend):
+    """Fixture backend failing its first `failures` analyses, like an OCR API that is temporarily unavailable"""
+    failures = 0
+
+    def analyze(self, image_path):
+        if FailingOcrBackend.failures > 0:
+            FailingOcrBackend.failures -= 1
+            raise ConnectionError('OCR API unavailable')
+        return super().analyze(image_path)
+
+
+class ReceiptStatusAPITest(APITestCase):
+    """
+    Test Cases for the background analysis of uploaded receipt images
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='johncena123@gmail.com',
+            email='johncena123@gmail.com',
+            first_name='John',
+            last_name='Cena',
+            password='wrestlingrules123'
+        )
+        for category_name in ['food', 'product', 'Other']:
+            Category.objects.create(user=self.user, category_name=category_name)
+        self.other_user = User.objects.create_user(
+            username='johndoe123@gmail.com',
+            email='johndoe123@gmail.com',
+            first_name='John',
+            last_name='Doe',
+            password='trollingrules123'
+        )
+
+        self.token = BearerToken.objects.create(user=self.user)
+
+    def test_new_receipt_image_is_queued_for_analysis(self):
+        receipt = Receipts.objects.create(
+            user=self.user,
+            receipt_image=os.path.join('receipt_image_for_tests.png')
+        )
+
+        self.assertEqual(receipt.status, ReceiptStatus.PENDING)
+        self.assertTrue(Job.objects.filter(
+            task='receipts.tasks.analyze_receipt',
+            kwargs={'receipt_id': receipt.id},
+            status=Job.Status.QUEUED
+        ).exists())
+
+    def test_receipt_without_image_is_not_queued(self):
+        receipt = Receipts.objects.create(
+            user=self.user,
+            merchant=Merchant.objects.create(name='Random Merchant'),
+            total=1.1
+        )
+
+        self.assertEqual(receipt.status, ReceiptStatus.COMPLETED)
+        self.assertFalse(Job.objects.exists())
+
+    def test_get_receipt_status(self):
+        receipt = Receipts.objects.create(
+            user=self.user,
+            receipt_image=os.path.join('receipt_image_for_tests.png')
+        )
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token.key)
+
+        response = self.client.get(reverse('receipt_status', kwargs={'receipt_id': receipt.id}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'receipt_id': receipt.id, 'status': ReceiptStatus.PENDING})
+
+        # Running the queued job completes the analysis
+        work(burst=True)
+
+        response = self.client.get(reverse('receipt_status', kwargs={'receipt_id': receipt.id}))
+        self.assertEqual(response.data['status'], ReceiptStatus.COMPLETED)
+        self.assertEqual(Job.objects.get().status, Job.Status.SUCCEEDED)
+
+    @override_settings(OCR_BACKEND='receipts.tests.FailingOcrBackend')
+    def test_failed_analysis_is_retried(self):
+        FailingOcrBackend.failures = 1
+        receipt = Receipts.objects.create(
+            user=self.user,
+            receipt_image=os.path.join('receipt_image_for_tests.png')
+        )
+
+        work(burst=True)
+
+        # The job is retried later, so the receipt is still pending rather than failed
+        receipt.refresh_from_db()
+        self.assertEqual(receipt.status, ReceiptStatus.PENDING)
+        job = Job.objects.get()
+        self.assertEqual(job.status, Job.Status.QUEUED)
+
+        Job.objects.filter(id=job.id).update(run_at=timezone.now())
+        work(burst=True)
+
+        receipt.refresh_from_db()
+        self.assertEqual(receipt.status, ReceiptStatus.COMPLETED)
+        self.assertEqual(Item.objects.filter(receipt=receipt).count(), 4)
+
+    @override_settings(OCR_BACKEND='receipts.tests.FailingOcrBackend')
+    def test_analysis_fails_after_the_last_attempt(self):
+        FailingOcrBackend.failures = 3
+        receipt = Receipts.objects.create(
+            user=self.user,
+            receipt_image=os.path.join('receipt_image_for_tests.png')
+        )
+
+        for _ in range(3):
+            Job.objects.update(run_at=timezone.now())
+            work(burst=True)
+
+        receipt.refresh_from_db()
+        self.assertEqual(receipt.status, ReceiptStatus.FAILED)
+        self.assertEqual(Job.objects.get().status, Job.Status.FAILED)
+
+    def test_analysis_creates_categorized_items(self):
+        # Tests use the local fixture OCR backend, which replays utility/ocr_fixtures/default.json
+        receipt = Receipts.objects.create(
+            user=self.user,
+            receipt_image=os.path.join('receipt_image_for_tests.png')
+        )
+
+        work(burst=True)
+
+        receipt.refresh_from_db()
+        self.assertEqual(receipt.merchant.name, 'Walmart')
+        self.assertEqual(receipt.total, 23.45)
+        self.assertEqual(receipt.tax, 1.2)
+        self.assertIn('Paper Towels', receipt.receipt_text)
+
+        items = {item.name: item for item in Item.objects.filter(receipt=receipt).select_related('category_id')}
+        self.assertEqual(sorted(items), ['Bananas', 'Bread', 'Milk 2L', 'Paper Towels'])
+        self.assertEqual(str(items['Milk 2L'].price), '4.99')
+        self.assertEqual(items['Milk 2L'].category_id.category_name, 'food')
+        self.assertEqual(items['Paper Towels'].category_id.category_name, 'product')
+        # Line items without a suggested category go in "Other"
+        self.assertEqual(items['Bananas'].category_id.category_name, 'Other')
+
+        # The bulk inserted items are added to the spending rollups
+        rollups = SpendingRollup.objects.filter(user=self.user, period=SpendingPeriod.MONTH)
+        self.assertEqual(sum(rollup.total for rollup in rollups), Decimal('22.25'))
+        self.assertEqual(sum(rollup.count for rollup in rollups), 4)
+
+    def test_analysis_applies_rules(self):
+        Rule.objects.create(user=self.user, regex='Ban.*', category=Category.objects.get(user=self.user, category_name='food'))
+        receipt = Receipts.objects.create(
+            user=self.user,
+            receipt_image=os.path.join('receipt_image_for_tests.png')
+        )
+
+        work(burst=True)
+
+        # The rule takes precedence over the category suggested by the OCR backend
+        self.assertEqual(Item.objects.get(receipt=receipt, name='Bananas').category_id.category_name, 'food')
+        self.assertEqual(Item.objects.get(receipt=receipt, name='Bread').category_id.category_name, 'food')
+
+    def test_analysis_writes_items_in_bulk(self):
+        receipt = Receipts.objects.create(
+            user=self.user,
+            receipt_image=os.path.join('receipt_image_for_tests.png')
+        )
+
+        with CaptureQueriesContext(connection) as context:
+            analyze_receipts(receipt.receipt_image.path, receipt)
+
+        statements = [query['sql'] for query in context.captured_queries]
+        # All the line items are inserted at once, and the receipt is finalized with a single update
+        self.assertEqual(len([sql for sql in statements if sql.startswith('INSERT INTO "item_item"')]), 1)
+        self.assertEqual(len([sql for sql in statements if sql.startswith('UPDATE "receipts_receipts"')]), 1)
+        self.assertEqual(Item.objects.filter(receipt=receipt).count(), 4)
+        self.assertEqual(Receipts.objects.get(id=receipt.id).status, ReceiptStatus.COMPLETED)
+
+    def test_ocr_backend_is_created_once_per_process(self):
+        self.assertIsInstance(get_ocr_backend(), FixtureOcrBackend)
+        self.assertIs(get_ocr_backend(), get_ocr_backend())
+
+    def test_get_receipt_status_of_another_user(self):
+        receipt = Receipts.objects.create(
+            user=self.other_user,
+            receipt_image=os.path.join('receipt_image_for_tests.png')
+        )
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token.key)
+
+        response = self.client.get(reverse('receipt_status', kwargs={'receipt_id': receipt.id}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
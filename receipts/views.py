@@ -16,6 +16,8 @@ from rest_framework.parsers import MultiPartParser, FormParser
 from django.core.paginator import Paginator
 from rest_framework.status import HTTP_200_OK
 from django.core.files.images import ImageFile
+from utility.cache import cache_response
+from utility.pagination import InvalidCursor, keyset_paginate
 
 
 class PostReceiptsAPIView(generics.CreateAPIView):
@@ -85,21 +87,9 @@ class DefaultReceiptPaginationAPIListView(generics.ListAPIView):
 
     def get(self, request, *args, **kwargs):
         """
-        Get the response from the super class which returns the entire list
-        and then paginate the results
+        Filter, order and count the receipts in the database and only fetch and serialize the requested page.
+        When a `cursor` query parameter is given (empty for the first page), keyset pagination is used instead.
         """
-        #
-        receipt_list_response = super().get(request, *args, **kwargs)
-        # Try to turn page number to an int value, otherwise make sure the response returns an empty list
-        try:
-            kwargs['pageNumber'] = int(kwargs['pageNumber'])
-        except Exception:
-            return Response({
-                'page_list': [],
-                'total': 0,
-                'description': "Invalid Page Number"
-            }, status=HTTP_200_OK)
-
         # Try to turn page size to an int value, otherwise set to default value of 10
         try:
             kwargs['pageSize'] = int(kwargs['pageSize'])
@@ -111,7 +101,23 @@ class DefaultReceiptPaginationAPIListView(generics.ListAPIView):
             # Make default page size = 10
             kwargs['pageSize'] = 10
 
-        paginator = Paginator(receipt_list_response.data, kwargs['pageSize'])
+        if 'cursor' in request.query_params:
+            return self.get_cursor_page(request, kwargs['pageSize'])
+
+        # Try to turn page number to an int value, otherwise make sure the response returns an empty list
+        try:
+            kwargs['pageNumber'] = int(kwargs['pageNumber'])
+        except Exception:
+            return Response({
+                'page_list': [],
+                'total': 0,
+                'description': "Invalid Page Number"
+            }, status=HTTP_200_OK)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        # Break ties of the requested ordering by id so rows do not move between pages
+        queryset = queryset.order_by(*queryset.query.order_by, 'id')
+        paginator = Paginator(queryset, kwargs['pageSize'])
 
         # If page number is greater than page limit, return an empty list
         if kwargs['pageNumber'] > paginator.num_pages:
@@ -130,17 +136,47 @@ class DefaultReceiptPaginationAPIListView(generics.ListAPIView):
             }, status=HTTP_200_OK)
 
         page = paginator.page(kwargs['pageNumber'])
+        page_list = self.get_serializer(page.object_list, many=True).data
 
         return Response({
-            'page_list': page.object_list,
-            'total': len(page.object_list),
+            'page_list': page_list,
+            'total': len(page_list),
             'description': str(page),
             'current_page_number': page.number,
             'number_of_pages': page.paginator.num_pages
         }, status=HTTP_200_OK)
 
+    def get_cursor_page(self, request, page_size):
+        """
+        Keyset pagination from the most recent receipt (by scan_date, then id). The `next` and `previous` tokens of
+        the response are passed back as the `cursor` query parameter. The `ordering` query parameter is ignored.
+        """
+        queryset = self.get_queryset()
+        for backend in self.filter_backends:
+            if backend is not filters.OrderingFilter:
+                queryset = backend().filter_queryset(request, queryset, self)
+
+        try:
+            receipts, next_cursor, previous_cursor = keyset_paginate(
+                queryset, 'scan_date', request.query_params['cursor'], page_size
+            )
+        except InvalidCursor:
+            return Response({
+                'page_list': [],
+                'total': 0,
+                'description': "Invalid Cursor"
+            }, status=HTTP_200_OK)
+
+        page_list = self.get_serializer(receipts, many=True).data
+        return Response({
+            'page_list': page_list,
+            'total': len(page_list),
+            'next': next_cursor,
+            'previous': previous_cursor
+        }, status=HTTP_200_OK)
+
     def get_queryset(self):
-        return Receipts.objects.filter(user=self.request.user)
+        return Receipts.objects.filter(user=self.request.user).select_related('merchant').order_by('id')
 
 
 class DetailReceiptsAPIView(generics.RetrieveUpdateDestroyAPIView):
@@ -153,6 +189,24 @@ class DetailReceiptsAPIView(generics.RetrieveUpdateDestroyAPIView):
         return Receipts.objects.filter(user=self.request.user)
 
 
+class ReceiptStatusAPIView(APIView):
+    """
+    Returns the analysis status of a receipt (pending, processing, completed or failed).
+    Clients poll this after uploading a receipt image to know when its items are available.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        receipt = Receipts.objects.filter(id=kwargs['receipt_id'], user=request.user).values('id', 'status').first()
+        if receipt is None:
+            return Response({"response": "Receipt not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        return Response({
+            'receipt_id': receipt['id'],
+            'status': receipt['status']
+        }, status=HTTP_200_OK)
+
+
 class ParseReceiptsAPIView(APIView):
     """
     any email to budgetlens.tech will be sent to this api
@@ -194,6 +248,7 @@ class ParseReceiptsAPIView(APIView):
 class ReceiptsAvailableFilters(APIView):
     permission_classes = [IsAuthenticated]
 
+    @cache_response('receipt-filters')
     def get(self, request):
         merchants = list(
             Receipts.objects.filter(user=self.request.user).distinct().all().values_list('merchant__name', flat=True)
@@ -0,0 +1,166 @@
+import re
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import Count, Max
+
+from .models import Rule
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+# Rules without any of these characters can only match literally
+_SPECIAL_CHARACTERS = set('.^$*+?{}[]\\|()')
+# Nodes of parsed regular expressions that can make matching backtrack exponentially, see `is_slow_regex`
+_REPEATS = {getattr(sre_parse, name) for name in ('MAX_REPEAT', 'MIN_REPEAT', 'POSSESSIVE_REPEAT')
+            if hasattr(sre_parse, name)}
+_BACKREFERENCES = {sre_parse.GROUPREF, sre_parse.GROUPREF_EXISTS}
+
+
+def _nested_patterns(op, av):
+    """The subpatterns nested in a node of a parsed regular expression"""
+    if op in _REPEATS:
+        return [av[2]]
+    if op == sre_parse.SUBPATTERN:
+        return [av[-1]]
+    if op == sre_parse.BRANCH:
+        return av[1]
+    if op in (sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+        return [av[1]]
+    if op == getattr(sre_parse, 'ATOMIC_GROUP', None):
+        return [av]
+    return []
+
+
+def _is_slow_pattern(subpattern, in_repeat=False):
+    for op, av in subpattern:
+        if op in _BACKREFERENCES:
+            return True
+        # A quantifier repeating a variable number of times, nested in another one
+        repeated = op in _REPEATS and av[0] != av[1]
+        if repeated and in_repeat:
+            return True
+        if any(_is_slow_pattern(nested, in_repeat or repeated) for nested in _nested_patterns(op, av)):
+            return True
+    return False
+
+
+def is_slow_regex(regex):
+    """
+    Whether matching `regex` can take exponential time (backtracking), i.e. it has a quantifier nested in another
+    one (e.g. `(a*)*b`) or a backreference. Invalid regular expressions only match literally, so they are not slow.
+    """
+    try:
+        return _is_slow_pattern(sre_parse.parse(regex))
+    except (re.error, OverflowError, RecursionError):
+        return False
+
+
+class RuleEngine:
+    """
+    The categorization rules of a user, compiled once. A rule matches an item name that is equal to its `regex`,
+    or that its `regex` matches entirely. When several rules match, the oldest (lowest id) wins.
+
+    Names are looked up in a dict of the rule texts, then matched against a single alternation of all the
+    regular expressions, so categorizing a name does not loop over the rules. Rules whose `regex` is not a valid
+    regular expression, or could take exponential time to match (see `is_slow_regex`), only match literally.
+    """
+
+    def __init__(self, rules):
+        """`rules` is an iterable of (rule id, regex, category id)"""
+        self.literals = {}
+        self.group_rules = {}
+        self.separate_patterns = []
+        combinable = []
+
+        for rule_id, regex, category_id in sorted(rules):
+            if category_id is None:
+                continue
+            self.literals.setdefault(regex, (rule_id, category_id))
+            if not _SPECIAL_CHARACTERS.intersection(regex):
+                continue
+            if is_slow_regex(regex):
+                continue
+            try:
+                pattern = re.compile(regex)
+            except re.error:
+                continue
+            combinable.append((rule_id, category_id, pattern))
+
+        self.combined_pattern = None
+        if combinable:
+            try:
+                self.combined_pattern = re.compile('|'.join(
+                    f'(?P<rule{index}>{pattern.pattern})' for index, (rule_id, category_id, pattern) in enumerate(combinable)
+                ))
+                self.group_rules = {f'rule{index}': (rule_id, category_id)
+                                    for index, (rule_id, category_id, pattern) in enumerate(combinable)}
+            except re.error:
+                # e.g. inline flags, which are only allowed at the start of a pattern
+                self.separate_patterns = combinable
+
+    def match(self, name):
+        """Return the (rule id, category id) of the rule matching `name`, or None"""
+        matches = []
+        if name in self.literals:
+            matches.append(self.literals[name])
+        if self.combined_pattern is not None:
+            match = self.combined_pattern.fullmatch(name)
+            if match is not None:
+                matches.append(self.group_rules[match.lastgroup])
+        for rule_id, category_id, pattern in self.separate_patterns:
+            if pattern.fullmatch(name):
+                matches.append((rule_id, category_id))
+                break
+        return min(matches) if matches else None
+
+    def categorize(self, name, default=None):
+        """Return the id of the category given to `name` by the rules, or `default` if no rule matches"""
+        match = self.match(name)
+        return match[1] if match is not None else default
+
+
+class RuleEngineCache:
+    """
+    Per-process LRU cache of the compiled rules of RULE_ENGINE_CACHE_SIZE users. A cached engine is reused as long
+    as the rules of its user are unchanged, which is checked with a single aggregate query on the rules.
+    """
+
+    def __init__(self):
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        rules = Rule.objects.filter(user_id=user_id)
+        version = tuple(rules.aggregate(count=Count('id'), updated_at=Max('updated_at')).values())
+
+        with self._lock:
+            cached = self._cache.get(user_id)
+            if cached is not None and cached[0] == version:
+                self._cache.move_to_end(user_id)
+                return cached[1]
+
+        engine = RuleEngine(rules.values_list('id', 'regex', 'category_id'))
+        if settings.RULE_ENGINE_CACHE_SIZE > 0:
+            with self._lock:
+                self._cache[user_id] = (version, engine)
+                self._cache.move_to_end(user_id)
+                # Evict the least recently used engines
+                while len(self._cache) > settings.RULE_ENGINE_CACHE_SIZE:
+                    self._cache.popitem(last=False)
+        return engine
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+rule_engines = RuleEngineCache()
+
+
+def get_rule_engine(user):
+    """The compiled categorization rules of a user (or user id)"""
+    return rule_engines.get(getattr(user, 'id', user))
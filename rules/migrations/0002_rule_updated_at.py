@@ -0,0 +1,18 @@
+# Generated by Django 4.1.1 on 2026-10-18 08:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rules', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rule',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -1,6 +1,8 @@
 from django.utils import timezone
 from django.contrib.auth.models import User
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 
 from category.models import Category
 
@@ -10,3 +12,11 @@ class Rule(models.Model):
     regex = models.CharField(max_length=36)
     category = models.ForeignKey(Category, related_name='rule_category', null=True, on_delete=models.DO_NOTHING)
     created_at = models.DateTimeField(default=timezone.now, null=True, blank=True)
+    # Tells when the compiled rules of a user (see rules.engine) must be rebuilt
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @receiver(post_save, sender='rules.Rule')
+    @receiver(post_delete, sender='rules.Rule')
+    def invalidate_cached_rules(sender, instance, *args, **kwargs):
+        from utility.cache import bump_user_cache_version
+        bump_user_cache_version(instance.user_id)
@@ -1,13 +1,26 @@
 from rest_framework import serializers
+from rules.engine import is_slow_regex
 from rules.models import Rule
 from datetime import datetime
 
 
+def validate_rule_regex(regex):
+    """Rules are matched against the names of every analyzed item, so they must not be able to backtrack forever"""
+    if is_slow_regex(regex):
+        raise serializers.ValidationError(
+            "Nested quantifiers (e.g. '(a*)*') and backreferences are not allowed, they can take too long to match."
+        )
+    return regex
+
+
 class RuleSerializer(serializers.ModelSerializer):
     class Meta:
         model = Rule
         fields = ('regex', 'category', 'created_at')
 
+    def validate_regex(self, value):
+        return validate_rule_regex(value)
+
     def create(self, validated_data):
         rule = Rule.objects.create(
             user=self.context['request'].user,
@@ -24,3 +37,6 @@ class PutPatchRuleSerializer(serializers.ModelSerializer):
     class Meta:
         model = Rule
         fields = ('regex', 'category')
+
+    def validate_regex(self, value):
+        return validate_rule_regex(value)
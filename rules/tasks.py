@@ -0,0 +1,47 @@
+from collections import defaultdict
+
+from django.db import transaction
+
+from item.models import Item
+from item.rollups import rebuild_spending_rollups
+from jobs.queue import heartbeat
+from utility.cache import bump_user_cache_version
+
+from .engine import get_rule_engine
+
+
+def recategorize_items(job, user_id, chunk_size=1000):
+    """
+    Background job run by `runjobs`: apply the current rules of a user to all of their items. The items are read
+    in chunks of `chunk_size`, and the items of each chunk that change category are updated with one `UPDATE`
+    per category. The progress is saved in `job.result` after each chunk, which also refreshes the lock of the job.
+    """
+    rule_engine = get_rule_engine(user_id)
+    items = Item.objects.filter(user_id=user_id)
+    progress = {'total': items.count(), 'scanned': 0, 'changed': 0}
+
+    last_id = 0
+    while True:
+        chunk = list(items.filter(id__gt=last_id).order_by('id').values_list('id', 'name', 'category_id')[:chunk_size])
+        if not chunk:
+            break
+        last_id = chunk[-1][0]
+
+        changes = defaultdict(list)
+        for item_id, name, category_id in chunk:
+            new_category_id = rule_engine.categorize(name, default=category_id)
+            if new_category_id != category_id:
+                changes[new_category_id].append(item_id)
+
+        with transaction.atomic():
+            for category_id, item_ids in changes.items():
+                progress['changed'] += Item.objects.filter(id__in=item_ids).update(category_id=category_id)
+
+        progress['scanned'] += len(chunk)
+        heartbeat(job, progress)
+
+    # The updates above do not send the item signals
+    if progress['changed']:
+        rebuild_spending_rollups(user_id)
+        bump_user_cache_version(user_id)
+    return progress
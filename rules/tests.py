@@ -1,10 +1,20 @@
+import datetime
+
 from django.contrib.auth.models import User
 from rest_framework import status
 
 from category.models import Category
+from item.models import Item, SpendingPeriod, SpendingRollup
+from jobs.models import Job
+from jobs.queue import enqueue, work
+from receipts.models import Receipts
+from rules.engine import RuleEngine, get_rule_engine
 from rules.models import Rule
+from rules.tasks import recategorize_items
 from users.authentication import BearerToken
 from django.urls import reverse
+from django.utils.timezone import make_aware
+from django.test import SimpleTestCase
 from rest_framework.test import APITransactionTestCase
 
 from users.models import UserProfile
@@ -30,13 +40,15 @@ class TestRules(APITransactionTestCase):
             'password': 'wrestlingrules123'
         }
 
-        self.client.post(
+        response = self.client.post(
             reverse('login_user'),
             data=self.data,
             format='json'
         )
 
+        # Only the digest of the token is stored, the token itself is returned by the login
         self.token = BearerToken.objects.get(user=self.user)
+        self.token.key = response.data['token']
 
         self.category1 = Category.objects.create(
             user=self.user,
@@ -83,6 +95,28 @@ class TestRules(APITransactionTestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(Rule.objects.count(), original_rules_count + 1)
 
+    def test_create_rule_with_slow_regex(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token.key)
+
+        original_rules_count = Rule.objects.count()
+
+        response = self.client.post(
+            reverse('add_rule'),
+            data={"regex": "(a*)*b", "category": self.category1.id},
+            format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('regex', response.data)
+        self.assertEqual(Rule.objects.count(), original_rules_count)
+
+        response = self.client.put(
+            reverse('rule_details', kwargs={'rule_id': 1}),
+            data={"regex": "(\\w+)\\1", "category": self.category1.id},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Rule.objects.get(id=1).regex, 'clothes')
+
     def test_get_rules(self):
         self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token.key)
 
@@ -96,6 +130,12 @@ class TestRules(APITransactionTestCase):
         self.assertEqual(response.data[0]['regex'], rule.regex)
         self.assertEqual(response.data[0]['category'], rule.category.id)
 
+        # The rules are cached until they change
+        rule.regex = 'shirts'
+        rule.save()
+        response = self.client.get(reverse('get_rules'))
+        self.assertEqual(response.data[0]['regex'], 'shirts')
+
     def test_delete_rule(self):
         self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token.key)
 
@@ -133,3 +173,132 @@ class TestRules(APITransactionTestCase):
         self.assertEqual(original_rule.user, edited_rule.user)
         self.assertNotEqual(original_rule.regex, edited_rule.regex)
         self.assertNotEqual(original_rule.category, edited_rule.category)
+
+    def test_rule_engine_follows_rule_changes(self):
+        self.assertEqual(get_rule_engine(self.user).categorize('food'), self.category1.id)
+
+        Rule.objects.create(user=self.user, regex='(coffee|tea)', category=self.category2)
+        self.assertEqual(get_rule_engine(self.user).categorize('tea'), self.category2.id)
+
+        self.rules2.category = self.category2
+        self.rules2.save()
+        self.assertEqual(get_rule_engine(self.user).categorize('food'), self.category2.id)
+
+        self.rules2.delete()
+        self.assertIsNone(get_rule_engine(self.user).categorize('food'))
+
+
+class TestRuleEngine(SimpleTestCase):
+    def test_literal_rules(self):
+        engine = RuleEngine([(1, 'coffee', 10), (2, 'Milk 2L', 20)])
+
+        self.assertEqual(engine.categorize('coffee'), 10)
+        self.assertEqual(engine.categorize('Milk 2L'), 20)
+        self.assertIsNone(engine.categorize('iced coffee'))
+        self.assertEqual(engine.categorize('tea', default=30), 30)
+
+    def test_regex_rules_match_the_whole_name(self):
+        engine = RuleEngine([(1, 'coffee.*', 10), (2, '[0-9]+ ?ml', 20)])
+
+        self.assertEqual(engine.categorize('coffee beans'), 10)
+        self.assertEqual(engine.categorize('500 ml'), 20)
+        self.assertIsNone(engine.categorize('iced coffee'))
+        self.assertIsNone(engine.categorize('500 ml water'))
+
+    def test_oldest_rule_wins(self):
+        engine = RuleEngine([(3, 'coffee', 30), (1, 'coff.*', 10), (2, '.*ee', 20), (4, 'tea', 40), (5, '.*', 50)])
+
+        self.assertEqual(engine.categorize('coffee'), 10)
+        self.assertEqual(engine.categorize('toffee'), 20)
+        self.assertEqual(engine.categorize('tea'), 40)
+        self.assertEqual(engine.categorize('bread'), 50)
+
+    def test_rule_is_matched_literally(self):
+        # The text of a rule always matches itself, even if the regex does not
+        engine = RuleEngine([(1, 'a+', 10), (2, 'c++', 20), (3, '[unclosed', 30)])
+
+        self.assertEqual(engine.categorize('a+'), 10)
+        self.assertEqual(engine.categorize('aaa'), 10)
+        self.assertEqual(engine.categorize('c++'), 20)
+        self.assertEqual(engine.categorize('[unclosed'), 30)
+
+    def test_rules_that_cannot_be_combined(self):
+        engine = RuleEngine([(1, 'a{2}', 10), (2, '(?i)tea', 20), (3, 'b.*', 30)])
+
+        self.assertIsNone(engine.combined_pattern)
+        self.assertEqual(engine.categorize('aa'), 10)
+        self.assertEqual(engine.categorize('TEA'), 20)
+        self.assertEqual(engine.categorize('bread'), 30)
+
+    def test_slow_rules_are_matched_literally(self):
+        # Rules created before their regex was validated
+        engine = RuleEngine([(1, '(a*)*b', 10), (2, r'(a)\1', 20)])
+
+        self.assertEqual(engine.categorize('(a*)*b'), 10)
+        self.assertIsNone(engine.categorize('a' * 30))
+        self.assertIsNone(engine.categorize('aa'))
+
+    def test_rules_without_category_are_ignored(self):
+        engine = RuleEngine([(1, 'coffee', None), (2, 'coff.*', 20)])
+
+        self.assertEqual(engine.categorize('coffee'), 20)
+
+
+class TestRecategorizeItems(APITransactionTestCase):
+    reset_sequences = True
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='johncena123@gmail.com',
+            email='momoamineahmadi@gmail.com',
+            first_name='John',
+            last_name='Cena',
+            password='wrestlingrules123'
+        )
+        self.token = BearerToken.objects.create(user=self.user)
+        self.category1 = Category.objects.create(user=self.user, category_name="drinks")
+        self.category2 = Category.objects.create(user=self.user, category_name="food")
+        self.receipt = Receipts.objects.create(user=self.user, scan_date=make_aware(datetime.datetime(2022, 3, 15)))
+        for name in ['coffee', 'iced coffee', 'bread', 'coffee']:
+            Item.objects.create(user=self.user, receipt=self.receipt, category_id=self.category2, name=name, price=1)
+
+    def test_add_rule_and_apply_to_existing_items(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token.key)
+
+        response = self.client.post(
+            reverse('add_rule'),
+            data={"regex": ".*coffee", "category": self.category1.id, "apply_to_existing": True},
+            format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        work(burst=True)
+
+        self.assertEqual(Item.objects.filter(category_id=self.category1).count(), 3)
+        self.assertEqual(Item.objects.get(name='bread').category_id, self.category2)
+        # The spending rollups are rebuilt after the bulk update
+        self.assertEqual(SpendingRollup.objects.get(category=self.category1, period=SpendingPeriod.DAY).count, 3)
+
+        response = self.client.get(reverse('job_status', kwargs={'job_id': response.data['job']}))
+        self.assertEqual(response.data['status'], Job.Status.SUCCEEDED)
+        self.assertEqual(response.data['result'], {'total': 4, 'scanned': 4, 'changed': 3})
+
+    def test_edit_rule_without_applying_to_existing_items(self):
+        rule = Rule.objects.create(user=self.user, regex="bread", category=self.category2)
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token.key)
+
+        response = self.client.put(
+            reverse('rule_details', kwargs={'rule_id': rule.id}),
+            data={"regex": "bread", "category": self.category1.id},
+            format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('job', response.data)
+        self.assertFalse(Job.objects.filter(task='rules.tasks.recategorize_items').exists())
+
+    def test_recategorize_items_in_chunks(self):
+        Rule.objects.create(user=self.user, regex="coffee", category=self.category1)
+        job = enqueue('rules.tasks.recategorize_items', user=self.user, user_id=self.user.id)
+
+        self.assertEqual(recategorize_items(job, self.user.id, chunk_size=3), {'total': 4, 'scanned': 4, 'changed': 2})
+        self.assertEqual(list(Item.objects.filter(category_id=self.category1).values_list('name', flat=True)),
+                         ['coffee', 'coffee'])
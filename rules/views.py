@@ -2,8 +2,20 @@ from rest_framework import generics
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.status import HTTP_200_OK, HTTP_400_BAD_REQUEST
+from jobs.queue import enqueue
 from rules.models import Rule
 from rules.serializers import RuleSerializer, PutPatchRuleSerializer
+from utility.cache import cache_response
+
+
+def recategorize_items_if_requested(request):
+    """
+    When the request has `apply_to_existing` set, queue a job applying the rules of the user to all of their
+    existing items, and return its id (see `jobs.views.JobStatusAPIView` for its progress)
+    """
+    if str(request.data.get('apply_to_existing', '')).lower() not in ('true', '1'):
+        return None
+    return enqueue('rules.tasks.recategorize_items', user=request.user, user_id=request.user.id).id
 
 
 class GetRulesAPI(generics.ListAPIView):
@@ -11,6 +23,7 @@ class GetRulesAPI(generics.ListAPIView):
     serializer_class = RuleSerializer
     permission_classes = [IsAuthenticated]
 
+    @cache_response('rules')
     def get(self, request, *args, **kwargs):
         rules = self.get_queryset()
         serializer = RuleSerializer(rules, many=True)
@@ -21,7 +34,7 @@ class GetRulesAPI(generics.ListAPIView):
 
 
 class AddRuleAPI(generics.CreateAPIView):
-    """ Adds a rule for a user """
+    """ Adds a rule for a user, and optionally (`apply_to_existing`) re-categorizes their existing items """
     serializer_class = RuleSerializer
     permission_classes = [IsAuthenticated]
 
@@ -29,16 +42,20 @@ class AddRuleAPI(generics.CreateAPIView):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         rule = serializer.save()
-        return Response({
+        response = {
             "user": rule.user.id,
             "regex": rule.regex,
             "category": rule.category.id,
             "created_at": rule.created_at
-        }, status=HTTP_200_OK)
+        }
+        job_id = recategorize_items_if_requested(request)
+        if job_id is not None:
+            response["job"] = job_id
+        return Response(response, status=HTTP_200_OK)
 
 
 class RuleDetailAPIView(generics.ListAPIView):
-    """ details for a rule and edit a rule """
+    """ details for a rule and edit a rule, optionally (`apply_to_existing`) re-categorizing the existing items """
     permission_classes = [IsAuthenticated]
     serializer_class = PutPatchRuleSerializer
 
@@ -60,7 +77,11 @@ class RuleDetailAPIView(generics.ListAPIView):
                 serializer = PutPatchRuleSerializer(rule, data=request.data)
                 if serializer.is_valid():
                     serializer.save()
-                    return Response({"Rule edited successfully": serializer.data}, status=HTTP_200_OK)
+                    response = {"Rule edited successfully": serializer.data}
+                    job_id = recategorize_items_if_requested(request)
+                    if job_id is not None:
+                        response["job"] = job_id
+                    return Response(response, status=HTTP_200_OK)
                 return Response({"Error editing rule": serializer.errors}, status=HTTP_400_BAD_REQUEST)
             return Response({"Error": "Rule does not exist"}, status=HTTP_400_BAD_REQUEST)
 
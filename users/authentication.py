@@ -1,58 +1,198 @@
-import binascii
-import os
+import datetime
+import hashlib
+import secrets
+import threading
+import time
 
 from django.conf import settings
-from django.db import models
+from django.core.cache import caches
+from django.db import models, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
+from rest_framework import exceptions
 from rest_framework.authentication import TokenAuthentication
 
+from utility.cache import is_shared_cache
+
 
 class BearerToken(models.Model):
     """
-    The BearerToken model which was extracted fromt the default authorization token model in Django.
-    All this to change the size of the token.
+    A session token of a user, one per device the user logged in from. Only the SHA-256 digest of the token is
+    stored: the token itself (`key`) is a random 32-byte secret that is only known right after the token is
+    created, to be returned to the client.
     """
-    key = models.CharField(_("Key"), max_length=500, primary_key=True)
-    user = models.OneToOneField(
-        settings.AUTH_USER_MODEL, related_name='auth_bearertoken',
+    digest = models.CharField(_("Digest"), max_length=64, unique=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, related_name='bearer_tokens',
         on_delete=models.CASCADE, verbose_name=_("User")
     )
+    name = models.CharField(_("Name"), max_length=100, blank=True, default='')
     created = models.DateTimeField(_("Created"), auto_now_add=True)
+    # Written in batches by `LastUsedTracker`, so it may be behind by up to BEARER_TOKEN_LAST_USED_INTERVAL
+    last_used_at = models.DateTimeField(_("Last used at"), null=True, blank=True)
+    expires_at = models.DateTimeField(_("Expires at"), null=True, blank=True)
+
+    # The token itself, only set on the instances that were just created
+    key = None
 
     class Meta:
-        abstract = 'rest_framework.authtoken' not in settings.INSTALLED_APPS
         verbose_name = _("BearerToken")
         verbose_name_plural = _("BearerTokens")
 
     def save(self, *args, **kwargs):
-        if not self.key:
+        if not self.digest:
             self.key = self.generate_key()
+            self.digest = token_digest(self.key)
+            if self.expires_at is None and settings.BEARER_TOKEN_LIFETIME is not None:
+                self.expires_at = timezone.now() + datetime.timedelta(seconds=settings.BEARER_TOKEN_LIFETIME)
         return super().save(*args, **kwargs)
 
     @classmethod
     def generate_key(cls):
-        return binascii.hexlify(os.urandom(250)).decode()
+        return secrets.token_urlsafe(32)
+
+    @property
+    def is_expired(self):
+        return self.expires_at is not None and self.expires_at <= timezone.now()
 
     def __str__(self):
-        return self.key
+        return f'{self.user_id}: {self.name or self.id}'
+
+    # Authenticated tokens are cached, so they are evicted when they are changed (e.g. their expiry) or deleted
+    # (logout, revocation, or the user is deleted)
+    @receiver(post_save, sender='users.BearerToken')
+    def post_save_token(sender, instance, created, *args, **kwargs):
+        if not created:
+            invalidate_tokens([instance.digest])
+
+    @receiver(post_delete, sender='users.BearerToken')
+    def post_delete_token(sender, instance, *args, **kwargs):
+        invalidate_tokens([instance.digest])
+
+    # The cached users must not outlive a password change, or deactivation
+    @receiver(post_save, sender=settings.AUTH_USER_MODEL)
+    def post_save_user(sender, instance, created, *args, **kwargs):
+        if not created:
+            invalidate_tokens(BearerToken.objects.filter(user=instance).values_list('digest', flat=True))
+
+
+def token_digest(key):
+    """SHA-256 of a token key: what is stored of the token, and what it is cached under"""
+    return hashlib.sha256(key.encode()).hexdigest()
 
 
-class BearerTokenProxy(BearerToken):
+class TokenCache:
     """
-    Proxy mapping pk to user pk for use in admin.
-    From Django rest framework libraries
+    Cache of the authenticated (user, token) of token digests in the BEARER_TOKEN_CACHE Django cache, kept for
+    BEARER_TOKEN_CACHE_TTL seconds.
+
+    A revoked token must be evicted for every process at once, so tokens are only cached when that cache is shared
+    by the processes (e.g. Redis, see CACHE_URL). With a per-process cache, such as the default local-memory one,
+    every request reads its token from the database.
     """
+
+    def __init__(self, alias=None):
+        self.alias = alias
+
     @property
-    def pk(self):
-        return self.user_id
+    def cache(self):
+        cache = caches[self.alias or settings.BEARER_TOKEN_CACHE]
+        return cache if is_shared_cache(cache) else None
 
-    class Meta:
-        proxy = 'rest_framework.authtoken' in settings.INSTALLED_APPS
-        abstract = 'rest_framework.authtoken' not in settings.INSTALLED_APPS
-        verbose_name = "bearertoken"
+    @staticmethod
+    def key(digest):
+        return f'bearer-token:{digest}'
+
+    def get(self, digest):
+        cache = self.cache
+        return cache.get(self.key(digest)) if cache is not None else None
+
+    def set(self, digest, entry):
+        cache = self.cache
+        if cache is not None:
+            cache.set(self.key(digest), entry, settings.BEARER_TOKEN_CACHE_TTL)
+
+    def delete(self, digests):
+        cache = self.cache
+        if cache is not None:
+            cache.delete_many([self.key(digest) for digest in digests])
+
+
+token_cache = TokenCache()
+
+
+class LastUsedTracker:
+    """
+    Per-process batch of the tokens used since the last write of their `last_used_at`. Instead of an UPDATE per
+    request, the tokens are marked as used with a single UPDATE at most every BEARER_TOKEN_LAST_USED_INTERVAL
+    seconds (never automatically when it is None, e.g. in tests).
+    """
+
+    def __init__(self):
+        self._digests = set()
+        self._lock = threading.Lock()
+        self._flushed_at = time.monotonic()
+
+    def touch(self, digest):
+        interval = settings.BEARER_TOKEN_LAST_USED_INTERVAL
+        with self._lock:
+            self._digests.add(digest)
+            due = interval is not None and time.monotonic() - self._flushed_at >= interval
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Write the `last_used_at` of the tokens used since the last flush, and return their number"""
+        with self._lock:
+            digests, self._digests = self._digests, set()
+            self._flushed_at = time.monotonic()
+        if digests:
+            BearerToken.objects.filter(digest__in=digests).update(last_used_at=timezone.now())
+        return len(digests)
+
+
+last_used = LastUsedTracker()
+
+
+def invalidate_tokens(digests):
+    """
+    Evict tokens (by digest) from the authentication cache. Evicted again once the transaction commits, in case a
+    concurrent request cached the token from the database before the change was committed.
+    """
+    digests = list(digests)
+    if digests:
+        token_cache.delete(digests)
+        transaction.on_commit(lambda: token_cache.delete(digests))
 
 
 class BearerAuthentication(TokenAuthentication):
+    """
+    Token authentication that caches the authenticated users, so that most requests are authenticated without
+    any query when the cache is shared by the processes. Tokens are cached under their SHA-256 digest, see
+    `TokenCache`.
+    """
     keyword = 'Bearer'
     model = BearerToken
+
+    def authenticate_credentials(self, key):
+        digest = token_digest(key)
+        entry = token_cache.get(digest)
+        if entry is None:
+            try:
+                token = self.get_model().objects.select_related('user').get(digest=digest)
+            except self.get_model().DoesNotExist:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            entry = (token.user, token)
+            if token.user.is_active:
+                token_cache.set(digest, entry)
+
+        user, token = entry
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        if token.is_expired:
+            raise exceptions.AuthenticationFailed(_('Token expired.'))
+        last_used.touch(digest)
+        return user, token
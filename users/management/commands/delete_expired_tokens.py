@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from users.authentication import BearerToken
+
+
+class Command(BaseCommand):
+    help = 'Delete the bearer tokens that have expired'
+
+    def handle(self, *args, **options):
+        deleted, _ = BearerToken.objects.filter(expires_at__lte=timezone.now()).delete()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired token(s)'))
@@ -0,0 +1,32 @@
+# Generated by Django 4.1.1 on 2026-10-18 09:13
+
+from django.db import migrations
+from django.db.models import Count
+
+
+def deduplicate_forwarding_emails(apps, schema_editor):
+    """Give a new forwarding address to every profile but the oldest one sharing an address"""
+    from users.models import generate_forwarding_email
+
+    UserProfile = apps.get_model('users', 'UserProfile')
+    duplicates = (
+        UserProfile.objects.filter(forwarding_email__isnull=False)
+        .values('forwarding_email').annotate(count=Count('id')).filter(count__gt=1)
+        .values_list('forwarding_email', flat=True)
+    )
+    for forwarding_email in list(duplicates):
+        profiles = UserProfile.objects.filter(forwarding_email=forwarding_email).select_related('user').order_by('id')
+        for profile in profiles[1:]:
+            profile.forwarding_email = generate_forwarding_email(profile.user.email, profile_model=UserProfile)
+            profile.save(update_fields=['forwarding_email'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_rename_forwardingemail_userprofile_forwarding_email'),
+    ]
+
+    operations = [
+        migrations.RunPython(deduplicate_forwarding_emails, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.1.1 on 2026-10-18 09:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_deduplicate_forwarding_emails'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='userprofile',
+            name='forwarding_email',
+            field=models.EmailField(max_length=254, null=True, unique=True),
+        ),
+    ]
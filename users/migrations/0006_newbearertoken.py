@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('users', '0005_userprofile_forwarding_email_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NewBearerToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('digest', models.CharField(max_length=64, unique=True, verbose_name='Digest')),
+                ('name', models.CharField(blank=True, default='', max_length=100, verbose_name='Name')),
+                # Not auto_now_add yet, so that the creation date of the copied tokens is kept
+                ('created', models.DateTimeField(verbose_name='Created')),
+                ('last_used_at', models.DateTimeField(blank=True, null=True, verbose_name='Last used at')),
+                ('expires_at', models.DateTimeField(blank=True, null=True, verbose_name='Expires at')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bearer_tokens', to=settings.AUTH_USER_MODEL, verbose_name='User')),
+            ],
+            options={
+                'verbose_name': 'BearerToken',
+                'verbose_name_plural': 'BearerTokens',
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+import hashlib
+
+from django.db import migrations
+
+
+def copy_tokens(apps, schema_editor):
+    """
+    Keep the existing sessions: the tokens are copied as the SHA-256 of their key, which is what a client sending
+    its token is looked up by. They keep not expiring, like before.
+    """
+    BearerToken = apps.get_model('users', 'BearerToken')
+    NewBearerToken = apps.get_model('users', 'NewBearerToken')
+    NewBearerToken.objects.bulk_create([
+        NewBearerToken(digest=hashlib.sha256(token.key.encode()).hexdigest(), user_id=token.user_id,
+                       created=token.created)
+        for token in BearerToken.objects.iterator()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_newbearertoken'),
+    ]
+
+    operations = [
+        # The keys of the tokens cannot be recovered from their digest, so they are not copied back
+        migrations.RunPython(copy_tokens, migrations.RunPython.noop),
+    ]
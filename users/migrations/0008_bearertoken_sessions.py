@@ -0,0 +1,27 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_copy_bearer_tokens'),
+    ]
+
+    # Separate from the copy of the tokens, since Postgres cannot rename a table with pending foreign key checks
+    operations = [
+        migrations.DeleteModel(
+            name='BearerTokenProxy',
+        ),
+        migrations.DeleteModel(
+            name='BearerToken',
+        ),
+        migrations.RenameModel(
+            old_name='NewBearerToken',
+            new_name='BearerToken',
+        ),
+        migrations.AlterField(
+            model_name='bearertoken',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, verbose_name='Created'),
+        ),
+    ]
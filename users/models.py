@@ -1,3 +1,5 @@
+import secrets
+
 from django.db import models
 from django.contrib.auth.models import User
 from phonenumber_field.modelfields import PhoneNumberField
@@ -11,11 +13,19 @@ class UserProfile(models.Model):
     user = models.OneToOneField(User, related_name='user', on_delete=models.CASCADE)
     telephone_number = PhoneNumberField(null=False, blank=False, unique=True)
     one_time_code = models.PositiveBigIntegerField(default=0)
-    forwarding_email = models.EmailField(max_length=254, null=True)
+    forwarding_email = models.EmailField(max_length=254, null=True, unique=True)
+
+    # A new user must not be served the responses cached for a previous user with the same id (see utility.cache)
+    @receiver(post_save, sender=User)
+    def post_save_auth_user(sender, instance, created, *args, **kwargs):
+        from utility.cache import bump_user_cache_version
+        if created:
+            bump_user_cache_version(instance.id)
 
     @receiver(post_save, sender='users.UserProfile')
     def post_save_user(sender, instance, created, *args, **kwargs):
         from category.models import Category
+        from utility.cache import bump_user_cache_version
         if created:
             Category.objects.bulk_create([
                 Category(category_name='room', category_toggle_star=False, user_id=instance.id, icon='ic_baseline_hotel_24'),
@@ -34,3 +44,23 @@ class UserProfile(models.Model):
                 Category(category_name='payment', category_toggle_star=False, user_id=instance.id, icon='ic_baseline_payment_24'),
                 Category(category_name='Other', category_toggle_star=False, user_id=instance.id, icon='ic_baseline_category_24'),
             ])
+            # Inserted without signals
+            bump_user_cache_version(instance.id)
+
+
+FORWARDING_EMAIL_DOMAIN = 'budgetlens.tech'
+
+
+def generate_forwarding_email(email, profile_model=UserProfile):
+    """
+    A forwarding address that no user profile has yet, made of the local part of `email` and 4 random digits.
+    Several candidates are checked with a single query. The unique index on `forwarding_email` still catches a
+    concurrent registration that picked the same address.
+    """
+    local_part = email.split('@')[0]
+    candidates = {f'{local_part}{secrets.randbelow(9000) + 1000}@{FORWARDING_EMAIL_DOMAIN}' for _ in range(8)}
+    candidates -= set(profile_model.objects.filter(forwarding_email__in=candidates).values_list('forwarding_email', flat=True))
+    if candidates:
+        return candidates.pop()
+    # Most of the 4 digit addresses of this local part are taken
+    return f'{local_part}{secrets.token_hex(4)}@{FORWARDING_EMAIL_DOMAIN}'
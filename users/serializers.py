@@ -1,6 +1,8 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import UserProfile
+from django.db import IntegrityError, transaction
+from .authentication import BearerToken
+from .models import UserProfile, generate_forwarding_email
 from django.contrib.auth import authenticate
 from django.core import exceptions
 import django.contrib.auth.password_validation as validators
@@ -58,24 +60,35 @@ class RegisterSerializer(serializers.ModelSerializer):
     class Meta:
         model = UserProfile
         fields = ('user', 'telephone_number', 'forwarding_email')
+        read_only_fields = ('forwarding_email',)
 
     def create(self, validated_data):
         user_data = validated_data.pop('user')
-
-        # Create the new user with user_data before creating the user profile
-        user = User.objects.create_user(
-            username=user_data['username'],
-            first_name=user_data['first_name'],
-            last_name=user_data['last_name'],
-            email=user_data['email'],
-            password=user_data['password']
-        )
-
-        user_profile = UserProfile.objects.create(
-            user=user,
-            telephone_number=str(validated_data.pop('telephone_number')),
-        )
-        return user_profile
+        telephone_number = str(validated_data.pop('telephone_number'))
+
+        for attempt in range(3):
+            # The forwarding address is picked before the profile is inserted, so the profile is saved once
+            forwarding_email = generate_forwarding_email(user_data['email'])
+            try:
+                with transaction.atomic():
+                    # Create the new user with user_data before creating the user profile
+                    user = User.objects.create_user(
+                        username=user_data['username'],
+                        first_name=user_data['first_name'],
+                        last_name=user_data['last_name'],
+                        email=user_data['email'],
+                        password=user_data['password']
+                    )
+
+                    return UserProfile.objects.create(
+                        user=user,
+                        telephone_number=telephone_number,
+                        forwarding_email=forwarding_email
+                    )
+            except IntegrityError:
+                # Retry if another registration took the same forwarding address in the meantime
+                if attempt == 2 or not UserProfile.objects.filter(forwarding_email=forwarding_email).exists():
+                    raise
 
 
 class EmailSerializer(serializers.Serializer):
@@ -117,3 +130,15 @@ class ChangePasswordSerializer(serializers.Serializer):
             user = User.objects.get(email=data["email"])
             return user
         raise serializers.ValidationError("User doesn't exist")
+
+
+class BearerTokenSerializer(serializers.ModelSerializer):
+    """A session token of the user, without its secret. `current` is true for the token of the request."""
+    current = serializers.SerializerMethodField()
+
+    class Meta:
+        model = BearerToken
+        fields = ('id', 'name', 'created', 'last_used_at', 'expires_at', 'current')
+
+    def get_current(self, token):
+        return token.id == getattr(self.context['request'].auth, 'id', None)
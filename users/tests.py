@@ -1,12 +1,28 @@
+import tempfile
+
 from django.contrib.auth.models import User
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APITestCase
-from users.authentication import BearerToken
+from users.authentication import BearerToken, TokenCache, last_used, token_digest
 
+from friends.models import Friends
+from outbox.models import OutboundEmail
 from users.models import UserProfile
 
 
+def file_caches(directory, *aliases):
+    """Caches shared by the processes of a host, each alias standing for the cache of another process"""
+    return {
+        alias: {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directory}
+        for alias in aliases
+    }
+
+
 class UserAPITest(APITestCase):
     def setUp(self):
         pass
@@ -86,6 +102,41 @@ class UserAPITest(APITestCase):
         # For the password, only make sure it's hashed using sha256 when stored in the database
         self.assertTrue('sha256' in user_profile.user.password)
 
+    def test_user_registration_converts_invites(self):
+        """
+        Invites sent to the email of a new user become friend requests, and the welcome email is queued in the outbox
+        """
+        self.helper_create_user_instance()
+        Friends.objects.create(main_user=self.user, confirmed=False, temp_email='johnnybravo@gmail.com')
+        Friends.objects.create(main_user=self.user2, confirmed=False, temp_email='johnnybravo@gmail.com')
+
+        response = self.client.post(
+            reverse('register_user'),
+            data={
+                'user': {
+                    'username': 'johnnybravo@gmail.com',
+                    'email': 'johnnybravo@gmail.com',
+                    'first_name': 'johnny',
+                    'last_name': 'bravo',
+                    'password': 'cartoonnetwork456',
+                },
+                'telephone_number': "+1-323-555-1234"
+            },
+            format='json'
+        )
+
+        self.assertEquals(response.status_code, status.HTTP_200_OK)
+        user = User.objects.get(username='johnnybravo@gmail.com')
+        self.assertEqual(Friends.objects.filter(friend_user=user, temp_email=None, confirmed=False).count(), 2)
+
+        self.assertRegex(response.data['forwarding_email'], r'^johnnybravo\d{4}@budgetlens\.tech$')
+        self.assertEqual(UserProfile.objects.get(user=user).forwarding_email, response.data['forwarding_email'])
+
+        # The welcome email is queued, not sent during the request
+        email = OutboundEmail.objects.get()
+        self.assertEqual(email.to, 'johnnybravo@gmail.com')
+        self.assertEqual(email.status, OutboundEmail.Status.PENDING)
+
     def test_user_login(self):
         """
         Test Case for user.LoginAPI
@@ -115,9 +166,16 @@ class UserAPITest(APITestCase):
         self.assertEqual(response.data['user']['first_name'], self.user_profile.user.first_name)
         self.assertEqual(response.data['user']['last_name'], self.user_profile.user.last_name)
 
-        # Get token from database and assert with value from response
+        # Get token from database and assert that only the digest of the token from the response is stored
         token = BearerToken.objects.get(user_id=self.user.pk)
-        self.assertEqual(response.data['token'], token.key)
+        self.assertEqual(token.digest, token_digest(response.data['token']))
+        self.assertNotIn(response.data['token'], token.digest)
+
+        # Assert that logging in from another device creates another token
+        response = self.client.post(login_url, data=dict(data, device='Phone'), format='json')
+        self.assertEquals(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(BearerToken.objects.get(digest=token_digest(response.data['token'])).name, 'Phone')
+        self.assertEqual(BearerToken.objects.filter(user=self.user).count(), 2)
 
     def test_invalid_user_login(self):
         """
@@ -226,6 +284,155 @@ class UserAPITest(APITestCase):
         # Assert that there are no more tokens in the database
         self.assertEqual(BearerToken.objects.count(), 0)
 
+        # Assert that the token is not authenticated from the cache anymore
+        response = self.client.get(reverse('user_data'), format='json')
+        self.assertEquals(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_logout_keeps_other_devices(self):
+        """
+        Test Case for user.views.LogoutAPI when the user is logged in from several devices
+        """
+        self.helper_create_user_instance()
+        token = BearerToken.objects.create(user=self.user, name='Laptop')
+        other_token = BearerToken.objects.create(user=self.user, name='Phone')
+
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + token.key)
+        self.assertEquals(self.client.delete(reverse('logout_user'), format='json').status_code, status.HTTP_200_OK)
+
+        self.assertEqual(list(BearerToken.objects.values_list('name', flat=True)), ['Phone'])
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + other_token.key)
+        self.assertEquals(self.client.get(reverse('user_data'), format='json').status_code, status.HTTP_200_OK)
+
+    def test_list_and_revoke_tokens(self):
+        """
+        Test Case for user.views.BearerTokenAPI and user.views.RevokeBearerTokenAPI
+        """
+        self.helper_create_user_instance()
+        token = BearerToken.objects.create(user=self.user, name='Laptop')
+        phone_token = BearerToken.objects.create(user=self.user, name='Phone')
+        tablet_token = BearerToken.objects.create(user=self.user, name='Tablet')
+        other_user_token = BearerToken.objects.create(user=self.user2)
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + token.key)
+
+        response = self.client.get(reverse('user_tokens'), format='json')
+        self.assertEquals(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([(t['name'], t['current']) for t in response.data['data']],
+                         [('Tablet', False), ('Phone', False), ('Laptop', True)])
+        self.assertNotIn('digest', response.data['data'][0])
+
+        # The tokens of other users cannot be revoked
+        response = self.client.delete(reverse('revoke_token', args=[other_user_token.id]), format='json')
+        self.assertEquals(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        response = self.client.delete(reverse('revoke_token', args=[phone_token.id]), format='json')
+        self.assertEquals(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(BearerToken.objects.filter(id=phone_token.id).exists())
+
+        # Revoke every other session
+        response = self.client.delete(reverse('user_tokens'), format='json')
+        self.assertEquals(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(BearerToken.objects.filter(user=self.user)), [token])
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + tablet_token.key)
+        self.assertEquals(self.client.get(reverse('user_data'), format='json').status_code,
+                          status.HTTP_401_UNAUTHORIZED)
+
+    def test_expired_token(self):
+        """
+        Test Case for users.authentication.BearerAuthentication when the token has expired
+        """
+        self.helper_create_user_instance()
+        token = BearerToken.objects.create(user=self.user)
+        self.assertIsNotNone(token.expires_at)
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + token.key)
+        self.assertEquals(self.client.get(reverse('user_data'), format='json').status_code, status.HTTP_200_OK)
+
+        token.expires_at = timezone.now()
+        token.save()
+        response = self.client.get(reverse('user_data'), format='json')
+        self.assertEquals(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response.data['detail'], 'Token expired.')
+
+    def test_last_used_is_written_in_batches(self):
+        """
+        Test Case for users.authentication.LastUsedTracker
+        """
+        self.helper_create_user_instance()
+        token = BearerToken.objects.create(user=self.user)
+        other_token = BearerToken.objects.create(user=self.user2)
+        last_used.flush()
+
+        for key in [token.key, token.key, other_token.key]:
+            self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + key)
+            self.client.get(reverse('user_data'), format='json')
+        self.assertFalse(BearerToken.objects.filter(last_used_at__isnull=False).exists())
+
+        # Both tokens are written with one query
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(last_used.flush(), 2)
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(BearerToken.objects.filter(last_used_at__isnull=False).count(), 2)
+
+    def test_cached_authentication(self):
+        """
+        Test Case for users.authentication.BearerAuthentication caching the authenticated users
+        """
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        shared_caches = override_settings(CACHES=file_caches(directory.name, 'default'))
+        shared_caches.enable()
+        self.addCleanup(shared_caches.disable)
+
+        user_data_url = reverse('user_data')
+        self.helper_create_user_instance()
+        token = BearerToken.objects.create(user_id=self.user.pk)
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + token.key)
+
+        self.assertEquals(self.client.get(user_data_url, format='json').status_code, status.HTTP_200_OK)
+
+        # Assert that the token is authenticated without any query once cached
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(user_data_url, format='json')
+        self.assertEquals(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(queries), 0)
+
+        # Assert that changing the password evicts the cached user
+        self.user.set_password('newwrestlingrules123')
+        self.user.first_name = 'Johnny'
+        self.user.save()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(user_data_url, format='json')
+        self.assertGreater(len(queries), 0)
+        self.assertEqual(response.data['first_name'], 'Johnny')
+
+        # Assert that a deactivated user is not authenticated anymore
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get(user_data_url, format='json')
+        self.assertEquals(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_token_cache_revocation_is_seen_by_other_processes(self):
+        """
+        Test Case for users.authentication.TokenCache, with a cache for each of two processes
+        """
+        self.helper_create_user_instance()
+        token = BearerToken.objects.create(user=self.user)
+        digest = token_digest(token.key)
+
+        with tempfile.TemporaryDirectory() as directory, \
+                override_settings(CACHES=file_caches(directory, 'default', 'other')):
+            cache, other_cache = TokenCache('default'), TokenCache('other')
+            cache.set(digest, (self.user, token))
+            self.assertEqual(other_cache.get(digest), (self.user, token))
+
+            cache.delete([digest])
+            self.assertIsNone(other_cache.get(digest))
+
+        # Per-process caches cannot evict a token from the other processes, so nothing is cached in them
+        cache, other_cache = TokenCache('default'), TokenCache('default')
+        cache.set(digest, (self.user, token))
+        self.assertIsNone(cache.get(digest))
+        self.assertIsNone(other_cache.get(digest))
+
     def test_edit_user_profile_success(self) -> object:
         profile_edit_url = reverse('user_profile')
 
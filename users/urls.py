@@ -6,6 +6,8 @@ urlpatterns = [
     path('loginEndpoint/', views.LoginAPI.as_view(), name='login_user'),
     path('userEndpoint/', views.UserAPI.as_view(), name='user_data'),
     path('logoutEndpoint/', views.LogoutAPI.as_view(), name='logout_user'),
+    path('tokenEndpoint/', views.BearerTokenAPI.as_view(), name='user_tokens'),
+    path('tokenEndpoint/<int:token_id>/', views.RevokeBearerTokenAPI.as_view(), name='revoke_token'),
     path('userprofile/', views.UserProfileAPI.as_view(), name='user_profile'),
     path('generateDigitCodeEndpoint/', views.GenerateDigitCodeView.as_view(), name='generate_digit_code'),
     path('validateDigitCodeEndpoint/', views.ValidateDigitCodeView.as_view(), name='validate_digit_code'),
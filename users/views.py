@@ -1,24 +1,28 @@
 import random
-import secrets
 from django.core.validators import validate_email
-from django.db import IntegrityError
+from django.db import transaction
 from phonenumber_field.phonenumber import PhoneNumber
 from rest_framework import generics
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.contrib.auth.password_validation import password_validators_help_texts
-from rest_framework.status import HTTP_200_OK, HTTP_400_BAD_REQUEST
+from rest_framework.status import HTTP_200_OK, HTTP_400_BAD_REQUEST, HTTP_404_NOT_FOUND
 
 from friends.models import Friends
 from .serializers import RegisterSerializer, UserSerializer, LoginSerializer, EmailSerializer, \
-    ValidateDigitSerializer, ChangePasswordSerializer
+    ValidateDigitSerializer, ChangePasswordSerializer, BearerTokenSerializer
 from .models import UserProfile
 from django.contrib.auth.models import User
 from .authentication import BearerToken
 from utility.sendEmail import sendEmail
 
 
+def device_name(request):
+    """The optional name of the device a token is created for, e.g. to tell the sessions of a user apart"""
+    return str(request.data.get("device") or "")[:100]
+
+
 class RegisterAPI(generics.GenericAPIView):
     """API for registering a new user"""
     queryset = UserProfile.objects.all()
@@ -27,27 +31,20 @@ class RegisterAPI(generics.GenericAPIView):
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
-        user_profile = serializer.save()
-        token = BearerToken.objects.create(user=user_profile.user)
-        user = UserSerializer(user_profile.user, context=self.get_serializer_context())
-
-        # creating the forwarding_email of a user
-
-        email = user.data['email']
-        splitEmail = email.split('@')[0]
-        randomInt = secrets.randbelow(9000) + 1000
-        user_profile.forwarding_email = str(splitEmail + str(randomInt) + "@budgetlens.tech")
-        user_profile.save()
-
-        # TODO: a proper registration email need to be developed, right now, the function is proven to work
-        # To use sendEmail function, you have to import it from the utility folder, for refrence, look at the imports at the top
-        sendEmail(user.data['email'], 'User Successfully registered', 'User Successfully registered')
-        # converting all email invites to friend requests upon registration
-        friends = Friends.objects.filter(temp_email=user.data['email'])
-        for friend in friends:
-            friend.friend_user = user_profile.user
-            friend.temp_email = None
-            friend.save()
+
+        # The user, its profile, token and friend requests are created together, or not at all
+        with transaction.atomic():
+            user_profile = serializer.save()
+            token = BearerToken.objects.create(user=user_profile.user, name=device_name(request))
+            user = UserSerializer(user_profile.user, context=self.get_serializer_context())
+
+            # converting all email invites to friend requests upon registration
+            Friends.objects.filter(temp_email=user.data['email']).update(friend_user=user_profile.user, temp_email=None)
+
+            # TODO: a proper registration email need to be developed, right now, the function is proven to work
+            # The email is queued in the outbox and only delivered once the user is committed
+            sendEmail(user.data['email'], 'User Successfully registered', 'User Successfully registered')
+
         return Response({
             # saves user and its data
             "user": user.data,
@@ -69,13 +66,8 @@ class LoginAPI(generics.GenericAPIView):
         serializer.is_valid(raise_exception=True)
         user = serializer.validated_data
 
-        try:
-            token = BearerToken.objects.create(user=user)
-        except IntegrityError:
-            return Response({
-                "details": "Token already exists (User is already logged in)",
-                "token": BearerToken.objects.get(user=user).key
-            })
+        # Each device gets its own token, which can be revoked separately
+        token = BearerToken.objects.create(user=user, name=device_name(request))
 
         return Response({
             # saves user and its data
@@ -98,7 +90,38 @@ class LogoutAPI(APIView):
     permission_classes = [IsAuthenticated, ]
 
     def delete(self, request, *args, **kwargs):
-        request.user.auth_bearertoken.delete()
+        # Only the token of this device is deleted, the other sessions of the user are kept
+        request.auth.delete()
+        return Response({
+            "data": "Successfully deleted"
+        }, status=HTTP_200_OK)
+
+
+class BearerTokenAPI(APIView):
+    """Lists the session tokens of the user (GET), or revokes all of them except the current one (DELETE)"""
+    permission_classes = [IsAuthenticated, ]
+
+    def get(self, request, *args, **kwargs):
+        tokens = BearerToken.objects.filter(user=request.user).order_by('-created', '-id')
+        return Response({
+            "data": BearerTokenSerializer(tokens, many=True, context={'request': request}).data
+        }, status=HTTP_200_OK)
+
+    def delete(self, request, *args, **kwargs):
+        deleted, _ = BearerToken.objects.filter(user=request.user).exclude(id=request.auth.id).delete()
+        return Response({
+            "data": f"Successfully revoked {deleted} token(s)"
+        }, status=HTTP_200_OK)
+
+
+class RevokeBearerTokenAPI(APIView):
+    """Revokes one of the session tokens of the user, e.g. of a lost device"""
+    permission_classes = [IsAuthenticated, ]
+
+    def delete(self, request, token_id, *args, **kwargs):
+        deleted, _ = BearerToken.objects.filter(user=request.user, id=token_id).delete()
+        if not deleted:
+            return Response({"response": "Token not found"}, HTTP_404_NOT_FOUND)
         return Response({
             "data": "Successfully deleted"
         }, status=HTTP_200_OK)
@@ -0,0 +1,106 @@
+import functools
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from rest_framework.response import Response
+
+# Scope of the cached responses that are the same for every user
+MERCHANTS_SCOPE = 'merchants'
+
+
+def is_shared_cache(cache):
+    """Whether what is written to `cache` is seen by every process, which per-process caches are not"""
+    return not isinstance(cache, (LocMemCache, DummyCache))
+
+
+def get_cache():
+    return caches[settings.RESPONSE_CACHE]
+
+
+def user_scope(user_id):
+    return f'user:{user_id}'
+
+
+def _version_key(scope):
+    return f'cache-version:{scope}'
+
+
+def _initial_version():
+    # Versions start from the current time rather than 1, so that a version evicted from the cache does not start
+    # over and find the responses cached under its previous values
+    return time.time_ns() // 1000
+
+
+def cache_version(scope):
+    """The current version of the cached responses of `scope`, part of the key of those responses"""
+    cache = get_cache()
+    version = cache.get(_version_key(scope))
+    if version is None:
+        cache.add(_version_key(scope), _initial_version(), timeout=None)
+        version = cache.get(_version_key(scope))
+    return version
+
+
+def _bump(scopes):
+    cache = get_cache()
+    for scope in scopes:
+        try:
+            cache.incr(_version_key(scope))
+        except ValueError:
+            cache.set(_version_key(scope), _initial_version(), timeout=None)
+
+
+def bump_cache_version(*scopes):
+    """
+    Make the responses cached for `scopes` stale. They are not deleted, they just expire unread. Bumped again once
+    the transaction commits, in case a concurrent request cached a response before the change was committed.
+    """
+    if scopes:
+        _bump(scopes)
+        transaction.on_commit(lambda: _bump(scopes))
+
+
+def bump_user_cache_version(*user_ids):
+    """Called when the data of users changes, including with `bulk_create` and `QuerySet.update`"""
+    bump_cache_version(*(user_scope(user_id) for user_id in set(user_ids) if user_id is not None))
+
+
+def cache_response(namespace, scope=None):
+    """
+    Cache the successful responses of a GET handler of a view for RESPONSE_CACHE_TTL seconds, keyed by the user
+    (or by `scope`, for responses that are the same for every user), the URL arguments and the query parameters.
+
+    The key includes the version of the scope, so the responses are invalidated by bumping it: the models that
+    the cached responses are made of bump the version of their user in their signals (see `bump_user_cache_version`).
+    Responses are not cached when RESPONSE_CACHE is local to each process, since the versions bumped by a process
+    (e.g. by the jobs of `runjobs`) would not be seen by the others.
+    """
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(view, request, *args, **kwargs):
+            if not is_shared_cache(get_cache()):
+                return handler(view, request, *args, **kwargs)
+
+            response_scope = scope or user_scope(request.user.id)
+            arguments = json.dumps([args, kwargs, sorted(request.query_params.lists())], sort_keys=True, default=str)
+            key = 'response:{}:{}:{}:{}'.format(
+                namespace, response_scope, cache_version(response_scope), hashlib.sha256(arguments.encode()).hexdigest()
+            )
+
+            cached = get_cache().get(key)
+            if cached is not None:
+                data, status = cached
+                return Response(data, status=status)
+
+            response = handler(view, request, *args, **kwargs)
+            if response.status_code == 200:
+                get_cache().set(key, (response.data, response.status_code), settings.RESPONSE_CACHE_TTL)
+            return response
+        return wrapper
+    return decorator
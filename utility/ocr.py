@@ -0,0 +1,240 @@
+import hashlib
+import json
+import os
+from decimal import Decimal
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class AnalyzedLineItem:
+    """A line item read from a receipt image. `category` is the category name suggested by the backend, if any."""
+
+    def __init__(self, name, price, category=None):
+        self.name = name
+        self.price = Decimal(str(price))
+        self.category = category or None
+
+    def to_dict(self):
+        return {'name': self.name, 'price': str(self.price), 'category': self.category}
+
+
+class AnalyzedReceipt:
+    """The result of the analysis of a receipt image, independent of the backend that produced it"""
+
+    def __init__(self, merchant_name=None, total=None, tax=None, tip=None, line_items=None, receipt_text=''):
+        self.merchant_name = merchant_name
+        self.total = total
+        self.tax = tax
+        self.tip = tip
+        self.line_items = line_items or []
+        self.receipt_text = receipt_text
+
+    def to_dict(self):
+        return {
+            'merchant_name': self.merchant_name,
+            'total': self.total,
+            'tax': self.tax,
+            'tip': self.tip,
+            'line_items': [line_item.to_dict() for line_item in self.line_items],
+            'receipt_text': self.receipt_text,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            merchant_name=data.get('merchant_name'),
+            total=data.get('total'),
+            tax=data.get('tax'),
+            tip=data.get('tip'),
+            line_items=[AnalyzedLineItem(**line_item) for line_item in data.get('line_items', [])],
+            receipt_text=data.get('receipt_text', ''),
+        )
+
+
+def image_digest(image_path):
+    """SHA-256 of the content of an image, used to name recorded analyses"""
+    sha = hashlib.sha256()
+    with open(image_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+class OcrBackend:
+    """
+    Base class of the OCR backends. Backends are instantiated once per process by `get_ocr_backend`, so any
+    API client they hold is reused across receipts.
+    """
+
+    def analyze(self, image_path):
+        """Analyze the receipt image at `image_path` and return an `AnalyzedReceipt`"""
+        raise NotImplementedError
+
+    def analyze_receipt_image(self, image_path):
+        """
+        Analyze a receipt image. When OCR_RECORD_DIR is set, the result is also saved there so it can be
+        replayed later with the `FixtureOcrBackend`.
+        """
+        analyzed_receipt = self.analyze(image_path)
+        if settings.OCR_RECORD_DIR:
+            os.makedirs(settings.OCR_RECORD_DIR, exist_ok=True)
+            record_path = os.path.join(settings.OCR_RECORD_DIR, image_digest(image_path) + '.json')
+            with open(record_path, 'w') as f:
+                json.dump(analyzed_receipt.to_dict(), f, indent=2)
+        return analyzed_receipt
+
+
+class AzureOcrBackend(OcrBackend):
+    """Azure Form Recognizer `prebuilt-receipt` model. It does not suggest categories."""
+
+    endpoint = os.getenv('AZURE_FORM_RECOGNIZER_ENDPOINT', 'https://budgetlens.cognitiveservices.azure.com/')
+    key = os.getenv('AZURE_FORM_RECOGNIZER_KEY', 'eda67d70c1d04f5d964946779e494672')
+
+    def __init__(self):
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            from azure.core.credentials import AzureKeyCredential
+            from azure.ai.formrecognizer import DocumentAnalysisClient
+
+            self._client = DocumentAnalysisClient(endpoint=self.endpoint, credential=AzureKeyCredential(self.key))
+        return self._client
+
+    def analyze(self, image_path):
+        with open(image_path, "rb") as f:
+            poller = self.client.begin_analyze_document("prebuilt-receipt", document=f, locale="en-US")
+        receipts = poller.result()
+
+        analyzed_receipt = AnalyzedReceipt()
+        receipt_text = ""
+        for idx, receipt in enumerate(receipts.documents):
+            receipt_text += "--------Analysis of receipt #{}--------".format(idx + 1)
+            receipt_text += "Receipt type: {}".format(receipt.doc_type or "N/A")
+            merchant_name = receipt.fields.get("MerchantName")
+            if merchant_name:
+                analyzed_receipt.merchant_name = merchant_name.value
+                receipt_text += "Merchant Name: {} has confidence: {}".format(merchant_name.value, merchant_name.confidence)
+            transaction_date = receipt.fields.get("TransactionDate")
+            if transaction_date:
+                receipt_text += "Transaction Date: {} has confidence: {}".format(transaction_date.value, transaction_date.confidence)
+            if receipt.fields.get("Items"):
+                receipt_text += "Receipt items:"
+                for item_idx, item in enumerate(receipt.fields.get("Items").value):
+                    receipt_text += self._read_line_item(analyzed_receipt, item_idx, item)
+            subtotal = receipt.fields.get("Subtotal")
+            if subtotal:
+                receipt_text += "Subtotal: {} has confidence: {}".format(subtotal.value, subtotal.confidence)
+            tax = receipt.fields.get("TotalTax")
+            if tax:
+                analyzed_receipt.tax = tax.value
+                receipt_text += "Total tax: {} has confidence: {}".format(tax.value, tax.confidence)
+            tip = receipt.fields.get("Tip")
+            if tip:
+                analyzed_receipt.tip = tip.value
+                receipt_text += "Tip: {} has confidence: {}".format(tip.value, tip.confidence)
+            total = receipt.fields.get("Total")
+            if total:
+                analyzed_receipt.total = total.value
+                receipt_text += "Total: {} has confidence: {}".format(total.value, total.confidence)
+            receipt_text += "--------------------------------------"
+
+        analyzed_receipt.receipt_text = receipt_text
+        return analyzed_receipt
+
+    @staticmethod
+    def _read_line_item(analyzed_receipt, idx, item):
+        """Add one line item of an Azure document to `analyzed_receipt` and return its text"""
+        item_text = "...Item #{}".format(idx + 1)
+        item_description = item.value.get("Description")
+        if item_description:
+            item_text += "......Item Description: {} has confidence: {}".format(item_description.value, item_description.confidence)
+        item_quantity = item.value.get("Quantity")
+        if item_quantity:
+            item_text += "......Item Quantity: {} has confidence: {}".format(item_quantity.value, item_quantity.confidence)
+        item_price = item.value.get("Price")
+        if item_price:
+            item_text += "......Individual Item Price: {} has confidence: {}".format(item_price.value, item_price.confidence)
+        item_total_price = item.value.get("TotalPrice")
+        if item_total_price:
+            item_text += "......Total Item Price: {} has confidence: {}".format(item_total_price.value, item_total_price.confidence)
+            if item_description:
+                price = item_price.value if item_price is not None else item_total_price.value
+                analyzed_receipt.line_items.append(AnalyzedLineItem(item_description.value, price))
+        return item_text
+
+
+class VeryfiOcrBackend(OcrBackend):
+    """Veryfi receipt API. Each line item comes with a category (its `type`)."""
+
+    client_id = os.getenv('VERYFI_CLIENT_ID', 'vrfSF8foCT17EJT3UgcSLY3YUbztTJOCnbA6wXM')
+    client_secret = os.getenv(
+        'VERYFI_CLIENT_SECRET',
+        'S07fCdCCPIUa2wrCapt3COCaWIFsItrevAnVzTnglaxXI8EO7F1FvEcVy0riH8zZ3U2YkkVy21hKo6wgIu0zuNKWH0jSemV0bhXTiztNGUMrwnRuoPGK3WTdKkswyJEf'
+    )
+    username = os.getenv('VERYFI_USERNAME', 'amir4')
+    api_key = os.getenv('VERYFI_API_KEY', 'fcff4aa0b6f33e7826e467319d76985b')
+
+    def __init__(self):
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            from veryfi import Client
+
+            self._client = Client(self.client_id, self.client_secret, self.username, self.api_key)
+        return self._client
+
+    def analyze(self, image_path):
+        # This submits the document for processing (takes 3-5 seconds to get a response)
+        response = self.client.process_document(image_path)
+
+        line_items = []
+        for line_item in response.get('line_items', []):
+            price = line_item.get('price') or line_item.get('total')
+            if line_item.get('description') and price is not None:
+                line_items.append(AnalyzedLineItem(line_item['description'], price, line_item.get('type')))
+
+        return AnalyzedReceipt(
+            merchant_name=(response.get('vendor') or {}).get('name'),
+            total=response.get('total'),
+            tax=response.get('tax'),
+            tip=response.get('tip'),
+            line_items=line_items,
+            receipt_text=response.get('ocr_text') or '',
+        )
+
+
+class FixtureOcrBackend(OcrBackend):
+    """
+    Local stand-in that replays analyses saved as JSON in OCR_FIXTURE_DIR, without any network call.
+
+    The fixture of an image is looked up by the SHA-256 of its content (as written with OCR_RECORD_DIR), then by
+    its file name (`<name>.json`), and finally `default.json`. An image without any fixture gives an empty analysis.
+    """
+
+    def analyze(self, image_path):
+        candidates = [os.path.basename(image_path) + '.json', 'default.json']
+        if os.path.exists(image_path):
+            candidates.insert(0, image_digest(image_path) + '.json')
+
+        for candidate in candidates:
+            fixture_path = os.path.join(settings.OCR_FIXTURE_DIR, candidate)
+            if os.path.exists(fixture_path):
+                with open(fixture_path) as f:
+                    return AnalyzedReceipt.from_dict(json.load(f))
+        return AnalyzedReceipt()
+
+
+_backends = {}
+
+
+def get_ocr_backend(path=None):
+    """Return the per-process instance of the OCR backend at dotted `path` (OCR_BACKEND by default)"""
+    path = path or settings.OCR_BACKEND
+    if path not in _backends:
+        _backends[path] = import_string(path)()
+    return _backends[path]
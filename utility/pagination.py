@@ -0,0 +1,88 @@
+import base64
+import binascii
+import json
+
+from django.db.models import F, Q
+from django.utils.dateparse import parse_datetime
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_cursor(direction, date_value, id_value):
+    """Opaque token pointing before ('previous') or after ('next') the row with the given date and id"""
+    data = {'d': direction, 'k': [date_value.isoformat() if date_value is not None else None, id_value]}
+    return base64.urlsafe_b64encode(json.dumps(data).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Return (direction, date, id) for a token made by `encode_cursor`, raising InvalidCursor if it is malformed"""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        direction = data['d']
+        date_value = parse_datetime(data['k'][0]) if data['k'][0] is not None else None
+        id_value = int(data['k'][1])
+    except (binascii.Error, ValueError, TypeError, KeyError, IndexError):
+        raise InvalidCursor()
+    if direction not in ('next', 'previous'):
+        raise InvalidCursor()
+    return direction, date_value, id_value
+
+
+def _get_value(obj, field):
+    for attribute in field.split('__'):
+        obj = getattr(obj, attribute) if obj is not None else None
+    return obj
+
+
+def _after(date_field, date_value, id_value):
+    """Rows that come after (date_value, id_value) in the newest first order"""
+    if date_value is None:
+        return Q(**{f'{date_field}__isnull': True, 'id__lt': id_value})
+    return (
+        Q(**{f'{date_field}__lt': date_value})
+        | Q(**{date_field: date_value, 'id__lt': id_value})
+        | Q(**{f'{date_field}__isnull': True})
+    )
+
+
+def _before(date_field, date_value, id_value):
+    """Rows that come before (date_value, id_value) in the newest first order"""
+    if date_value is None:
+        return Q(**{f'{date_field}__isnull': False}) | Q(**{f'{date_field}__isnull': True, 'id__gt': id_value})
+    return Q(**{f'{date_field}__gt': date_value}) | Q(**{date_field: date_value, 'id__gt': id_value})
+
+
+def keyset_paginate(queryset, date_field, cursor, page_size):
+    """
+    Keyset (cursor) pagination of `queryset` from the newest to the oldest `date_field`, ties broken by id.
+
+    Unlike LIMIT/OFFSET, only the rows of the requested page are read however deep the page is, as long as
+    (date_field, id) is indexed. `cursor` is empty for the first page, otherwise a token returned in a previous call.
+    Returns the rows of the page, and the cursors of the next and previous pages (None when there is none).
+    """
+    direction, date_value, id_value = decode_cursor(cursor) if cursor else ('next', None, None)
+
+    if direction == 'previous':
+        rows = list(
+            queryset.filter(_before(date_field, date_value, id_value))
+            .order_by(F(date_field).asc(nulls_first=True), 'id')[:page_size + 1]
+        )
+        has_more = len(rows) > page_size
+        rows = rows[:page_size][::-1]
+        has_next, has_previous = True, has_more
+    else:
+        if cursor:
+            queryset = queryset.filter(_after(date_field, date_value, id_value))
+        rows = list(queryset.order_by(F(date_field).desc(nulls_last=True), '-id')[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        has_next, has_previous = has_more, bool(cursor)
+
+    next_cursor = previous_cursor = None
+    if rows and has_next:
+        next_cursor = encode_cursor('next', _get_value(rows[-1], date_field), rows[-1].id)
+    if rows and has_previous:
+        previous_cursor = encode_cursor('previous', _get_value(rows[0], date_field), rows[0].id)
+    return rows, next_cursor, previous_cursor